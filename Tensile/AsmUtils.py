@@ -19,12 +19,24 @@
 # CTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 ################################################################################
 
+from functools import lru_cache
 from math import log
 
 ########################################
 # Format Instruction
 ########################################
 
+# "opcode op0, op1, ..." format strings, indexed by number of params
+_instFormats = ["%s", "%s"] + ["%s %s" + ", %s" * (n-2) for n in range(2, 24)]
+
+def instText(params):
+    # "opcode op0, op1, ..." for a tuple of params, without the comment
+    if len(params) < len(_instFormats):
+        formatting = _instFormats[len(params)]
+    else:
+        formatting = "%s %s" + ", %s" * (len(params)-2)
+    return formatting % (params)
+
 def inst(*args):
     # exclude the last parameter (before comment)
     # if it is empty (needed for clang++ assembler)
@@ -33,13 +45,7 @@ def inst(*args):
     else:
         params = args[0:len(args)-1]
     comment = args[len(args)-1]
-    formatting = "%s"
-    if len(params) > 1:
-        formatting += " %s"
-    for _ in range(0, len(params)-2):
-        formatting += ", %s"
-    instStr = formatting % (params)
-    line = "%-50s // %s\n" % (instStr, comment)
+    line = "%-50s // %s\n" % (instText(params), comment)
     return line
 
 ########################################
@@ -52,11 +58,14 @@ def instCommentOnly(comment=""):
 
 ########################################
 # Format GPRs
+# results depend only on the arguments and the same few names/indices
+# are formatted over and over, so cache them.  The operands are passed flat
+# and the cache is typed, so e.g. a float index (which formats to None)
+# never shares an entry with the int one
 ########################################
 
-def gpr(*args):
-    gprType = args[0]
-    args = args[1]
+@lru_cache(maxsize=4096, typed=True)
+def gpr(gprType, *args):
     if isinstance(args[0], int):
         if len(args) == 1:
             return "%s%u"%(gprType, args[0])
@@ -76,13 +85,13 @@ def gpr(*args):
                         gprType, args[0], args[1]-1)
 
 def vgpr(*args):
-    return gpr("v", args)
+    return gpr("v", *args)
 
 def sgpr(*args):
-    return gpr("s", args)
+    return gpr("s", *args)
 
 def accvgpr(*args):
-    return gpr("acc", args)
+    return gpr("acc", *args)
 
 ########################################
 # Log 2
@@ -182,6 +191,9 @@ def vectorStaticRemainder(qReg, rReg, dReg, divisor, tmpVgpr, tmpSgpr, comment="
 # dreg == dividend
 # tmpSgpr must be 2 SPGRs
 # qReg and dReg can be "sgpr[..]" or names of sgpr (will call sgpr)
+# output depends only on the arguments; cached since the same tile divides
+# are emitted for every kernel
+@lru_cache(maxsize=1024)
 def scalarStaticDivideAndRemainder(qReg, rReg, dReg, divisor, tmpSgpr, \
         doRemainder=1):
 
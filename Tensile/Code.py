@@ -20,6 +20,7 @@
 ################################################################################
 
 from __future__ import print_function
+from .AsmUtils import instText
 from .Common import globalParameters, printExit
 import ctypes
 # Global to print module names around strings
@@ -282,13 +283,7 @@ class Inst(Item):
     params = args[0:len(args)-1]
     comment = args[len(args)-1]
     assert(isinstance(comment, str))
-    formatting = "%s"
-    if len(params) > 1:
-      formatting += " %s"
-    for i in range(0, len(params)-2):
-      formatting += ", %s"
-    instStr = formatting % (params)
-    self.text = self.formatWithComment(instStr, comment)
+    self.text = self.formatWithComment(instText(params), comment)
 
   def formatWithComment(self, instStr, comment):
     return "%-50s // %s\n" % (instStr, comment)
@@ -1511,7 +1511,10 @@ def GetAsmCaps(isaVersion):
   rv["v_fma_f32"]       = tryAssembler(isaVersion, "v_fma_f32 v20, v21, v22, v23")
   rv["v_fmac_f32"]      = tryAssembler(isaVersion, "v_fmac_f32 v20, v21, v22")
 
+  rv["v_cvt_pk_bf16_f32"] = tryAssembler(isaVersion, "v_cvt_pk_bf16_f32 v20, v21, v22")
+
   rv["HasAtomicAdd"]    = tryAssembler(isaVersion, "buffer_atomic_add_f32 v0, v1, s[0:3], 0 offen offset:0")
+  rv["HasAtomicPkAddF16"] = tryAssembler(isaVersion, "buffer_atomic_pk_add_f16 v0, v1, s[0:3], 0 offen offset:0")
 
 
   if tryAssembler(isaVersion, "s_waitcnt vmcnt(63)"):
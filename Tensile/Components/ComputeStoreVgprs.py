@@ -59,12 +59,16 @@ class ComputeStoreVgprsVALU(ComputeStoreVgprs):
             writer.cinRowPtr    = writer.vgprPool.checkOut(1, "cinRowPtr")
             writer.coutRowPtr = writer.vgprPool.checkOut(1, "coutRowPtr")
 
-        tmpV0 = writer.vgprPool.checkOutAligned(2,2)
+        # divisor is almost always a power of two: the divide is then a
+        # shift + mask and needs no temp vgprs
+        pow2Divisor = (divisor & (divisor - 1)) == 0
+        tmpV0 = None if pow2Divisor else writer.vgprPool.checkOutAligned(2,2)
         kStr += vectorStaticDivideAndRemainder(tid1, tid0, "Serial", divisor, tmpV0, tmpS0)
         kStr += staticMultiply(vgpr(tid0), vgpr(tid0), tid0Scale, sgpr(tmpS1))
         if tid1Scale != 1:
             kStr += staticMultiply(vgpr(tid1), vgpr(tid1), tid1Scale, sgpr(tmpS1))
-        writer.vgprPool.checkIn(tmpV0)
+        if tmpV0 is not None:
+            writer.vgprPool.checkIn(tmpV0)
 
         if kernel["BufferStore"]:
             # compute rowStart- this is just tid1 scaled by appropriate stride.
@@ -27,8 +27,9 @@ from .SolutionStructs import isPackedIndex
 from .Utils import ceil_divide, roundUpToNearestMultiple
 from .AsmUtils import inst, vgpr, sgpr, log2, vectorStaticDivideAndRemainder, vectorStaticDivide, vectorStaticRemainder, scalarStaticDivideAndRemainder, staticMultiply, scalarStaticMultiply
 
-from math import ceil, trunc, modf
+from math import ceil
 from copy import deepcopy
+from functools import lru_cache
 import collections
 import traceback
 from enum import Enum
@@ -190,12 +191,13 @@ class RegisterPool:
   def checkOut(self, size, tag="_untagged_", preventOverflow=-1):
     return self.checkOutAligned(size, 1, tag, preventOverflow)
 
-  def checkOutAligned(self, size, alignment, tag="_untagged_aligned_", preventOverflow=-1):
+  # start: first register that may be free, registers below it are in use
+  def checkOutAligned(self, size, alignment, tag="_untagged_aligned_", preventOverflow=-1, start=0):
     if preventOverflow == -1:
       preventOverflow = self.defaultPreventOverflow
     assert(size > 0)
     found = -1
-    for i in range(0, len(self.pool)):
+    for i in range(start, len(self.pool)):
       # alignment
       if i % alignment != 0:
         continue
@@ -297,6 +299,44 @@ class RegisterPool:
       printWarning("RegisterPool::checkIn('%s',%s) but it was never checked out"%(self.pool[start].tag, start))
     #traceback.print_stack(None)
 
+  ########################################
+  # Check Out several blocks, one (size, alignment, tag, preventOverflow)
+  # request after the other. Returns the same starts as calling
+  # checkOutAligned for each request, but the in-use head of the pool is
+  # only walked once.
+  def checkOutManyAligned(self, requests):
+    starts = []
+    firstFree = 0
+    for (size, alignment, tag, preventOverflow) in requests:
+      while firstFree < len(self.pool) and \
+          self.pool[firstFree].status != RegisterPool.Status.Available:
+        firstFree += 1
+      starts.append(self.checkOutAligned(size, alignment, tag, preventOverflow, firstFree))
+    return starts
+
+  ########################################
+  # Check In several blocks at once
+  def checkInMulti(self, starts):
+    pool = self.pool
+    checkOutSize = self.checkOutSize
+    available = RegisterPool.Status.Available
+    for start in starts:
+      if start in checkOutSize and not self.printRP:
+        for i in range(start, start+checkOutSize.pop(start)):
+          pool[i].status = available
+      else:
+        self.checkIn(start) # trace or warn as a single checkIn would
+
+  ########################################
+  # Grow the pool to newSize by appending available registers
+  # No-op if the pool is already at least newSize
+  def growTo(self, newSize, tag=""):
+    oldSize = len(self.pool)
+    for i in range(oldSize, newSize):
+      self.pool.append(self.Register(RegisterPool.Status.Available, tag))
+    if self.printRP and newSize > oldSize:
+      print("RP::growTo(%u..%u for '%s')"%(oldSize, newSize-1, tag))
+
   ########################################
   # Size
   def size(self):
@@ -430,6 +470,134 @@ class PreLoopVmcntCase(Enum):
   OrdNLL_B0_Store = 3
   OrdNLL_B1_Store = 4
 
+################################################################################
+# Store coord increment
+# Pure function of its (hashable) operands, so identical element offsets
+# across batches and kernels reuse the emitted text.
+################################################################################
+@lru_cache(maxsize=65536)
+def coordAddCode(vcc, dstVgpr, srcVgpr, offset, comment):
+  if offset == 0:
+    return ""
+  return inst("_v_add_co_u32", vgpr(dstVgpr), vcc, offset, vgpr(srcVgpr), comment)
+
+################################################################################
+# ValuC operand
+# vgpr() is already memoized in AsmUtils, so this only spells the name.
+################################################################################
+def _vgprValuC(idx, num=1):
+  return vgpr("ValuC+%u"%idx, num)
+
+################################################################################
+# Full LDS/VMEM drain
+# The text only depends on whether stores have their own counter, so the few
+# variants are formatted once and shared across kernels.
+################################################################################
+@lru_cache(maxsize=64)
+def _waitAllLdsVmem(separateVscnt, comment):
+  kStr = inst("s_waitcnt", "lgkmcnt(0) & vmcnt(0)", comment)
+  if separateVscnt:
+    kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
+  return kStr
+
+################################################################################
+# Scalar magic-number division
+# Kernels reuse the same dst/dividend registers and magic tags, so the
+# 4-instruction sequence is formatted once per operand set.
+################################################################################
+@lru_cache(maxsize=256)
+def _scalarMagicDivText(dst, dividend, magicNumber, magicAbit, magicShift):
+  kStr = inst("s_mul_hi_u32", sgpr(dst+1), dividend, sgpr(magicNumber), "scalar magic div (magicnum)")
+  kStr += inst("s_mul_i32", sgpr(dst+0), dividend, sgpr(magicAbit), "scalar magic div (abit)")
+  kStr += inst("s_add_u32", sgpr(dst+0), sgpr(dst+0), sgpr(dst+1), "scalar magic div (combine)")
+  kStr += inst("s_lshr_b32", sgpr(dst+0), sgpr(dst+0), sgpr(magicShift), \
+              "scalar magic div (shift), quotient in s%s"%dst)
+  return kStr
+
+################################################################################
+# Acc -> arch VGPR index maps
+# Pure function of the MFMA tile shape; it is queried several times per kernel
+# (AccVgpr reads, ShiftVectorComponents), so build it once per shape.
+# acc2arch is a dense permutation of 0..numInst-1, returned as a tuple indexed
+# by source register so the cached map can't be modified.  arch2acc is its
+# inverse and is only built for shapes that need it.
+################################################################################
+@lru_cache(maxsize=256)
+def accToArchMap(matrixInstM, matrixInstN, waveTile0, waveTile1, regPerOut, \
+                 outputVectorWidth, matrixInstBM, matrixInstBN, sourceSwap, wavefrontSize):
+  if matrixInstM == 4:
+    numInst = outputVectorWidth * waveTile0 * waveTile1 * regPerOut
+    return tuple(range(0, numInst))
+
+  # list the map directly by walking src in order
+  if sourceSwap:
+    # TODO MatrixInstBM and BN support
+    OutputsPerMFMA = matrixInstM * matrixInstN // wavefrontSize
+    # src = tIdx0 + regPerOut * (tIdx1 + OutputsPerMFMA * (wgIdx0 + waveTile0 * wgIdx1))
+    # dst = tIdx0 + regPerOut * (wgIdx0 + waveTile0 * (tIdx1 + OutputsPerMFMA * wgIdx1))
+    return tuple(tIdx0 + regPerOut * (wgIdx0 + waveTile0 * (tIdx1 + OutputsPerMFMA * wgIdx1)) \
+        for wgIdx1 in range(0, waveTile1) \
+        for wgIdx0 in range(0, waveTile0) \
+        for tIdx1 in range(0, OutputsPerMFMA) \
+        for tIdx0 in range(0, regPerOut))
+  else:
+    OutputsPerMFMA1B = matrixInstM * matrixInstN // wavefrontSize * regPerOut
+    # src = tIdx + OutputsPerMFMA1B * (bIdx0 + matrixInstBM * (bIdx1 + matrixInstBN * (wgIdx0 + waveTile0 * wgIdx1)))
+    # dst = tIdx + OutputsPerMFMA1B * (bIdx0 + matrixInstBM * (wgIdx0 + waveTile0 * (bIdx1 + matrixInstBN * wgIdx1)))
+    return tuple(tIdx + OutputsPerMFMA1B * (bIdx0 + matrixInstBM * (wgIdx0 + waveTile0 * (bIdx1 + matrixInstBN * wgIdx1))) \
+        for wgIdx1 in range(0, waveTile1) \
+        for wgIdx0 in range(0, waveTile0) \
+        for bIdx1 in range(0, matrixInstBN) \
+        for bIdx0 in range(0, matrixInstBM) \
+        for tIdx in range(0, OutputsPerMFMA1B))
+
+@lru_cache(maxsize=256)
+def archToAccMap(*shape):
+  acc2arch = accToArchMap(*shape)
+  arch2acc = [0] * len(acc2arch)
+  for src, dst in enumerate(acc2arch):
+    arch2acc[dst] = src
+  return tuple(arch2acc)
+
+################################################################################
+# Store remap local read groups
+# Pairs of b32/b64 reads whose offsets fit in the 8-bit (element-scaled)
+# offset fields are issued as one ds_read2; returns the groups of read
+# indices, one group per local read instruction.
+################################################################################
+def storeRemapReadGroups(offsets, bps):
+  readGroups = []
+  rIdx = 0
+  while rIdx < len(offsets):
+    if bps in (4, 8) and rIdx+1 < len(offsets) \
+        and offsets[rIdx] % bps == 0 and offsets[rIdx+1] % bps == 0 \
+        and offsets[rIdx+1] // bps <= 255:
+      readGroups.append([rIdx, rIdx+1])
+      rIdx += 2
+    else:
+      readGroups.append([rIdx])
+      rIdx += 1
+  return readGroups
+
+################################################################################
+# Atomic store templates
+# Bound str.format of the templates, so the CAS loops in globalWriteBatch
+# don't re-parse a %-format string for every element.
+################################################################################
+_bufferAtomicAddF32 = "buffer_atomic_add_f32 {}, {}, {}, 0 offen offset:{}    // attempt write avi={}{}".format
+_bufferAtomicPkAddF16 = "buffer_atomic_pk_add_f16 {}, {}, {}, 0 offen offset:{}    // attempt write avi={}{}".format
+_bufferAtomicCmpswap = "buffer_atomic_cmpswap {}, {}, {} 0 offen offset:{} glc    // {}{}".format
+_bufferAtomicCmpswapX2 = "buffer_atomic_cmpswap_x2 {}, {}, {} 0 offen offset:{} glc    // {}{}".format
+_flatAtomicCmpswap = "flat_atomic_cmpswap {}, {}, {} glc    // {}{}".format
+
+################################################################################
+# Global read text
+# Formats like Code.GlobalReadInst (which, unlike inst(), keeps a trailing
+# empty operand) so chooseGlobalReadStr matches chooseGlobalRead().toStr().
+################################################################################
+def _globalReadText(opcode, *args):
+  return "%-50s // %s\n" % ("%s %s" % (opcode, ", ".join([str(a) for a in args[:-1]])), args[-1])
+
 ################################################################################
 # Assembly Kernel
 ################################################################################
@@ -1031,6 +1199,8 @@ class KernelWriterAssembly(KernelWriter):
 
     dkp = kernel["DisableKernelPieces"]
     self.do["NullKernel"]  = dkp >= 9 or dkp == -9
+    # post-loop methods are only called when enable["PostLoop"] is set
+    self.enable["PostLoop"] = self.enable["PostLoop"] and self.do["PostLoop"]
 
     self.kernel = kernel
 
@@ -1127,6 +1297,9 @@ class KernelWriterAssembly(KernelWriter):
       if kernel["MFMA_BF16_1K"] and not self.asmCaps["HasMFMA_bf16_1k"]:
         raise RuntimeError("BF16_1k MatrixInstruction not supported for {0}".format(self.version))
 
+    # scalar 32x32->64 multiplies can use s_mul_hi directly instead of a VALU round trip
+    self.hasSMulHi = globalParameters["AsmCaps"][self.version]["HasSMulHi"]
+
     self.AsmBugs = {}
     self.AsmBugs["ExplicitCO"] = globalParameters["AsmCaps"][self.version]["HasExplicitCO"]
     self.AsmBugs["ExplicitNC"] = globalParameters["AsmCaps"][self.version]["HasExplicitNC"]
@@ -1138,6 +1311,12 @@ class KernelWriterAssembly(KernelWriter):
       kernel["LocalWriteUseSgprB"] = False # Requires DirectToLdsB
 
     self.useAtomicAdd = self.asmCaps["HasAtomicAdd"] and kernel["_GlobalAccumulation"]
+    # packed half D without HPA can be accumulated one dword (atomicW=2) at a
+    # time with a native packed add instead of the cmpswap loop
+    self.useAtomicPkAddF16 = self.asmCaps["HasAtomicPkAddF16"] and kernel["BufferStore"] \
+        and kernel["ProblemType"]["DestDataType"].isHalf() \
+        and not kernel["ProblemType"]["HighPrecisionAccumulate"] \
+        and not kernel["_GlobalAccumulation"]
 
     # OptPreLoopVmcnt for PAP:
     # the vmcnt for ds_write in pre-loop can be optimized to skip the store of prev PKLoop
@@ -1328,6 +1507,43 @@ class KernelWriterAssembly(KernelWriter):
         print("HighPrecisionAccumulate only valid when DataType is half, bf16, Int8x4, Int8. Forcing HPA to False")
         kernel["ProblemType"]["HighPrecisionAccumulate"] = False
 
+    # shift to scale a C/D element offset to bytes
+    self.bpeCexternalLog2Hex = hex(log2(self.bpeCexternal))
+
+    # exec/lane-mask opcodes for this wavefront size, used per store element
+    self.sAndBWf = "s_and_b%u" % kernel["WavefrontSize"]
+    self.sMovBWf = "s_mov_b%u" % kernel["WavefrontSize"]
+    self.sOrBWf = "s_or_b%u" % kernel["WavefrontSize"]
+    self.sAndSaveExecBWf = "s_and_saveexec_b%u" % kernel["WavefrontSize"]
+    self.sOrSaveExecBWf = "s_or_saveexec_b%u" % kernel["WavefrontSize"]
+    self.sCmovBWf = "s_cmov_b%u" % kernel["WavefrontSize"]
+    self.sCselectBWf = "s_cselect_b%u" % kernel["WavefrontSize"]
+    self.sNotBWf = "s_not_b%u" % kernel["WavefrontSize"]
+
+    # cache-policy modifiers for the D stores, selected by NonTemporalC
+    self.ntStrC = ""
+    if kernel["NonTemporalC"]%2==1:
+      self.ntStrC += " glc"
+    if kernel["NonTemporalC"]//2==1:
+      self.ntStrC += " slc"
+
+    # how addStore maps an element's sumIdx onto the first D vgpr, classified
+    # once from DestDataType/HPA rather than per stored element
+    destDataType = kernel["ProblemType"]["DestDataType"]
+    # (H,H,H,H,H,H), internal H: packed halves, sumIdx//2 with hi16=sumIdx%2
+    self.storePackedHalf = (destDataType.isHalf() or destDataType.isBFloat16()) \
+        and not kernel["ProblemType"]["HighPrecisionAccumulate"]
+    if destDataType.isHalf() or destDataType.isBFloat16() \
+        or destDataType.isInt32() or destDataType.isSingle():
+      # (B,B,B,B,S,S), (H,H,H,H,H,H), (H,H,H,H,S,S), internal S
+      self.storeRegsPerSumIdx = 1
+    elif destDataType.isDouble() or destDataType.isSingleComplex():
+      self.storeRegsPerSumIdx = 2
+    elif destDataType.isDoubleComplex():
+      self.storeRegsPerSumIdx = destDataType.numRegisters()
+    else:
+      self.storeRegsPerSumIdx = 0 # no D store emitted
+
     assert self.bpeAB == tPA["bpe"]
     assert self.bpeAB == tPB["bpe"]
     # registers per global address
@@ -3326,11 +3542,11 @@ class KernelWriterAssembly(KernelWriter):
 
     # add offset to buffer
     if not kernel["_GlobalAccumulation"]:
-      kStr += inst("s_lshl_b32", sgpr("OffsetD"), sgpr("OffsetD"), hex(log2(self.bpeCexternal)), "elements offset to bytes offset")
+      kStr += inst("s_lshl_b32", sgpr("OffsetD"), sgpr("OffsetD"), self.bpeCexternalLog2Hex, "elements offset to bytes offset")
       kStr += inst("s_add_u32",  sgpr("AddressD+0"), sgpr("AddressD+0"), sgpr("OffsetD"), "add offset to buffer address")
       kStr += inst("s_addc_u32", sgpr("AddressD+1"), sgpr("AddressD+1"), 0, "add offset to buffer address")
 
-      kStr += inst("s_lshl_b32", sgpr("OffsetC"), sgpr("OffsetC"), hex(log2(self.bpeCexternal)), "elements offset to bytes offset")
+      kStr += inst("s_lshl_b32", sgpr("OffsetC"), sgpr("OffsetC"), self.bpeCexternalLog2Hex, "elements offset to bytes offset")
       kStr += inst("s_add_u32",  sgpr("AddressC+0"), sgpr("AddressC+0"), sgpr("OffsetC"), "add offset to buffer address")
       kStr += inst("s_addc_u32", sgpr("AddressC+1"), sgpr("AddressC+1"), 0, "add offset to buffer address")
 
@@ -3610,11 +3826,11 @@ class KernelWriterAssembly(KernelWriter):
             kStr += inst("s_waitcnt", "lgkmcnt(0)", "wait global buffer adress ready")
 
             if not kernel["_GlobalAccumulation"]:
-              kStr += inst("s_lshl_b32", sgpr(stmp+0), sgpr(stmp+0), hex(log2(self.bpeCexternal)), "elements offset to bytes offset")
+              kStr += inst("s_lshl_b32", sgpr(stmp+0), sgpr(stmp+0), self.bpeCexternalLog2Hex, "elements offset to bytes offset")
               kStr += inst("s_add_u32",  sgpr("AddressD+0"), sgpr("AddressD+0"), sgpr(stmp+0), "add offset to buffer address")
               kStr += inst("s_addc_u32", sgpr("AddressD+1"), sgpr("AddressD+1"), 0, "add offset to buffer address")
 
-              kStr += inst("s_lshl_b32", sgpr(stmp+1), sgpr(stmp+1), hex(log2(self.bpeCexternal)), "elements offset to bytes offset")
+              kStr += inst("s_lshl_b32", sgpr(stmp+1), sgpr(stmp+1), self.bpeCexternalLog2Hex, "elements offset to bytes offset")
               kStr += inst("s_add_u32",  sgpr("AddressC+0"), sgpr("AddressC+0"), sgpr(stmp+1), "add offset to buffer address")
               kStr += inst("s_addc_u32", sgpr("AddressC+1"), sgpr("AddressC+1"), 0, "add offset to buffer address")
 
@@ -6569,7 +6785,8 @@ class KernelWriterAssembly(KernelWriter):
 
           # perhaps could work with LSU>1 by adding other indices here, but not tested
           assert (kernel["LocalSplitU"] == 1)
-          kStr += self.notLocalSplitUGlobalWriteIndices(kernel)
+          if self.do["PostLoop"]:
+            kStr += self.notLocalSplitUGlobalWriteIndices(kernel)
 
           # add stores for opt NLL
           (fullVw, elements) = self.notLocalFullTileElements(kernel, False)
@@ -8728,13 +8945,13 @@ class KernelWriterAssembly(KernelWriter):
   # LocalSplitU: Global Write Indices
   ##############################################################################
   def localSplitUGlobalWriteIndices(self, kernel):
-    kStr = ""
+    kl = []
 
     # lr0 = serial % SG0
-    kStr += self.computeStoreVgprs(kernel, \
+    kl.append(self.computeStoreVgprs(kernel, \
               divisor = kernel["MacroTile0"] // kernel["GlobalWriteVectorWidth"], \
               tid0Scale=kernel["GlobalWriteVectorWidth"], \
-              tid1Scale=1)
+              tid1Scale=1))
 
     if kernel["BufferStore"]:
       #print "----AddressC-LocalSplitU"
@@ -8743,33 +8960,37 @@ class KernelWriterAssembly(KernelWriter):
       self.addrC = -1
     else:
       self.addrD = self.vgprPool.checkOut(2)
-      kStr += inst("v_mov_b32", \
+      kl.append(inst("v_mov_b32", \
           vgpr(self.addrD+0), \
           sgpr("AddressD+0"), \
-          "sgpr -> vgpr")
-      kStr += inst("v_mov_b32", \
+          "sgpr -> vgpr"))
+      kl.append(inst("v_mov_b32", \
           vgpr(self.addrD+1), \
           sgpr("AddressD+1"), \
-          "sgpr -> vgpr")
+          "sgpr -> vgpr"))
       self.addrC = self.vgprPool.checkOut(2)
-      kStr += inst("v_mov_b32", \
+      kl.append(inst("v_mov_b32", \
           vgpr(self.addrC+0), \
           sgpr("AddressC+0"), \
-          "sgpr -> vgpr")
-      kStr += inst("v_mov_b32", \
+          "sgpr -> vgpr"))
+      kl.append(inst("v_mov_b32", \
           vgpr(self.addrC+1), \
           sgpr("AddressC+1"), \
-          "sgpr -> vgpr")
+          "sgpr -> vgpr"))
 
-    return kStr
+    return "".join(kl)
 
   ##############################################################################
   ##############################################################################
   def allocPostLoopSrd(self, kernel, ch):
     kStr = ""
     # Buffer-load uses one base read pointer stored in the SRD - set it here:
-    kStr += inst("s_mov_b32", sgpr("Srd%s+0"%ch), sgpr("Address%s+0"%ch), "init SRD base address (lower)" )
-    kStr += inst("s_mov_b32", sgpr("Srd%s+1"%ch), sgpr("Address%s+1"%ch), "init SRD base address (upper) + other fields" )
+    if self.sgprs["Address%s"%ch] % 2 == 0:
+      # SRD is 4-aligned, so an even-aligned address pair is copied with one move
+      kStr += inst("s_mov_b64", sgpr("Srd%s"%ch, 2), sgpr("Address%s"%ch, 2), "init SRD base address + other fields" )
+    else:
+      kStr += inst("s_mov_b32", sgpr("Srd%s+0"%ch), sgpr("Address%s+0"%ch), "init SRD base address (lower)" )
+      kStr += inst("s_mov_b32", sgpr("Srd%s+1"%ch), sgpr("Address%s+1"%ch), "init SRD base address (upper) + other fields" )
     kStr += inst("s_mov_b32", sgpr("Srd%s+2"%ch), hex(0x80000000), "")
     kStr += inst("s_mov_b32", sgpr("Srd%s+3"%ch), "Srd127_96", "Set bits 127_96 in post-loop SRD")
     kStr += "\n"
@@ -8781,13 +9002,12 @@ class KernelWriterAssembly(KernelWriter):
   ##############################################################################
   def notLocalSplitUGlobalWriteIndices(self, kernel):
     #print "GlobalWriteIndices"
-    if not self.do["PostLoop"]: return ""
-    kStr = ""
+    kl = []
 
-    kStr += self.computeStoreVgprs(kernel,
+    kl.append(self.computeStoreVgprs(kernel,
               divisor = kernel["SubGroup0"],\
               tid0Scale=kernel["VectorWidth"], \
-              tid1Scale=kernel["VectorWidth"])
+              tid1Scale=kernel["VectorWidth"]))
 
     if kernel["BufferStore"]:
       #print "----AddressC-nonLSU-----"
@@ -8796,46 +9016,43 @@ class KernelWriterAssembly(KernelWriter):
       self.addrC = -1
     else:
       self.addrD = self.vgprPool.checkOut(2, 'addrD')
-      kStr += inst("v_mov_b32", \
+      kl.append(inst("v_mov_b32", \
           vgpr(self.addrD+0), \
           sgpr("AddressD+0"), \
-          "sgpr -> vgpr")
-      kStr += inst("v_mov_b32", \
+          "sgpr -> vgpr"))
+      kl.append(inst("v_mov_b32", \
           vgpr(self.addrD+1), \
           sgpr("AddressD+1"), \
-          "sgpr -> vgpr")
+          "sgpr -> vgpr"))
       self.addrC = self.vgprPool.checkOut(2, 'addrC')
-      kStr += inst("v_mov_b32", \
+      kl.append(inst("v_mov_b32", \
           vgpr(self.addrC+0), \
           sgpr("AddressC+0"), \
-          "sgpr -> vgpr")
-      kStr += inst("v_mov_b32", \
+          "sgpr -> vgpr"))
+      kl.append(inst("v_mov_b32", \
           vgpr(self.addrC+1), \
           sgpr("AddressC+1"), \
-          "sgpr -> vgpr")
-    return kStr
+          "sgpr -> vgpr"))
+    return "".join(kl)
 
   ##############################################################################
   # Release any resources used by the global write
   def cleanupGlobalWrite(self, kernel):
-    self.vgprPool.checkIn(self.coord0)
-    self.vgprPool.checkIn(self.coord1)
+    toFree = [self.coord0, self.coord1]
 
     if kernel["StoreRemapVectorWidth"]:
-      self.vgprPool.checkIn(self.storeRemapLW)
-      self.vgprPool.checkIn(self.storeRemapLR)
-      self.vgprPool.checkIn(self.storeRemapCoord0)
-      self.vgprPool.checkIn(self.storeRemapCoord1)
-      self.vgprPool.checkIn(self.storeRemapOffsetCoord1)
+      toFree += [self.storeRemapLW, self.storeRemapLR,
+                 self.storeRemapCoord0, self.storeRemapCoord1,
+                 self.storeRemapOffsetCoord1]
     if kernel["BufferStore"]:
-      self.vgprPool.checkIn(self.cinRowPtr)
-      self.vgprPool.checkIn(self.coutRowPtr)
-    if not kernel["BufferStore"]:
-      self.vgprPool.checkIn(self.addrD)
-      self.vgprPool.checkIn(self.addrC)
+      toFree += [self.cinRowPtr, self.coutRowPtr]
+    else:
+      toFree += [self.addrD, self.addrC]
 
     if self.betaVgpr != None:
-      self.vgprPool.checkIn(self.betaVgpr)
+      toFree.append(self.betaVgpr)
+
+    self.vgprPool.checkInMulti(toFree)
 
   ##############################################################################
   # Return max global write vector width, in elements
@@ -8867,12 +9084,15 @@ class KernelWriterAssembly(KernelWriter):
   ##############################################################################
   # Store Remap: Local Write
   ##############################################################################
-  def storeRemapAddLocalWrite(self, kernel, ss, addrCalc, srcVgpr):
+  def storeRemapAddLocalWrite(self, kernel, ss, addrCalc, srcVgpr, deferWrite=False):
     """
     Add localWrite for the element with addrCalc and srcVgpr.
+    With deferWrite, b32/b64 writes are held back one element so two of them
+    can be issued as one ds_write2; storeRemapFlushLocalWrite issues any
+    write still pending.
     """
 
-    kStr = ""
+    kl = []
 
     bps = self.bpeCexternal * ss.cfg.gwvw
     rpv = self.bpeCexternal * ss.cfg.gwvw / self.bpr
@@ -8880,38 +9100,67 @@ class KernelWriterAssembly(KernelWriter):
     addr0 = vgpr(self.storeRemapLW)
     offset =  addrCalc.coordOffset0 * self.bpeCexternal
 
+    # ds_write2 offsets are 8-bit and scaled by the write size
+    if deferWrite and bps in (4, 8) and offset % bps == 0 and offset//bps <= 255:
+      if self.storeRemapPendingLW is None:
+        self.storeRemapPendingLW = (offset, srcVgpr)
+        return ""
+      (pendingOffset, pendingVgpr) = self.storeRemapPendingLW
+      self.storeRemapPendingLW = None
+      kl.append(inst("ds_write2_b%u"%(bps*8), addr0, vgpr(pendingVgpr, rpv), vgpr(srcVgpr, rpv), \
+                 "offset0:%u offset1:%u"%(pendingOffset//bps, offset//bps), "storeRemap lw"))
+      return "".join(kl)
+
+    kl.append(self.storeRemapFlushLocalWrite(kernel, ss))
+
     if bps==2:
-      kStr += inst("ds_write_b16", addr0, vgpr(srcVgpr, rpv*2), \
-                 "offset:%u"%offset, "storeRemap lw")
+      kl.append(inst("ds_write_b16", addr0, vgpr(srcVgpr, rpv*2), \
+                 "offset:%u"%offset, "storeRemap lw"))
     elif bps==4:
-      kStr += inst("ds_write_b32", addr0, vgpr(srcVgpr, rpv), \
-                 "offset:%u"%offset, "storeRemap lw")
+      kl.append(inst("ds_write_b32", addr0, vgpr(srcVgpr, rpv), \
+                 "offset:%u"%offset, "storeRemap lw"))
     elif bps==8:
-      kStr += inst("ds_write_b64", addr0, vgpr(srcVgpr, rpv), \
-                 "offset:%u"%offset, "storeRemap lw")
+      kl.append(inst("ds_write_b64", addr0, vgpr(srcVgpr, rpv), \
+                 "offset:%u"%offset, "storeRemap lw"))
     elif bps==16:
-      kStr += inst("ds_write_b128", addr0, vgpr(srcVgpr, rpv), \
-                 "offset:%u"%offset, "storeRemap lw")
+      kl.append(inst("ds_write_b128", addr0, vgpr(srcVgpr, rpv), \
+                 "offset:%u"%offset, "storeRemap lw"))
     else:
       assert 0, "StoreRemap: bad bps!"
 
-    return kStr
+    return "".join(kl)
+
+  ##############################################################################
+  # Store Remap: Issue the local write held back by storeRemapAddLocalWrite
+  ##############################################################################
+  def storeRemapFlushLocalWrite(self, kernel, ss):
+    if self.storeRemapPendingLW is None:
+      return ""
+
+    (offset, srcVgpr) = self.storeRemapPendingLW
+    self.storeRemapPendingLW = None
+
+    bps = self.bpeCexternal * ss.cfg.gwvw
+    rpv = self.bpeCexternal * ss.cfg.gwvw / self.bpr
+
+    return inst("ds_write_b%u"%(bps*8), vgpr(self.storeRemapLW), vgpr(srcVgpr, rpv), \
+               "offset:%u"%offset, "storeRemap lw")
 
   ##############################################################################
   # Store Remap: Local Read and Global Write
   ##############################################################################
   def storeRemapAddStore(self, kernel, ss, addrCalc, tmpVgpr, tmpS01, edge):
-    kStr = ""
+    kl = []
 
-    kStr += inst("s_waitcnt", "lgkmcnt(0)", "wait for LDS write" )
+    kl.append(inst("s_waitcnt", "lgkmcnt(0)", "wait for LDS write" ))
 
     numStoreInst = 0
 
     #Data exchange between different waves
     #Make sure LDS writes are finished of all waves
     if kernel["MIWaveGroup"][0] > 1:
-      kStr += self.indent + self.syncStr + " //wait all lds write finished" + self.endLine
-    kStr += "\n"
+      kl.append(self.indent + self.syncStr + " //wait all lds write finished" + self.endLine)
+    kl.append("\n")
 
     gwvw = kernel["StoreRemapVectorWidth"]
     nElements = kernel["MacroTile0"]*kernel["MatrixInstN"]//kernel["MIWaveGroup"][0]//self.kernel["WavefrontSize"]
@@ -8920,32 +9169,45 @@ class KernelWriterAssembly(KernelWriter):
     bps = bpe * gwvw
     rpe = self.bpeCexternal / self.bpr
     rpv = rpe * gwvw
+    bpeShift = hex(log2(bpe))
+
+    numReads = nElements // gwvw
+    offsets = [self.storeRemapLrOffset * bpe * rIdx for rIdx in range(numReads)]
+    readGroups = storeRemapReadGroups(offsets, bps)
+
+    # one contiguous block holds the data of all elements
+    # (elements read by the same ds_read2 need consecutive registers)
+    storeRegBase = self.vgprPool.checkOutAligned(int(rpv)*numReads, int(rpv), "store element d")
+    storeRegs = [storeRegBase + r*int(rpv) for r in range(numReads)]
+
+    # lgkmcnt to wait on before the store of each element:
+    # number of local read instructions issued after the one for the element.
+    # Elements read by the same ds_read2 share a count, and only the first
+    # of them needs the wait.
+    lgkmcnts = [0] * numReads
+    for instIdx, group in enumerate(readGroups):
+      for r in group:
+        lgkmcnts[r] = min(len(readGroups) - instIdx - 1, 15)
 
-    # num registers to check out
-    storeRegs = []
-    for i in range(0, nElements, gwvw):
-      storeRegs.append(self.vgprPool.checkOutAligned(int(rpv), int(rpv), "store element d"))
     src = vgpr(self.storeRemapLR)
-    for rIdx, i in enumerate(range(0, nElements, gwvw)):
-      offset = self.storeRemapLrOffset * bpe * (i//gwvw)
-      dst = vgpr(storeRegs[rIdx], rpv)
-      if bps==4:
-        kStr += inst("ds_read_b32", dst, src, "offset:%u"%offset, "storeRemap lr")
+    for group in readGroups:
+      dst = vgpr(storeRegs[group[0]], rpv*len(group))
+      if len(group) == 2:
+        kl.append(inst("ds_read2_b%u"%(bps*8), dst, src, \
+                     "offset0:%u offset1:%u"%(offsets[group[0]]//bps, offsets[group[1]]//bps), "storeRemap lr"))
+      elif bps==4:
+        kl.append(inst("ds_read_b32", dst, src, "offset:%u"%offsets[group[0]], "storeRemap lr"))
       elif bps==8:
-        kStr += inst("ds_read_b64", dst, src, "offset:%u"%offset, "storeRemap lr")
+        kl.append(inst("ds_read_b64", dst, src, "offset:%u"%offsets[group[0]], "storeRemap lr"))
       elif bps==16:
-        kStr += inst("ds_read_b128", dst, src, "offset:%u"%offset, "storeRemap lr")
+        kl.append(inst("ds_read_b128", dst, src, "offset:%u"%offsets[group[0]], "storeRemap lr"))
       else:
         assert 0, "StoreRemap: bad bps!"
 
-    kStr += "\n"
+    kl.append("\n")
 
     # Global Write
-    ntStr = ""
-    if kernel["NonTemporalC"]%2==1:
-      ntStr += " glc"
-    if kernel["NonTemporalC"]//2==1:
-      ntStr += " slc"
+    ntStr = self.ntStrC
 
     addr1 = sgpr("SrdD", 4)
     packedD1 = kernel["PackedC1IndicesX"]
@@ -8954,89 +9216,108 @@ class KernelWriterAssembly(KernelWriter):
     vTmp = self.vgprPool.checkOut(1, "SR Store temp addr0")
     addr0 = vgpr(vTmp)
 
+    # Rows are nColPerLoad apart, so the row offset (coord1 * StrideD) is
+    # computed once and then stepped by nColPerLoad * StrideD held in an SGPR,
+    # instead of a v_mul_lo_u32 for every row.
+    vRowAddr = self.vgprPool.checkOut(1, "SR Store temp row addr")
+    rowAddr = vgpr(vRowAddr)
+
     if not edge:
-      for rIdx, i in enumerate(range(0, nElements, gwvw)):
-        if i == 0:
-          kStr += inst("v_mov_b32", addr0, vgpr(self.storeRemapOffsetCoord1), "coord1")
-        else:
-          currentStep = i//gwvw
-          kStr += inst("_v_add_u32", addr0, vgpr(self.storeRemapOffsetCoord1), self.storeRemapNCPL * currentStep , "coord1 += nColPerLoad")
+      rowStep = sgpr(tmpS01)
+      kl.append(inst("s_mul_i32", rowStep, sgpr(strideD1), self.storeRemapNCPL, "row step = nColPerLoad * StrideD"))
+      kl.append(inst("v_mul_lo_u32", rowAddr, vgpr(self.storeRemapOffsetCoord1), sgpr(strideD1), "coord1 offset =  coord1 * StrideD"))
 
-        kStr += inst("v_mul_lo_u32", addr0, addr0, sgpr(strideD1), "coord1 offset =  coord1 * StrideD")
-        kStr += inst("_v_add_lshl_u32", addr0, addr0,  vgpr(self.storeRemapCoord0), hex(log2(bpe)), "global write D address")
+      for rIdx, i in enumerate(range(0, nElements, gwvw)):
+        if rIdx > 0:
+          kl.append(inst("_v_add_u32", rowAddr, rowStep, rowAddr, "coord1 offset += nColPerLoad * StrideD"))
+        kl.append(inst("_v_add_lshl_u32", addr0, rowAddr,  vgpr(self.storeRemapCoord0), bpeShift, "global write D address"))
 
-        lgkmcnt = min((nElements-i)//gwvw - 1, 15)
-        kStr += inst("s_waitcnt", "lgkmcnt(%u)"% lgkmcnt, "wait for LDS read" )
+        if rIdx == 0 or lgkmcnts[rIdx] != lgkmcnts[rIdx-1]:
+          kl.append(inst("s_waitcnt", "lgkmcnt(%u)"% lgkmcnts[rIdx], "wait for LDS read" ))
 
         numStoreInst += 1
-        kStr += self.chooseGlobalWrite(True, bps, storeRegs[rIdx], rpv, addr0, addr1, 0, ntStr)
+        kl.append(self.chooseGlobalWrite(True, bps, storeRegs[rIdx], rpv, addr0, addr1, 0, ntStr))
     else:
       tmpS23 = tmpS01+self.laneSGPRCount
+      rowStep = sgpr(tmpS23+self.laneSGPRCount)
       coord0 = tmpVgpr
       coord1 = coord0+1
       lrVw = kernel["StoreRemapVectorWidth"]
       edgeVw = min(kernel["AssertFree0ElementMultiple"],kernel["StoreRemapVectorWidth"])
       bps = self.bpeCexternal * edgeVw
       rpv = self.bpeCexternal / self.bpr * edgeVw
+
+      sizeBoundary = ss.edgeSizeBoundary
+
+      kl.append(inst("s_mul_i32", rowStep, sgpr(strideD1), self.storeRemapNCPL, "row step = nColPerLoad * StrideD"))
+      kl.append(inst("v_mul_lo_u32", rowAddr, vgpr(self.storeRemapOffsetCoord1), sgpr(strideD1), "coord1 element offset =  coord1 * StrideD"))
+
+      # with several edge vectors per row, mask the row's coord1 check into
+      # exec once instead of and-ing it into every coord0 check
+      gateRowByExec = lrVw // edgeVw > 2
+
       for rIdx, i in enumerate(range(0, nElements, lrVw)):
-        for vi in range (0, lrVw, edgeVw):
+        if rIdx == 0 or lgkmcnts[rIdx] != lgkmcnts[rIdx-1]:
+          kl.append(inst("s_waitcnt", "lgkmcnt(%u)"% lgkmcnts[rIdx], "wait for LDS read" ))
+
+        currentStep = i//lrVw
 
-          if vi == 0:
-            lgkmcnt = min((nElements-i)//lrVw - 1, 15)
-            kStr += inst("s_waitcnt", "lgkmcnt(%u)"% lgkmcnt, "wait for LDS read" )
-
-          sizeBoundary = [0,0]
-          sizeBoundary[0] = \
-              sgpr("PackedSize0") if len(kernel["PackedC0IndicesX"]) > 1 \
-              else self.sizeRef(kernel["ProblemType"]["Index0"])
-          sizeBoundary[1] = \
-              sgpr("PackedSize1") if len(kernel["PackedC1IndicesX"]) > 1 \
-              else self.sizeRef(kernel["ProblemType"]["Index1"])
-
-          currentStep = i//lrVw
-
-          # calculate global coordination
-          kStr += inst("_v_add_u32", vgpr(coord1), vgpr(self.storeRemapCoord1), self.storeRemapNCPL * currentStep , "coord1 += nColPerLoad")
-          kStr += inst("_v_add_u32",vgpr(coord0), vgpr(self.storeRemapCoord0), vi , "coord0 += element index of load vector")
-          kStr += inst("_v_add_u32", addr0, vgpr(self.storeRemapOffsetCoord1), self.storeRemapNCPL * currentStep , \
-                        "offset coord1 += nColPerLoad")
-
-          kStr += inst("v_cmp_lt_u32",  sgpr(tmpS01,self.laneSGPRCount), vgpr(coord0), sizeBoundary[0], "coord0 < size0" )
-          kStr += inst("v_cmp_lt_u32",  sgpr(tmpS23,self.laneSGPRCount), vgpr(coord1), sizeBoundary[1], "coord1 < size1" )
-          kStr += inst("s_and_b{}".format(self.kernel["WavefrontSize"]),
+        # calculate global coordination
+        kl.append(inst("_v_add_u32", vgpr(coord1), vgpr(self.storeRemapCoord1), self.storeRemapNCPL * currentStep , "coord1 += nColPerLoad"))
+        if rIdx > 0:
+          kl.append(inst("_v_add_u32", rowAddr, rowStep, rowAddr, "coord1 element offset += nColPerLoad * StrideD"))
+
+        # coord1 is the same for every edge vector in the row, so its bound
+        # check is done once here and only coord0 is compared per vector.
+        kl.append(inst("v_cmp_lt_u32",  sgpr(tmpS23,self.laneSGPRCount), vgpr(coord1), sizeBoundary[1], "coord1 < size1" ))
+        if gateRowByExec:
+          kl.append(inst(self.sAndSaveExecBWf,
                        sgpr(tmpS23,self.laneSGPRCount),
-                       sgpr(tmpS01,self.laneSGPRCount),
-                       sgpr(tmpS23,self.laneSGPRCount), "in0 && in1" )
+                       sgpr(tmpS23,self.laneSGPRCount), "exec &= coord1 < size1, save exec" ))
+
+        for vi in range (0, lrVw, edgeVw):
+
+          kl.append(inst("_v_add_u32",vgpr(coord0), vgpr(self.storeRemapCoord0), vi , "coord0 += element index of load vector"))
+
+          kl.append(inst("v_cmp_lt_u32",  sgpr(tmpS01,self.laneSGPRCount), vgpr(coord0), sizeBoundary[0], "coord0 < size0" ))
+          if not gateRowByExec:
+            kl.append(inst(self.sAndBWf,
+                         sgpr(tmpS01,self.laneSGPRCount),
+                         sgpr(tmpS01,self.laneSGPRCount),
+                         sgpr(tmpS23,self.laneSGPRCount), "in0 && in1" ))
 
-          kStr += inst("v_mul_lo_u32", addr0, addr0, sgpr(strideD1), "coord1 element offset =  coord1 * StrideD")
-          kStr += inst("_v_add_lshl_u32", addr0, addr0,  vgpr(coord0), hex(log2(bpe)), "scale to BPE")
-          kStr += inst("v_cndmask_b32", addr0, -1, addr0, sgpr(tmpS23,self.laneSGPRCount), "clip if OOB. offset" )
+          kl.append(inst("_v_add_lshl_u32", addr0, rowAddr,  vgpr(coord0), bpeShift, "scale to BPE"))
+          kl.append(inst("v_cndmask_b32", addr0, -1, addr0, sgpr(tmpS01,self.laneSGPRCount), "clip if OOB. offset" ))
 
           sumIdx = storeRegs[rIdx] + int(vi*rpe)
           numStoreInst += 1
           if bps == 2:
-            kStr += self.chooseGlobalWrite(True, bpe, sumIdx, rpe, addr0, addr1, 0, ntStr, hi16=vi%2)
+            kl.append(self.chooseGlobalWrite(True, bpe, sumIdx, rpe, addr0, addr1, 0, ntStr, hi16=vi%2))
           else:
-            kStr += self.chooseGlobalWrite(True, bps, sumIdx, rpv, addr0, addr1, 0, ntStr)
+            kl.append(self.chooseGlobalWrite(True, bps, sumIdx, rpv, addr0, addr1, 0, ntStr))
 
-    kStr += "\n"
+        if gateRowByExec:
+          kl.append(inst(self.sMovBWf, self.exec,
+                       sgpr(tmpS23,self.laneSGPRCount), "restore exec" ))
+
+    kl.append("\n")
+    self.vgprPool.checkIn(vRowAddr)
     self.vgprPool.checkIn(vTmp)
-    for v in storeRegs:
-      self.vgprPool.checkIn(v)
+    self.vgprPool.checkIn(storeRegBase)
 
     #Data exchange between different waves
     #Make sure LDS reads are finished of all waves
     if kernel["MIWaveGroup"][0] > 1:
-      kStr += self.indent + self.syncStr + " //wait all lds read finished" + self.endLine
+      kl.append(self.indent + self.syncStr + " //wait all lds read finished" + self.endLine)
 
-    return kStr, numStoreInst
+    return "".join(kl), numStoreInst
 
   ##############################################################################
   # Store remap compute vgprs:
   ##############################################################################
   def storeRemapComputeStoreVgprs(self, kernel):
-    kStr = ""
-    kStr += self.comment1("Store Remap Local Write adderss")
+    kl = []
+    kl.append(self.comment1("Store Remap Local Write adderss"))
 
     tmpS0 = self.getTmpSgpr(2).idx()
     wgMT1 = tmpS0+1
@@ -9062,120 +9343,123 @@ class KernelWriterAssembly(KernelWriter):
 
     gwvw = kernel["StoreRemapVectorWidth"]
     ldsPad = max(kernel["StoreRemapVectorWidth"],kernel["MIOutputVectorWidth"])
+    bpeShift = self.bpeCexternalLog2Hex
 
     #calculate local write Address: v[vgprLocalWriteAddrC]
-    kStr += vectorStaticDivideAndRemainder(tid1, tid0, "Serial", self.kernel["WavefrontSize"]*kernel["MIWaveGroup"][0], \
-      tmpV0, tmpS0)
-
-    kStr += inst("v_mul_lo_u32", vgpr(waveCoord1),
-                  hex(kernel["MatrixInstN"]), vgpr(tid1), "coord1 offset of LDS for each Wave")
-    kStr += inst("v_and_b32", vgpr(tid1),
-                  hex(kernel["MatrixInstN"]-1), vgpr("Serial"), "coord1 offset of LDS for each thread")
-    kStr += inst("_v_add_u32", vgpr(tid1), vgpr(waveCoord1),vgpr(tid1),"coord1 offset in MacroTile")
-    kStr += inst("v_mov_b32", vgpr(ldsStride), hex(kernel["MacroTile0"]+ldsPad), \
-                    "lds stride = MT0 + PAD")
-    kStr += inst("v_mul_lo_u32", vgpr(tmpV0), vgpr(tid1), vgpr(ldsStride), \
-                  "lds coord1 offset = Col-id* lds stride")
-
-    kStr += vectorStaticDivideAndRemainder(waveCoord0, tid0, tid0, self.kernel["WavefrontSize"],tmpV0, tmpS0)
-    kStr += inst("v_lshrrev_b32", vgpr(coord0),
+    kl.append(vectorStaticDivideAndRemainder(tid1, tid0, "Serial", self.kernel["WavefrontSize"]*kernel["MIWaveGroup"][0], \
+      tmpV0, tmpS0))
+
+    kl.append(inst("v_mul_lo_u32", vgpr(waveCoord1),
+                  hex(kernel["MatrixInstN"]), vgpr(tid1), "coord1 offset of LDS for each Wave"))
+    kl.append(inst("v_and_b32", vgpr(tid1),
+                  hex(kernel["MatrixInstN"]-1), vgpr("Serial"), "coord1 offset of LDS for each thread"))
+    kl.append(inst("_v_add_u32", vgpr(tid1), vgpr(waveCoord1),vgpr(tid1),"coord1 offset in MacroTile"))
+    kl.append(inst("v_mov_b32", vgpr(ldsStride), hex(kernel["MacroTile0"]+ldsPad), \
+                    "lds stride = MT0 + PAD"))
+    kl.append(inst("v_mul_lo_u32", vgpr(tmpV0), vgpr(tid1), vgpr(ldsStride), \
+                  "lds coord1 offset = Col-id* lds stride"))
+
+    kl.append(vectorStaticDivideAndRemainder(waveCoord0, tid0, tid0, self.kernel["WavefrontSize"],tmpV0, tmpS0))
+    kl.append(inst("v_lshrrev_b32", vgpr(coord0),
                 hex(log2(kernel["MatrixInstN"])), vgpr(tid0), \
-                "tid / matrixInstN")
+                "tid / matrixInstN"))
 
-    kStr += inst("v_lshlrev_b32", vgpr(coord0), hex(log2(kernel["MIOutputVectorWidth"])), vgpr(coord0), \
-                  "lds coord0 offset *= 4 (each thread hold 4 element)")
+    kl.append(inst("v_lshlrev_b32", vgpr(coord0), hex(log2(kernel["MIOutputVectorWidth"])), vgpr(coord0), \
+                  "lds coord0 offset *= 4 (each thread hold 4 element)"))
 
-    kStr += inst("v_mad_u32_u24", vgpr(coord0), kernel["MatrixInstM"]*kernel["MatrixInstBM"], vgpr(waveCoord0), vgpr(coord0), \
-                  "coord0 += waveCoord0 * wave M shape(blockM*MiM)")
+    kl.append(inst("v_mad_u32_u24", vgpr(coord0), kernel["MatrixInstM"]*kernel["MatrixInstBM"], vgpr(waveCoord0), vgpr(coord0), \
+                  "coord0 += waveCoord0 * wave M shape(blockM*MiM)"))
 
-    kStr += inst("_v_add_lshl_u32", \
+    kl.append(inst("_v_add_lshl_u32", \
       vgpr(storeRemapLW), \
       vgpr(tmpV0), \
       vgpr(coord0), \
-      hex(log2(self.bpeCexternal)), \
-      "local write C address")
+      bpeShift, \
+      "local write C address"))
 
-    kStr += "\n"
+    kl.append("\n")
     # calculate local read address : v[vgprLocalReadAddrC]
 
-    kStr += self.comment1("Store Remap Local Read address")
+    kl.append(self.comment1("Store Remap Local Read address"))
 
-    kStr += vectorStaticDivideAndRemainder(tid1, tid0, "Serial", self.kernel["WavefrontSize"], \
-      tmpV0, tmpS0)
-    kStr += inst("v_mul_lo_u32", vgpr(waveCoord1),
-                  hex(kernel["MatrixInstN"]//kernel["MIWaveGroup"][0]), vgpr(tid1), "coord1 offset of LDS for each Wave")
+    kl.append(vectorStaticDivideAndRemainder(tid1, tid0, "Serial", self.kernel["WavefrontSize"], \
+      tmpV0, tmpS0))
+    kl.append(inst("v_mul_lo_u32", vgpr(waveCoord1),
+                  hex(kernel["MatrixInstN"]//kernel["MIWaveGroup"][0]), vgpr(tid1), "coord1 offset of LDS for each Wave"))
 
     nThreadPerCol = kernel["MacroTile0"] // gwvw
     nColPerLoad = self.kernel["WavefrontSize"] // nThreadPerCol
     self.storeRemapLrOffset = (kernel["MacroTile0"]+ldsPad) * nColPerLoad
     self.storeRemapNCPL = nColPerLoad
+    nThreadPerColShift = hex(log2(nThreadPerCol))
 
-    kStr += inst("v_lshrrev_b32", vgpr(tmpV1),\
-                hex(log2(nThreadPerCol)), vgpr(tid0), \
-                "tid / nThreadPerCol")
-    kStr += inst("_v_add_u32", vgpr(coord1Offset), vgpr(waveCoord1),vgpr(tmpV1),"coord1 offset in MacroTile")
-    kStr += inst("v_mul_lo_u32", vgpr(tmpV0), vgpr(coord1Offset), vgpr(ldsStride), \
-                  "lds coord1 offset = Col-id* lds stride")
+    kl.append(inst("v_lshrrev_b32", vgpr(tmpV1),\
+                nThreadPerColShift, vgpr(tid0), \
+                "tid / nThreadPerCol"))
+    kl.append(inst("_v_add_u32", vgpr(coord1Offset), vgpr(waveCoord1),vgpr(tmpV1),"coord1 offset in MacroTile"))
+    kl.append(inst("v_mul_lo_u32", vgpr(tmpV0), vgpr(coord1Offset), vgpr(ldsStride), \
+                  "lds coord1 offset = Col-id* lds stride"))
 
-    kStr += inst("v_and_b32", vgpr(coord0),
-                  hex(nThreadPerCol-1), vgpr(tid0), "coord0 offset of LDS for each thread")
-    kStr += inst("v_lshlrev_b32", vgpr(coord0), hex(log2(gwvw)), vgpr(coord0), \
-                  "lds coord0 offset *= gwvw (each thread hold gwvw element)")
+    kl.append(inst("v_and_b32", vgpr(coord0),
+                  hex(nThreadPerCol-1), vgpr(tid0), "coord0 offset of LDS for each thread"))
+    kl.append(inst("v_lshlrev_b32", vgpr(coord0), hex(log2(gwvw)), vgpr(coord0), \
+                  "lds coord0 offset *= gwvw (each thread hold gwvw element)"))
 
-    kStr += inst("_v_add_lshl_u32", \
+    kl.append(inst("_v_add_lshl_u32", \
       vgpr(storeRemapLR), \
       vgpr(tmpV0), \
       vgpr(coord0), \
-      hex(log2(self.bpeCexternal)), \
-      "local read C address")
-    kStr += "\n"
+      bpeShift, \
+      "local read C address"))
+    kl.append("\n")
 
     # calculate global write coord0 and coord1
-    kStr += self.comment1("Store Remap global write coord0 and coord1")
-    kStr += vectorStaticDivideAndRemainder(tid1, tid0, "Serial", self.kernel["WavefrontSize"]*kernel["MIWaveGroup"][0], \
-      tmpV0, tmpS0)
+    kl.append(self.comment1("Store Remap global write coord0 and coord1"))
+    kl.append(vectorStaticDivideAndRemainder(tid1, tid0, "Serial", self.kernel["WavefrontSize"]*kernel["MIWaveGroup"][0], \
+      tmpV0, tmpS0))
 
     ColsPerBlockShape = kernel["MatrixInstN"] * kernel["MatrixInstBN"]
 
-    kStr += inst("v_mul_lo_u32", vgpr(waveCoord1),
-                  hex(ColsPerBlockShape), vgpr(tid1), "coord1 offset of global memory for each Wave")
+    kl.append(inst("v_mul_lo_u32", vgpr(waveCoord1),
+                  hex(ColsPerBlockShape), vgpr(tid1), "coord1 offset of global memory for each Wave"))
 
-    kStr += vectorStaticDivideAndRemainder(tid1, tid0, tid0, self.kernel["WavefrontSize"], \
-      tmpV0, tmpS0)
-    kStr += inst("v_mad_u32_u24", vgpr(waveCoord1), kernel["MatrixInstN"]//kernel["MIWaveGroup"][0], vgpr(tid1), vgpr(waveCoord1), \
-                  "waveCoord1 += waveCoord0 * MiN / WaveGroupM")
+    kl.append(vectorStaticDivideAndRemainder(tid1, tid0, tid0, self.kernel["WavefrontSize"], \
+      tmpV0, tmpS0))
+    kl.append(inst("v_mad_u32_u24", vgpr(waveCoord1), kernel["MatrixInstN"]//kernel["MIWaveGroup"][0], vgpr(tid1), vgpr(waveCoord1), \
+                  "waveCoord1 += waveCoord0 * MiN / WaveGroupM"))
 
-    kStr += inst("v_lshrrev_b32", vgpr(tmpV1),\
-                hex(log2(nThreadPerCol)), vgpr(tid0), \
-                "tid / nThreadPerCol")
+    kl.append(inst("v_lshrrev_b32", vgpr(tmpV1),\
+                nThreadPerColShift, vgpr(tid0), \
+                "tid / nThreadPerCol"))
 
-    kStr += inst("_v_add_u32", vgpr(coord1Offset), vgpr(waveCoord1),vgpr(tmpV1),"coord1 offset in MacroTile")
+    kl.append(inst("_v_add_u32", vgpr(coord1Offset), vgpr(waveCoord1),vgpr(tmpV1),"coord1 offset in MacroTile"))
 
-    kStr += inst("s_mul_i32", \
+    kl.append(inst("s_mul_i32", \
         sgpr(tmpS0), \
         hex(kernel["MacroTile0"]), \
         sgpr(wg0), \
-        "%s = wg0*MT0"%sgpr(tmpS0))
+        "%s = wg0*MT0"%sgpr(tmpS0)))
 
-    kStr += inst("_v_add_co_u32", vgpr(tid0), self.vcc, sgpr(tmpS0), vgpr(coord0), "coord0 = coord0 + wg0 * MT0")
+    kl.append(inst("_v_add_co_u32", vgpr(tid0), self.vcc, sgpr(tmpS0), vgpr(coord0), "coord0 = coord0 + wg0 * MT0"))
 
-    kStr += inst("s_mul_i32", \
+    kl.append(inst("s_mul_i32", \
         sgpr(wgMT1), \
         "MT1", \
         sgpr(wg1), \
-        "<- wg1*MT1")
-    kStr += inst("_v_add_co_u32", \
+        "<- wg1*MT1"))
+    kl.append(inst("_v_add_co_u32", \
         vgpr(tid1), \
         self.vcc, \
         sgpr(wgMT1), \
         vgpr(coord1Offset), \
-        "coord1 = tid1*VW + wg1*MT1")
+        "coord1 = tid1*VW + wg1*MT1"))
 
-    kStr += "\n"
+    kl.append("\n")
 
-    kStr += self.syncThreads(kernel, "StoreRemap Start")
+    kl.append(self.syncThreads(kernel, "StoreRemap Start"))
 
     self.storeRemapLW = storeRemapLW  #local write
+    self.storeRemapPendingLW = None
     self.storeRemapLR = storeRemapLR  #local read
     self.storeRemapCoord0 = tid0      #global coord0
     self.storeRemapCoord1 = tid1      #global coord1
@@ -9183,7 +9467,7 @@ class KernelWriterAssembly(KernelWriter):
 
     self.vgprPool.checkIn(tmpV0)
 
-    return kStr
+    return "".join(kl)
 
 
   ##############################################################################
@@ -9197,7 +9481,6 @@ class KernelWriterAssembly(KernelWriter):
   # then calls globalWriteElements to generate the code for the new tiles.
   ##############################################################################
   def notLocalSplitUGlobalWrite(self, kernel):
-    if not self.do["PostLoop"]: return ""
     elements = [[] for y in range(2)] # 2D array for Full, Edge
 
     (fullVw, elements[False]) = self.notLocalFullTileElements(kernel, False)
@@ -9218,8 +9501,6 @@ class KernelWriterAssembly(KernelWriter):
   # LocalSplitU: Global Write
   ##############################################################################
   def localSplitUGlobalWrite(self, kernel):
-    if not self.do["PostLoop"]: return ""
-
     fullVw = kernel["GlobalWriteVectorWidth"] if kernel["_VectorStore"] else 1
     fullVw = min(fullVw, self.maxGwvw(kernel))
     elements = [[] for y in range(2)] # 2D array for Full, Edge
@@ -9266,23 +9547,32 @@ class KernelWriterAssembly(KernelWriter):
     # the generation of the store code.
     ##############################################################################
     class StoreConstConfig:
+      # fixed set of fields, read many times per element during store setup
+      __slots__ = ("gwvw", "numVgprsPerAddr", "numSgprsPerElement", "fixedSgprsPerBatch", \
+                   "numElementsPerBatchLimitedBySgprs", "numVgprsPerDataPerVI", "numVgprsPerDataPerElement", \
+                   "numVgprPerValuC", "halfDataRegPerVI")
+
       def __init__(self, kernelWriter, kernel, ss, gwvw, edge, beta, atomic):
         self.gwvw = gwvw
 
+        bufferStore = kernel["BufferStore"]
+        laneSGPRCount = kernelWriter.laneSGPRCount
+        bpeCexternal = kernelWriter.bpeCexternal
+        bpr = kernelWriter.bpr
 
         if ss.optSingleColVgpr:
           # use one vgpr (allocated in ss.sharedColVgprs) for all addressing
           # - need 0 additional vgpr per element.
           self.numVgprsPerAddr = 0
         else:
-          self.numVgprsPerAddr = kernelWriter.rpgo if kernel["BufferStore"] else kernelWriter.rpga
+          self.numVgprsPerAddr = kernelWriter.rpgo if bufferStore else kernelWriter.rpga
 
         if ss.optSharedMask:
           self.numSgprsPerElement = 0
-          self.fixedSgprsPerBatch = kernelWriter.laneSGPRCount
+          self.fixedSgprsPerBatch = laneSGPRCount
         else:
-          self.numSgprsPerElement = kernelWriter.laneSGPRCount
-          self.fixedSgprsPerBatch = 3*kernelWriter.laneSGPRCount
+          self.numSgprsPerElement = laneSGPRCount
+          self.fixedSgprsPerBatch = 3*laneSGPRCount
 
         if self.numSgprsPerElement:
           numSgprAvailable = kernelWriter.maxSgprs - kernelWriter.sgprPool.size() + kernelWriter.sgprPool.availableBlockAtEnd()
@@ -9300,19 +9590,22 @@ class KernelWriterAssembly(KernelWriter):
 
         if atomic:
           # flat atomics have another VGPR to allow different data for return#
-          regsPerElement = 2 if kernel["BufferStore"] else 3
+          regsPerElement = 2 if bufferStore else 3
           # The atomic loop processes multiple elements in single instruction
           # so will use VGPR from consec elements? TODO
-          self.numVgprsPerDataPerVI = (1.0 * regsPerElement * kernelWriter.bpeCexternal) / kernelWriter.bpr
+          dataBytesPerVI = regsPerElement * bpeCexternal
         elif beta:
-          self.numVgprsPerDataPerVI = (1.0 * kernelWriter.bpeCexternal) / kernelWriter.bpr
+          dataBytesPerVI = bpeCexternal
         else:
-          self.numVgprsPerDataPerVI = 0.0
+          dataBytesPerVI = 0
+        self.numVgprsPerDataPerVI = (1.0 * dataBytesPerVI) / bpr
+        # ceil(numVgprsPerDataPerVI * gwvw), kept in integers
+        self.numVgprsPerDataPerElement = (dataBytesPerVI * gwvw + bpr - 1) // bpr
 
         if kernelWriter.serializedStore:
           assert(kernel["EnableMatrixInstruction"]==True)
           #self.numVgprPerValuC = kernel["MIRegPerOut"]
-          self.numVgprPerValuC = kernelWriter.bpeCinternal//kernelWriter.bpr # vgpr needed from register pool
+          self.numVgprPerValuC = kernelWriter.bpeCinternal//bpr # vgpr needed from register pool
         else:
           self.numVgprPerValuC = 0 # null since they are already declared in macro part of assembly kernel
 
@@ -9389,6 +9682,28 @@ class KernelWriterAssembly(KernelWriter):
 
       self.cfg = self.StoreConstConfig(kernelWriter, kernel, self, gwvw, edge, beta, atomic)
 
+      # size and stride operands of the packed coord0 dims are fixed for the
+      # whole store, look them up once instead of per element
+      packedC0Indices = kernel["PackedC0IndicesX"]
+      self.packedC0SizeRefs = [kernelWriter.sizeRef(idx) for idx in packedC0Indices]
+      self.packedC0StrideRefs = {tc: [kernelWriter.strideRef(tc, idx) for idx in packedC0Indices] \
+                                 for tc in ['C','D']}
+
+      # per-element address setup/edge protection decisions that only depend
+      # on the kernel and the edge/beta/atomic variant of this store
+      # buffer edge: clip OOB addresses to -1 (StoreRemap does its own D checks)
+      self.bufferEdgeClip = kernel["BufferStore"] and edge and \
+          (not kernel["StoreRemapVectorWidth"] or beta)
+      self.edgeSizeBoundary = [ \
+          sgpr("PackedSize0") if len(kernel["PackedC0IndicesX"]) > 1 \
+          else kernelWriter.sizeRef(kernel["ProblemType"]["Index0"]), \
+          sgpr("PackedSize1") if len(kernel["PackedC1IndicesX"]) > 1 \
+          else kernelWriter.sizeRef(kernel["ProblemType"]["Index1"])]
+      self.updateCoord1 = edge or len(kernel["PackedC1IndicesX"]) > 1
+      # MFMA shift pointer for partial B vectors on edge
+      self.shiftPointerMI = not kernel["GuaranteeNoPartialB"] and kernelWriter.readTileDimVectorB and \
+          kernel["EnableMatrixInstruction"] and edge
+
       # Use to detect new rows:
       self.lastCoordOffset1 = 0
 
@@ -9409,10 +9724,22 @@ class KernelWriterAssembly(KernelWriter):
       # For detecting when we are running first batch
       self.firstBatch = True
 
+      # HPA bf16 constants this path uses, loaded by the first batch for the whole path:
+      # the mask converts C for beta, tmp/nan/rounding bias/perm selector round and
+      # pack unless v_cvt_pk_bf16_f32 does it (same test as globalWriteBatch)
+      self.numBf16Consts = 0
+      if kernel["ProblemType"]["DestDataType"].isBFloat16() and kernel["ProblemType"]["HighPrecisionAccumulate"] \
+          and not atomic:
+        cvtPkBF16 = kernelWriter.asmCaps["v_cvt_pk_bf16_f32"] and gwvw % 2 == 0
+        self.numBf16Consts = (1 if beta else 0) + (0 if cvtPkBF16 else 4)
+      self.vgprBf16Consts = []
+
 
     ##############################################################################
     # Setup data structures to feed store loops:
     #   self.elementAddr, self.elementData, self.elementMask, self.elementSumIdx
+    #   self.elementAddrVgpr
+    #   self.elementCoordOffset0, self.elementCoordOffset1, self.elementRowInc
     # batchElements is a list of (d0,d1,v0,v1) for which stores to perform
     # batchElementSgprs is SGPRs to use for mask.  If None, elementMask is
     #  not initialized.
@@ -9421,15 +9748,91 @@ class KernelWriterAssembly(KernelWriter):
     ##############################################################################
     def setupStoreElementsForBatch(self, kernel, gwvw, batchElements, batchElementSgprs, isOptNLL):
 
-      self.elementAddr = []
-      self.elementData = []  # VGPR to use for element data, needed for atomic or beta
-      self.elementMask = []  # SGPR to use for element mask
-      self.elementSumIdx = []
+      numElements = len(batchElements)
+      self.elementAddr = [None] * numElements
+      self.elementAddrVgpr = [None] * numElements # addrVgpr of elementAddr, for loops that only need the vgpr
+      self.elementData = [0] * numElements  # VGPR to use for element data, needed for atomic or beta
+      self.elementMask = [0] * numElements if batchElementSgprs != None else []  # SGPR to use for element mask
+      self.elementSumIdx = [0] * numElements
+      self.elementRowInc = [0] * numElements
 
       kw = self.kernelWriter
 
-      lastData = 0
-      for elementIdx in range(0, len(batchElements)):
+      # kernel parameters used by the per-element coord offset math
+      isMI = kernel["EnableMatrixInstruction"]
+      vectorWidth = kernel["VectorWidth"]
+      if isMI:
+        miM = kernel["MatrixInstM"]
+        miN = kernel["MatrixInstN"]
+        miBM = kernel["MatrixInstBM"]
+        miBN = kernel["MatrixInstBN"]
+        miWaveGroup0, miWaveGroup1 = kernel["MIWaveGroup"]
+        miWaveTile0, miWaveTile1 = kernel["MIWaveTile"]
+        miOutputVectorWidth = kernel["MIOutputVectorWidth"]
+        sourceSwap = kernel["SourceSwap"]
+        waveSize = self.kernel["WavefrontSize"]
+        isDouble = kernel["ProblemType"]["DataType"].isDouble()
+        OutputsPerMIMN = miM * miN // waveSize
+        # sumIdx distance between consecutive d1
+        if miM == 4:
+          d1_stride = miOutputVectorWidth * miWaveTile0
+        else:
+          d1_stride = OutputsPerMIMN * miBM * miWaveTile0
+      else:
+        subGroup0 = kernel["SubGroup0"]
+        threadTile0 = kernel["ThreadTile0"]
+        if kernel["LocalSplitU"] > 1:
+          strideD1 = (kernel["NumThreads"]*vectorWidth//kernel["MacroTile0"])
+        else:
+          strideD1 = (kernel["SubGroup1"] * vectorWidth)
+
+      # The coord offsets only depend on the element tuple, so compute them for
+      # the whole batch up front, picking the layout branch once per batch
+      coordOffsets1 = [0] * numElements
+      coordOffsets0 = [0] * numElements
+      if isMI and miM == 4:
+        coord1Stride = miN * miBN * miWaveGroup1
+        coord0Stride = miM * miBM * miWaveGroup0
+        for elementIdx, (d1,d0,vc1,vc0) in enumerate(batchElements):
+          coordOffsets1[elementIdx] = d1 * coord1Stride + vc1
+          coordOffsets0[elementIdx] = d0 * coord0Stride + vc0
+      elif isMI:
+        MFMAContinuousOutputs = miOutputVectorWidth
+        numEIdx0              = OutputsPerMIMN // MFMAContinuousOutputs
+        eIdx0Stride           = (waveSize // miN) * MFMAContinuousOutputs
+        wtIdex1Stride         = miN * miBN * miWaveGroup1
+        wtIdex0Stride         = miM * miBM * miWaveGroup0
+        vc0Scale0             = 4 if isDouble else 1
+        for elementIdx, (d1,d0,vc1,vc0) in enumerate(batchElements):
+          bIdx1  = d1 % miBN
+          wtIdex = (d1 // miBN) % miWaveTile1
+          coordOffsets1[elementIdx] = bIdx1 * miN + wtIdex * wtIdex1Stride + \
+                                      (vc0 * 4 if sourceSwap else vc1)
+
+          eIdx0     = d0 % numEIdx0
+          remain_d0 = d0 // numEIdx0
+          bIdx0     = remain_d0 % miBM
+          wtIdex    = (remain_d0 // miBM) % miWaveTile0
+          coordOffsets0[elementIdx] = eIdx0 * eIdx0Stride + bIdx0 * miM + wtIdex * wtIdex0Stride + \
+                                      (vc1 if sourceSwap else vc0 * vc0Scale0)
+      else:
+        coord0Stride = subGroup0 * vectorWidth
+        for elementIdx, (d1,d0,vc1,vc0) in enumerate(batchElements):
+          coordOffsets1[elementIdx] = d1 * strideD1 + vc1
+          coordOffsets0[elementIdx] = d0 * coord0Stride + vc0
+      # per-element coord offsets, parallel to elementAddr
+      self.elementCoordOffset0 = coordOffsets0
+      self.elementCoordOffset1 = coordOffsets1
+
+      # VGPR checkouts are queued in element order and done together after the
+      # loop: (elementIdx, request index) for addr, data and sumIdx
+      vgprRequests = []
+      addrRequests = []
+      dataRequests = []
+      sumIdxRequests = []
+
+      pairData = None
+      for elementIdx in range(0, numElements):
         # Create the AddrCalc for each memory load/store
         # This is the control code that sets up the dest, source, offsets, etc and
         # identifies cases where the AddrCalc is a new row and therefore needs some
@@ -9445,73 +9848,35 @@ class KernelWriterAssembly(KernelWriter):
         element = batchElements[elementIdx]
         (d1,d0,vc1,vc0) = element
 
-        coordOffset1 = 0
-        if kernel["EnableMatrixInstruction"]:
-          if kernel["MatrixInstM"] == 4:
-            coordOffset1 = d1 * kernel["MatrixInstN"] *  kernel["MatrixInstBN"] * kernel["MIWaveGroup"][1] + vc1
-          else:
-            bIdx1  = d1 % kernel["MatrixInstBN"]
-            wtIdex = (d1 // kernel["MatrixInstBN"]) % kernel["MIWaveTile"][1]
-
-            coordOffset1  = bIdx1 * kernel["MatrixInstN"]
-            coordOffset1 += wtIdex * kernel["MatrixInstN"] *  kernel["MatrixInstBN"] * kernel["MIWaveGroup"][1]
-            if kernel["SourceSwap"]:
-              coordOffset1 += vc0 * 4
-            else:
-              coordOffset1 += vc1
-        else:
-          if kernel["LocalSplitU"] > 1:
-            strideD1 = (kernel["NumThreads"]*kernel["VectorWidth"]//kernel["MacroTile0"])
-          else:
-            strideD1 = (kernel["SubGroup1"] * kernel["VectorWidth"])
-          coordOffset1 = d1 * strideD1 + vc1
-
+        coordOffset1 = coordOffsets1[elementIdx]
         newCoord1 = (self.firstBatch and elementIdx==0) or (coordOffset1 != self.lastCoordOffset1)
 
         # gpr and offset assignments for element
-        coordOffset0 = 0
-        if kernel["EnableMatrixInstruction"]:
-          if kernel["MatrixInstM"] == 4:
-            coordOffset0 = d0 * kernel["MatrixInstM"] *  kernel["MatrixInstBM"] * kernel["MIWaveGroup"][0] + vc0
-          else:
-            MFMAContinuousOutputs = kernel["MIOutputVectorWidth"]
-            OutputsPerMIMN        = kernel["MatrixInstM"] * kernel["MatrixInstN"] // self.kernel["WavefrontSize"]
-
-            eIdx0        = d0 % (OutputsPerMIMN // MFMAContinuousOutputs)
-            remain_d0    = d0 // (OutputsPerMIMN // MFMAContinuousOutputs)
-            bIdx0        = remain_d0 % kernel["MatrixInstBM"]
-            remain_d0    = remain_d0 // kernel["MatrixInstBM"]
-            wtIdex       = remain_d0 % kernel["MIWaveTile"][0]
-
-            coordOffset0  = eIdx0  * (self.kernel["WavefrontSize"] // kernel["MatrixInstN"]) * MFMAContinuousOutputs
-            coordOffset0 += bIdx0  * kernel["MatrixInstM"]
-            coordOffset0 += wtIdex * kernel["MatrixInstM"] *  kernel["MatrixInstBM"] * kernel["MIWaveGroup"][0]
-            if kernel["SourceSwap"]:
-              coordOffset0 += vc1
-            else:
-              coordOffset0 += vc0    * (4 if kernel["ProblemType"]["DataType"].isDouble() else 1)
-        else:
-          coordOffset0 = d0 * kernel["SubGroup0"]*kernel["VectorWidth"] + vc0
+        coordOffset0 = coordOffsets0[elementIdx]
 
         if self.optSingleColVgpr:
           # use same address vgpr for all
           addr = self.sharedColVgprs
         elif self.optSharedColVgpr:
-          if kernel["EnableMatrixInstruction"]:
-            elementCol = (d0 * kernel["MIOutputVectorWidth"] + vc0) / gwvw
+          if isMI:
+            elementCol, colRem = divmod(d0 * miOutputVectorWidth + vc0, gwvw)
           else:
-            elementCol = (d0 * kernel["VectorWidth"] + vc0) / gwvw
-          assert (modf(elementCol)[0] < 0.001)
-          elementCol = trunc(elementCol)
+            elementCol, colRem = divmod(d0 * vectorWidth + vc0, gwvw)
+          assert (colRem == 0)
           addr = self.sharedColVgprs+elementCol
           #print ("d0=", d0, "vc0=", vc0, "elementCol=", elementCol)
         else:
           # allocate new VGPR for each element:
-          addr = kw.vgprPool.checkOutAligned(self.cfg.numVgprsPerAddr, \
-              int(ceil(self.cfg.numVgprsPerAddr)), "writeBatch-addr for ei=%u"%(elementIdx), preventOverflow=not isOptNLL)
-
-        self.elementAddr.append(kw.AddrCalc(kw, self, addr, element, coordOffset0, \
-          self.kernelWriter.coord1, coordOffset1, coordOffset1 - self.lastCoordOffset1, newCoord1))
+          addr = None
+          addrRequests.append((elementIdx, len(vgprRequests)))
+          vgprRequests.append((self.cfg.numVgprsPerAddr, \
+              int(ceil(self.cfg.numVgprsPerAddr)), "writeBatch-addr for ei=%u"%(elementIdx), not isOptNLL))
+
+        rowInc = coordOffset1 - self.lastCoordOffset1
+        self.elementRowInc[elementIdx] = rowInc
+        self.elementAddrVgpr[elementIdx] = addr
+        self.elementAddr[elementIdx] = kw.AddrCalc(kw, self, addr, element, coordOffset0, \
+          self.kernelWriter.coord1, coordOffset1, rowInc, newCoord1)
         # if numVgprsPerDataPerVI == 0.5, then two consecutive elements
         # should have same data pointer, next should move.
 
@@ -9520,65 +9885,70 @@ class KernelWriterAssembly(KernelWriter):
             # TODO- check (H,H,H,H,S,S)
             if kernel["ProblemType"]["HighPrecisionAccumulate"] and \
                (kernel["ProblemType"]["DataType"].isBFloat16() or kernel["ProblemType"]["DataType"].isHalf()):
-              data = kw.vgprPool.checkOutAligned(int(2*self.cfg.numVgprsPerDataPerVI*self.cfg.gwvw), \
-                    int(ceil(int(2*self.cfg.numVgprsPerDataPerVI*self.cfg.gwvw))), "writeBatch-data for ei=%u and ei=%u"%(elementIdx,elementIdx+1), preventOverflow=not isOptNLL)
+              data = len(vgprRequests)
+              vgprRequests.append((int(2*self.cfg.numVgprsPerDataPerVI*self.cfg.gwvw), \
+                    int(ceil(int(2*self.cfg.numVgprsPerDataPerVI*self.cfg.gwvw))), "writeBatch-data for ei=%u and ei=%u"%(elementIdx,elementIdx+1), not isOptNLL))
             else:
               if elementIdx%2 == 0:
                 # allocate for two elements:
-                data = kw.vgprPool.checkOutAligned(int(2*self.cfg.numVgprsPerDataPerVI*self.cfg.gwvw), \
-                       int(ceil(int(2*self.cfg.numVgprsPerDataPerVI*self.cfg.gwvw))), "writeBatch-data for ei=%u and ei=%u"%(elementIdx,elementIdx+1), preventOverflow=not isOptNLL)
-                lastData = data
+                data = len(vgprRequests)
+                vgprRequests.append((int(2*self.cfg.numVgprsPerDataPerVI*self.cfg.gwvw), \
+                       int(ceil(int(2*self.cfg.numVgprsPerDataPerVI*self.cfg.gwvw))), "writeBatch-data for ei=%u and ei=%u"%(elementIdx,elementIdx+1), not isOptNLL))
+                pairData = data
               else:
-                data = lastData
-                del lastData
+                data = pairData
           else:
-            data = kw.vgprPool.checkOutAligned(int(self.cfg.numVgprsPerDataPerVI*self.cfg.gwvw), \
-                  int(ceil(self.cfg.numVgprsPerDataPerVI*self.cfg.gwvw)), "writeBatch-data for ei=%u"%elementIdx, preventOverflow=False)
+            data = len(vgprRequests)
+            vgprRequests.append((int(self.cfg.numVgprsPerDataPerVI*self.cfg.gwvw), \
+                  self.cfg.numVgprsPerDataPerElement, "writeBatch-data for ei=%u"%elementIdx, False))
             #data = kw.vgprPool.checkOut(int(self.cfg.numVgprsPerDataPerVI*self.cfg.gwvw), \
             #      "writeBatch-data for ei=%u"%elementIdx, preventOverflow=False)
+          dataRequests.append((elementIdx, data))
         else:
           data = 0
 
-        self.elementData.append(data)
+        self.elementData[elementIdx] = data
         if batchElementSgprs != None:
           mask = batchElementSgprs + elementIdx * self.cfg.numSgprsPerElement # elementSgprs+0
-          self.elementMask.append(mask)
+          self.elementMask[elementIdx] = mask
 
         #print "Edge=", edge, element
         sumIdx = 0
         if kernel["LocalSplitU"] > 1:
-          sumIdx = kw.startVgprValuC + vc0 + d1*kernel["VectorWidth"]
+          sumIdx = kw.startVgprValuC + vc0 + d1*vectorWidth
         else:
-          bestVw = kernel["VectorWidth"]
-          elementsLoadedPerVw = kernel["NumThreads"]*bestVw
-          elementsLoadedPerbestVw = kernel["NumThreads"]*kernel["StoreVectorWidth"]
-          if elementsLoadedPerVw < elementsLoadedPerbestVw:
-            bestVw = kernel["StoreVectorWidth"]
-          if kernel["EnableMatrixInstruction"]:
+          if isMI:
             if kw.serializedStore:
               alignment = self.cfg.numVgprPerValuC * self.cfg.gwvw
-              sumIdx    = kw.vgprPool.checkOutAligned(self.cfg.numVgprPerValuC*self.cfg.gwvw, alignment, "vgprValuC")//self.cfg.numVgprPerValuC
+              sumIdxRequests.append((elementIdx, len(vgprRequests)))
+              vgprRequests.append((self.cfg.numVgprPerValuC*self.cfg.gwvw, alignment, "vgprValuC", -1))
               # print("checked out vgpr %u"%sumIdx)
               # print(kw.vgprPool.state())
-            elif kernel["MatrixInstM"] == 4:
-              sumIdx    = kw.startVgprValuC + vc0 + (d0 * kernel["MIOutputVectorWidth"]) + d1 * (kernel["MIOutputVectorWidth"] * kernel["MIWaveTile"][0])
             else:
-              d1_stride = ((kernel["MatrixInstM"] * kernel["MatrixInstN"]) // self.kernel["WavefrontSize"]) * kernel["MatrixInstBM"] * kernel["MIWaveTile"][0]
-              sumIdx    = kw.startVgprValuC + vc0 + (d0 * kernel["MIOutputVectorWidth"]) + (d1 * d1_stride)
+              sumIdx    = kw.startVgprValuC + vc0 + (d0 * miOutputVectorWidth) + (d1 * d1_stride)
           else:
-            sumIdx = kw.startVgprValuC + vc0 + d0*kernel["VectorWidth"] + vc1*kernel["ThreadTile0"] + d1*kernel["VectorWidth"]*kernel["ThreadTile0"]
-        self.elementSumIdx.append(sumIdx) # sumIdx is an element idx, need to div/2 for half
+            sumIdx = kw.startVgprValuC + vc0 + d0*vectorWidth + vc1*threadTile0 + d1*vectorWidth*threadTile0
+        self.elementSumIdx[elementIdx] = sumIdx # sumIdx is an element idx, need to div/2 for half
         self.lastCoordOffset1 = coordOffset1
 
+      if vgprRequests:
+        starts = kw.vgprPool.checkOutManyAligned(vgprRequests)
+        for (elementIdx, r) in addrRequests:
+          self.elementAddr[elementIdx].addrVgpr = starts[r]
+          self.elementAddrVgpr[elementIdx] = starts[r]
+        for (elementIdx, r) in dataRequests:
+          self.elementData[elementIdx] = starts[r]
+        for (elementIdx, r) in sumIdxRequests:
+          self.elementSumIdx[elementIdx] = starts[r]//self.cfg.numVgprPerValuC
+
     def checkInTempVgprC(self):
       if self.kernelWriter.serializedStore is False:
         return # early exit; currently only serializedStore==True checks out C-tile from register pool
 
       assert(self.kernelWriter.overlapVgprC) # sanity check
       if len(self.elementSumIdx) > 0:
-        for i in self.elementSumIdx:
-          self.kernelWriter.vgprPool.checkIn(i * self.cfg.numVgprPerValuC)
-          # print("checked in vgpr %u"%i)
+        numVgprPerValuC = self.cfg.numVgprPerValuC
+        self.kernelWriter.vgprPool.checkInMulti([i * numVgprPerValuC for i in self.elementSumIdx])
         self.elementSumIdx = []
 
     def __del__(self):
@@ -9596,6 +9966,11 @@ class KernelWriterAssembly(KernelWriter):
     #    packed index for the 0 coordinate of the C/D matrix.
     # coord1Vgpr : VGPR which tracks the last coord1 calculation.
     #          If this is new coord1, just overwrite it with latest calc.
+    # one is created per store element, no __dict__ needed
+    __slots__ = ("kernelWriter", "addrVgpr", "coord0Vgpr", "coord1Vgpr", "element", \
+                 "coordOffset0", "coordOffset1", "rowInc", "rowIncDirtyRowPtr", "newCoord1", \
+                 "globalOffset")
+
     def __init__(self, kernelWriter, ss, addrVgpr, element, \
         coordOffset0, coord1Vgpr, coordOffset1, rowInc, newCoord1):
       self.kernelWriter = kernelWriter
@@ -9642,15 +10017,15 @@ class KernelWriterAssembly(KernelWriter):
         - tmpVgpr is a 1 temporary VGPR used for coord0 calculation on edges
       """
 
-      kStr = ""
+      kl = []
       kw = self.kernelWriter
       (d1,d0,vc1,vc0) = self.element
       self.coord0Vgpr = None # will set below
 
       #kStr += self.kernelWriter.comment1("store addr=v%u coordOffset0=%u"% \
       #    (self.addr, self.coordOffset0))
-      kStr += self.kernelWriter.comment1("(d1,vc1,d0,vc0)=(%u,%u,%u,%u)"\
-          % (d1,vc1,d0,vc0))
+      kl.append(self.kernelWriter.comment1("(d1,vc1,d0,vc0)=(%u,%u,%u,%u)"\
+          % (d1,vc1,d0,vc0)))
       if ss.optSingleColVgpr:
         self.coord0Vgpr = kw.coord0
       elif not ss.optSharedColVgpr or (d1 == vc1 == 0):
@@ -9658,40 +10033,40 @@ class KernelWriterAssembly(KernelWriter):
 
         if self.coordOffset0 == 0:
           self.coord0Vgpr = kw.coord0
-        elif self.coordOffset0 <= 64:
-          self.coord0Vgpr = tmpVgpr
-          kStr += inst("_v_add_co_u32", vgpr(self.coord0Vgpr), self.kernelWriter.vcc, vgpr(kw.coord0), self.coordOffset0, \
-                    "coord0.1: coord0 += d0*sg0*VW + vc0")
         else:
           self.coord0Vgpr = tmpVgpr
-          kStr += inst("s_mov_b32", sgpr(tmpS01), self.coordOffset0, "coordOffset0 d0=%u vc0=%u"%(d0, vc0))
-          kStr += inst("_v_add_co_u32", vgpr(self.coord0Vgpr), self.kernelWriter.vcc, vgpr(kw.coord0), sgpr(tmpS01), \
-                    "coord0.2: coord0 += d0*sg0*VW + vc0")
+          kl.append(self.emitCoordAdd(self.coord0Vgpr, kw.coord0, self.coordOffset0, \
+                    "coord0.1: coord0 += d0*sg0*VW + vc0"))
 
         if self.newCoord1:
           if not kernel["BufferStore"] or updateCoord1:
-            if self.rowInc== 0:
-              None
-            elif self.rowInc <= 64:
-              # rowInc fits in instruction:
-              kStr += inst("_v_add_co_u32", vgpr(self.coord1Vgpr), self.kernelWriter.vcc, \
-                        vgpr(self.kernelWriter.coord1), self.rowInc, \
-                        "coord1.1: coord1Vgpr += d1*sg1*VW + vc1")
-            else:
-              kStr += inst("s_mov_b32", sgpr(tmpS01), self.rowInc, "rowInc d1=%u vc1=%u"%(d0, vc0))
-              kStr += inst("_v_add_co_u32", vgpr(self.coord1Vgpr), self.kernelWriter.vcc, \
-                        vgpr(self.kernelWriter.coord1), sgpr(tmpS01), \
-                        "coord1.2: coord1 += d1*sg1*VW + vc1")
-      return kStr
+            kl.append(self.emitCoordAdd(self.coord1Vgpr, kw.coord1, self.rowInc, \
+                      "coord1.1: coord1Vgpr += d1*sg1*VW + vc1"))
+      return "".join(kl)
+
+    def emitCoordAdd(self, dstVgpr, srcVgpr, offset, comment):
+      """
+      Emit dst = src + offset, or nothing for a zero offset.
+      The offset goes in src0, which takes an inline constant or a literal,
+      so no s_mov is needed for offsets above 64.
+      """
+      return coordAddCode(self.kernelWriter.vcc, dstVgpr, srcVgpr, offset, comment)
 
     # storeChar is 'C' or 'D'
     # elementVgpr is coord0Vgpr*strideCD0, or optimized to just coord0Vgpr if strideCD0 is unit const
     def emitExtractAndScalePackedDims(self, kernel, ss, tmpVgpr, storeChar):
-      kStr = ""
+      kl = []
       kw = self.kernelWriter
       packedIndices = kernel["PackedC0IndicesX"]
       packedBits = self.coord0Vgpr # start with coord0, will move to temp below
       rowPtr = kw.cinRowPtr if (storeChar == 'C') else kw.coutRowPtr
+      sizeRefs = ss.packedC0SizeRefs
+      strideRefs = ss.packedC0StrideRefs[storeChar]
+      # register operands are the same for every packed dim
+      addrV = vgpr(self.addrVgpr)
+      tmpV0 = vgpr(tmpVgpr+0)
+      tmpV1 = vgpr(tmpVgpr+1)
+      tmpV2 = vgpr(tmpVgpr+2)
 
       for i,idx in enumerate(packedIndices[:-1]):
         # vgprTmp assignments:
@@ -9699,57 +10074,58 @@ class KernelWriterAssembly(KernelWriter):
         #   - tmp+1 is DIV output
         #   - tmp+2 is scratch
         idxChar= globalParameters["IndexChars"][idx]
-        kStr += kw.comment1("extract %s"%kw.sizeRef(idx))
+        sizeIdx = sizeRefs[i]
+        kl.append(kw.comment1("extract %s"%sizeIdx))
         assert(tmpVgpr+1 != packedBits) # bad since we still need packedBits below for remainder (can't overwrite here)
-        kStr += "V_MAGIC_DIV %s, %s, %s, %s, %s\n" % \
+        kl.append("V_MAGIC_DIV %s, %s, %s, %s, %s\n" % \
                  (tmpVgpr+1, vgpr(packedBits), sgpr("MagicNumberSize%s"%idxChar), \
-                  sgpr("MagicShiftSize%s"%idxChar), sgpr("MagicAbitSize%s"%idxChar) if kernel["MagicDivAlg"]==2 else "0")
+                  sgpr("MagicShiftSize%s"%idxChar), sgpr("MagicAbitSize%s"%idxChar) if kernel["MagicDivAlg"]==2 else "0"))
         # tmpVgpr+1 returns the quotient, tmpVgpr+2 is overwritten
 
         # compute remainder, packedBits % sizeIdx - this is the 'extracted' index that must be scaled
         # remainder is mul and sub
-        kStr += inst("v_mul_lo_u32", vgpr(tmpVgpr+2), vgpr(tmpVgpr+1), kw.sizeRef(idx), \
-                     "remainder part 1")
-        kStr += inst("_v_sub_u32", vgpr(tmpVgpr+2), vgpr(packedBits), vgpr(tmpVgpr+2),
-                      "remainder part 2")
+        kl.append(inst("v_mul_lo_u32", tmpV2, tmpV1, sizeIdx, \
+                     "remainder part 1"))
+        kl.append(inst("_v_sub_u32", tmpV2, vgpr(packedBits), tmpV2,
+                      "remainder part 2"))
 
         if i==0:
-          kStr += inst("v_mul_lo_u32", vgpr(self.addrVgpr), vgpr(tmpVgpr+2), \
-                    kw.strideRef(storeChar, idx), "addrCalc <- scaled extracted dim")
+          kl.append(inst("v_mul_lo_u32", addrV, tmpV2, \
+                    strideRefs[i], "addrCalc <- scaled extracted dim"))
         else:
-          kStr += inst("v_mul_lo_u32", vgpr(tmpVgpr+2), vgpr(tmpVgpr+2), \
-                    kw.strideRef(storeChar, idx), "scale extracted dim")
-          kStr += inst("_v_add_u32", vgpr(self.addrVgpr), vgpr(self.addrVgpr), \
-                    vgpr(tmpVgpr+2), "addrCalc += scaled extracted dim ")
+          kl.append(inst("v_mul_lo_u32", tmpV2, tmpV2, \
+                    strideRefs[i], "scale extracted dim"))
+          kl.append(inst("_v_add_u32", addrV, addrV, \
+                    tmpV2, "addrCalc += scaled extracted dim "))
 
         if i < len(packedIndices)-2:
           # TODO - might be able to eliminate this
-          kStr += inst("v_mov_b32", vgpr(tmpVgpr+0), vgpr(tmpVgpr+1), \
-                    "Copy remaining bits for next divide")
+          kl.append(inst("v_mov_b32", tmpV0, tmpV1, \
+                    "Copy remaining bits for next divide"))
           packedBits = tmpVgpr+0
 
       if len(packedIndices)>1:
         # if we unpacked something, then scale it to BPE
-        kStr += kw.comment1("extract final %s"%kw.sizeRef(packedIndices[-1]))
-        kStr += inst("v_mul_lo_u32", vgpr(tmpVgpr+2), vgpr(tmpVgpr+1), \
-                  kw.strideRef(storeChar, packedIndices[-1]), "scale final extracted dim")
-        kStr += inst("_v_add_u32", vgpr(self.addrVgpr), vgpr(self.addrVgpr), \
-                  vgpr(tmpVgpr+2), "addrCalc += scaled extracted dim ")
+        kl.append(kw.comment1("extract final %s"%sizeRefs[-1]))
+        kl.append(inst("v_mul_lo_u32", tmpV2, tmpV1, \
+                  strideRefs[-1], "scale final extracted dim"))
+        kl.append(inst("_v_add_u32", addrV, addrV, \
+                  tmpV2, "addrCalc += scaled extracted dim "))
 
-        kStr += inst("_v_add_lshl_u32", vgpr(self.addrVgpr), \
+        kl.append(inst("_v_add_lshl_u32", addrV, \
                   vgpr(rowPtr), \
-                  vgpr(self.addrVgpr), \
-                  hex(log2(kw.bpeCexternal)), \
-                  "packed: add rowPtr and scaleToBpe")
+                  addrV, \
+                  kw.bpeCexternalLog2Hex, \
+                  "packed: add rowPtr and scaleToBpe"))
 
-      return kStr
+      return "".join(kl)
 
     def emitScaleToBpe(self, kernel, ss, tmpVgpr, singleUpdate, tc):
       """
       Needs 3 temporary VGPRs
       """
 
-      kStr = ""
+      kl = []
       kw = self.kernelWriter
       (d1,d0,vc1,vc0) = self.element
       rowPtr = kw.cinRowPtr if (tc == 'C') else kw.coutRowPtr
@@ -9762,11 +10138,11 @@ class KernelWriterAssembly(KernelWriter):
       if kw.isConstUnitStride(stride0):
         elementVgpr = self.coord0Vgpr
       else:
-        kStr += inst("v_mul_lo_u32", \
+        kl.append(inst("v_mul_lo_u32", \
             vgpr(self.addrVgpr), \
             vgpr(self.coord0Vgpr), \
             stride0, \
-            "scale element by non-unit stride")
+            "scale element by non-unit stride"))
         elementVgpr = self.addrVgpr
 
       if ss.optSingleColVgpr:
@@ -9777,27 +10153,27 @@ class KernelWriterAssembly(KernelWriter):
         assert (kw.coord0 == self.coord0Vgpr) # elementAddr assignment above assumes these are the same
         if singleUpdate:
           updatedAddr = True
-          kStr += inst("_v_add_lshl_u32", \
+          kl.append(inst("_v_add_lshl_u32", \
             vgpr(self.addrVgpr), \
             vgpr(rowPtr), \
             vgpr(elementVgpr), \
-            hex(log2(kw.bpeCexternal)), \
-            "optSingleColVgpr scaleToBpe: sharedAddrVgpr <- cinRowPtr + coord0, scaled by BPE. BSHERE:coord0=%d, coord0Vgpr=%d"%(kw.coord0, self.coord0Vgpr))
+            kw.bpeCexternalLog2Hex, \
+            "optSingleColVgpr scaleToBpe: sharedAddrVgpr <- cinRowPtr + coord0, scaled by BPE. BSHERE:coord0=%d, coord0Vgpr=%d"%(kw.coord0, self.coord0Vgpr)))
       elif ss.optSharedColVgpr:
         # Need an address calculation for the first address in each row:
         if d1==0 and vc1==0:
           packedIndices = kernel["PackedC0IndicesX"]
           if len(packedIndices) > 1:
             updatedAddr = True
-            kStr += self.emitExtractAndScalePackedDims(kernel, ss, tmpVgpr, tc)
+            kl.append(self.emitExtractAndScalePackedDims(kernel, ss, tmpVgpr, tc))
           else:
             updatedAddr = True
-            kStr += inst("_v_add_lshl_u32", \
+            kl.append(inst("_v_add_lshl_u32", \
               vgpr(self.addrVgpr), \
               vgpr(rowPtr), \
               vgpr(elementVgpr), \
-              hex(log2(kw.bpeCexternal)), \
-              "optSharedColVgpr scaleToBpe for first row: col addr <- cinRowPtr + coord0, scaled by BPE")
+              kw.bpeCexternalLog2Hex, \
+              "optSharedColVgpr scaleToBpe for first row: col addr <- cinRowPtr + coord0, scaled by BPE"))
       else:
         # Generate final address calculation (to bytes) for each element
         # The unpacking takes 8-10 instructions so could be worth optimizing someday :
@@ -9806,69 +10182,65 @@ class KernelWriterAssembly(KernelWriter):
         packedIndices = kernel["PackedC0IndicesX"]
         if len(packedIndices) > 1:
           updatedAddr = True
-          kStr += self.emitExtractAndScalePackedDims(kernel, ss, tmpVgpr, tc)
+          kl.append(self.emitExtractAndScalePackedDims(kernel, ss, tmpVgpr, tc))
         else:
           updatedAddr = True
-          kStr += inst("_v_add_lshl_u32", \
+          kl.append(inst("_v_add_lshl_u32", \
               vgpr(self.addrVgpr), \
               vgpr(rowPtr), \
               vgpr(elementVgpr), \
-              hex(log2(kw.bpeCexternal)), \
-              "scaleToBpe: accumulate d0 lower and *= bpe into Cin addr")
+              kw.bpeCexternalLog2Hex, \
+              "scaleToBpe: accumulate d0 lower and *= bpe into Cin addr"))
 
       # if not optSrdIncForRow then we may have moved the row pointer
       # and depending on paths above may not have refreshed addrVgpr already.
       # if so - do it here:
       if self.rowIncDirtyRowPtr and not updatedAddr:
-        kStr += inst("_v_add_lshl_u32", \
+        kl.append(inst("_v_add_lshl_u32", \
           vgpr(self.addrVgpr), \
           vgpr(rowPtr), \
           vgpr(kw.coord0), \
-          hex(log2(kw.bpeCexternal)), \
-          "scaleToBpe: Update address with new rowPtr")
+          kw.bpeCexternalLog2Hex, \
+          "scaleToBpe: Update address with new rowPtr"))
 
-      return kStr
+      return "".join(kl)
 
 
 
-    def edgeProtectCode(self, kernel, edge, beta, atomic, mask, tmpSgpr):
+    def edgeProtectCode(self, kernel, ss, edge, beta, atomic, mask, tmpSgpr):
       """
       Generate code to protect address offset in edge case
       """
 
-      kStr = ""
+      kl = []
       kw = self.kernelWriter
+      laneSGPRCount = kw.laneSGPRCount
       tmpS01 = tmpSgpr
-      tmpS23 = tmpSgpr+self.kernelWriter.laneSGPRCount
+      tmpS23 = tmpSgpr+laneSGPRCount
 
-      laneSGPRCount = self.kernelWriter.laneSGPRCount
-      wavefrontSize = kernel["WavefrontSize"]
+      # lane-mask operands are reused by several instructions below
+      maskS = sgpr(mask,laneSGPRCount)
+      tmpS01S = sgpr(tmpS01,laneSGPRCount)
 
       # Now do the edge check and compute the address in bytes:
       if kernel["BufferStore"]:
-        if edge and (not kernel["StoreRemapVectorWidth"] or (kernel["StoreRemapVectorWidth"] and beta)):
+        if ss.bufferEdgeClip:
           # Set address to -1 if OOB on either dimension
           # and only check the x/coord0 index here, save a couple inst
-          sizeBoundary = [0,0]
-          sizeBoundary[0] = \
-              sgpr("PackedSize0") if len(kernel["PackedC0IndicesX"]) > 1 \
-              else kw.sizeRef(kernel["ProblemType"]["Index0"])
-          sizeBoundary[1] = \
-              sgpr("PackedSize1") if len(kernel["PackedC1IndicesX"]) > 1 \
-              else kw.sizeRef(kernel["ProblemType"]["Index1"])
-
-          kStr += inst("v_cmp_lt_u32", sgpr(tmpS01,laneSGPRCount), vgpr(self.coord0Vgpr), sizeBoundary[0], "coord0 < size0" )
-          kStr += inst("v_cmp_lt_u32", sgpr(mask,laneSGPRCount), vgpr(self.coord1Vgpr), sizeBoundary[1], "coord1 < size1" )
-          kStr += inst("s_and_b{}".format(wavefrontSize), sgpr(mask,laneSGPRCount), sgpr(tmpS01,laneSGPRCount), sgpr(mask,laneSGPRCount), "in0 && in1" )
+          sizeBoundary = ss.edgeSizeBoundary
+          kl.append(inst("v_cmp_lt_u32", tmpS01S, vgpr(self.coord0Vgpr), sizeBoundary[0], "coord0 < size0" ))
+          kl.append(inst("v_cmp_lt_u32", maskS, vgpr(self.coord1Vgpr), sizeBoundary[1], "coord1 < size1" ))
+          kl.append(inst(kw.sAndBWf, maskS, tmpS01S, maskS, "in0 && in1" ))
       else:
-        kStr += inst("v_cmp_lt_u32", sgpr(tmpS01,laneSGPRCount), vgpr(self.coord0Vgpr), sgpr("SizesFree+0"), "coord0 < size0" )
-        kStr += inst("v_cmp_lt_u32", sgpr(tmpS23,laneSGPRCount), vgpr(self.coord1Vgpr), sgpr("SizesFree+1"), "coord1 < size1" )
-        kStr += inst("s_and_b{}".format(wavefrontSize),  sgpr(mask,laneSGPRCount), sgpr(tmpS01,laneSGPRCount), sgpr(tmpS23,laneSGPRCount), "in0 && in1" )
+        tmpS23S = sgpr(tmpS23,laneSGPRCount)
+        kl.append(inst("v_cmp_lt_u32", tmpS01S, vgpr(self.coord0Vgpr), sgpr("SizesFree+0"), "coord0 < size0" ))
+        kl.append(inst("v_cmp_lt_u32", tmpS23S, vgpr(self.coord1Vgpr), sgpr("SizesFree+1"), "coord1 < size1" ))
+        kl.append(inst(kw.sAndBWf,  maskS, tmpS01S, tmpS23S, "in0 && in1" ))
 
         if (beta or atomic):
-          kStr += inst("s_mov_b{}".format(wavefrontSize), self.kernelWriter.exec, sgpr(mask,laneSGPRCount), "sgprs -> exec" )
+          kl.append(inst(kw.sMovBWf, kw.exec, maskS, "sgprs -> exec" ))
 
-      return kStr
+      return "".join(kl)
 
 
     # TODO - mask should be part of AddrCalc state not passed as parm
@@ -9878,33 +10250,32 @@ class KernelWriterAssembly(KernelWriter):
       Input:
         tmpVgpr : two temp vgprs
       Output:
-        Returns kStr with appropriate setup code
+        Returns string with appropriate setup code
         Sets self.coord0Vgpr with vgpr that contains the coord0 for this element.  This enables
           optimization - if no setup code is required the coord0 can be the input.
       """
 
-      kStr = ""
+      kl = []
       kw = self.kernelWriter
 
-      updateCoord1 = (edge or len(kernel["PackedC1IndicesX"]) > 1)
-      kStr += self.emitAddressCoordIncrement(kernel, ss, tmpVgpr, tmpS01, updateCoord1)
+      kl.append(self.emitAddressCoordIncrement(kernel, ss, tmpVgpr, tmpS01, ss.updateCoord1))
 
       # calculate flat load offset
       if not kernel["BufferStore"]:
         # flat: in-bounds exec mask
         # global offset macro (requires 3 tmpVgpr)
         # final address = C + index*bytes
-        kStr += "GLOBAL_OFFSET_C %u" % addr
+        kl.append("GLOBAL_OFFSET_C %u" % addr)
         for i in range(0, kernel["ProblemType"]["NumIndicesC"]):
           if i == kernel["ProblemType"]["Index0"]:
-            kStr += ", %s" % (self.coord0Vgpr)
+            kl.append(", %s" % (self.coord0Vgpr))
           elif i == kernel["ProblemType"]["Index1"]:
-            kStr += ", %s" % (self.coord1Vgpr)
+            kl.append(", %s" % (self.coord1Vgpr))
           else: # just a group index
-            kStr += ", sgprWorkGroup%u"%i
-        kStr += ", %s%s" % ((tmpVgpr+2), kw.endLine)
-        kStr += inst("v_mov_b32", vgpr(tmpVgpr+2), vgpr(addr+0), "temp store offset 0")
-        kStr += inst("v_mov_b32", vgpr(tmpVgpr+3), vgpr(addr+1), "temp store offset 1")
+            kl.append(", sgprWorkGroup%u"%i)
+        kl.append(", %s%s" % ((tmpVgpr+2), kw.endLine))
+        kl.append(inst("v_mov_b32", vgpr(tmpVgpr+2), vgpr(addr+0), "temp store offset 0"))
+        kl.append(inst("v_mov_b32", vgpr(tmpVgpr+3), vgpr(addr+1), "temp store offset 1"))
 
       # Move the row ptr VGPR
       # optSrdIncForRow moves the SRD so don't move here
@@ -9912,70 +10283,69 @@ class KernelWriterAssembly(KernelWriter):
         if self.rowInc > 0:
           self.rowIncDirtyRowPtr = 1
           #assert (not kernel["ProblemType"]["UseInitialStridesCD"])
-          kStr += kw.comment("Fix for UseInitialStridesCD, emitAddressSetupCode")
+          kl.append(kw.comment("Fix for UseInitialStridesCD, emitAddressSetupCode"))
 
           if len(kernel["PackedC1IndicesX"]) == 1:
             strideChar = self.kernelWriter.indexChars[kernel["PackedC1IndicesX"][0]]
-            kStr += self.addScaled(vgpr(kw.cinRowPtr),  vgpr(kw.cinRowPtr),  \
-                      sgpr("StrideC%s"%strideChar), self.rowInc, tmpS01, "ROWINC- Move cinRowPtr to next row")
-            kStr += self.addScaled(vgpr(kw.coutRowPtr), vgpr(kw.coutRowPtr), \
-                      sgpr("StrideD%s"%strideChar), self.rowInc, tmpS01, "Move coutRowPtr to next row")
+            kl.append(self.addScaled(vgpr(kw.cinRowPtr),  vgpr(kw.cinRowPtr),  \
+                      sgpr("StrideC%s"%strideChar), self.rowInc, tmpS01, "ROWINC- Move cinRowPtr to next row"))
+            kl.append(self.addScaled(vgpr(kw.coutRowPtr), vgpr(kw.coutRowPtr), \
+                      sgpr("StrideD%s"%strideChar), self.rowInc, tmpS01, "Move coutRowPtr to next row"))
           elif len(kernel["PackedC1IndicesX"]) > 1:
-            kStr += self.kernelWriter.extractPackedCoord1ToRowStart(kernel, kernel["PackedC1IndicesX"] , self.coord1Vgpr, 'D')
+            kl.append(self.kernelWriter.extractPackedCoord1ToRowStart(kernel, kernel["PackedC1IndicesX"] , self.coord1Vgpr, 'D'))
 
       # Shift Pointer for MFMA:
       #   For MFMA shift pointer, correct data is stored in another thread.
       #   Therefore, MFMA cannot use v_mov to amend store data
       #   It needs to modify the coord1 of thread directly.
-      if not kernel["GuaranteeNoPartialB"] and kw.readTileDimVectorB and kernel["EnableMatrixInstruction"] and edge:
+      if ss.shiftPointerMI:
         (d1,d0,vc1,vc0) = self.element
         if (d1 == vc1 == d0 == vc0 == 0) or self.newCoord1:
           sgprCnt = self.kernelWriter.laneSGPRCount
-          waveSize = kernel["WavefrontSize"]
           packedC1 = kernel["PackedC1IndicesX"]
           strideC1 = "StrideC%s" % (kw.indexChars[packedC1[0]])
           strideD1 = "StrideD%s" % (kw.indexChars[packedC1[0]])
 
-          kStr += kw.comment("shift vector components d1")
+          kl.append(kw.comment("shift vector components d1"))
           vw = kernel["GlobalLoadVectorWidthB"]
           vTmp1 = tmpVgpr
           vTmp2 = tmpVgpr+1
           sTmp1 = tmpS01
           sTmp2 = tmpS01+sgprCnt
           # check conditions
-          kStr += inst("v_bfi_b32", vgpr(vTmp1), vw-1, 0, vgpr(self.coord1Vgpr), "coord1 & ~(vw-1)")
-          kStr += inst("v_bfi_b32", vgpr(vTmp2), vw-1, 0, sgpr("SizesFree+%u"%kw.tPB["idx"]), "sizeFree & ~(vw-1)")
-          kStr += inst("v_cmp_eq_u32", sgpr(sTmp1,sgprCnt), vgpr(vTmp1), vgpr(vTmp2), "if coord1 is in edge glvw")
-          kStr += inst("v_and_b32", vgpr(vTmp2), sgpr("SizesFree+%u"%kw.tPB["idx"]), vw-1, "sizeFree mod VW")
-          kStr += inst("v_cmp_gt_u32", sgpr(sTmp2,sgprCnt), vgpr(vTmp2), 0, "this problem is not multiple size of glvw")
-          kStr += inst("s_and_b{}".format(waveSize), sgpr(sTmp1,sgprCnt), sgpr(sTmp1,sgprCnt), sgpr(sTmp2,sgprCnt), "AND both conditions")
+          kl.append(inst("v_bfi_b32", vgpr(vTmp1), vw-1, 0, vgpr(self.coord1Vgpr), "coord1 & ~(vw-1)"))
+          kl.append(inst("v_bfi_b32", vgpr(vTmp2), vw-1, 0, sgpr("SizesFree+%u"%kw.tPB["idx"]), "sizeFree & ~(vw-1)"))
+          kl.append(inst("v_cmp_eq_u32", sgpr(sTmp1,sgprCnt), vgpr(vTmp1), vgpr(vTmp2), "if coord1 is in edge glvw"))
+          kl.append(inst("v_and_b32", vgpr(vTmp2), sgpr("SizesFree+%u"%kw.tPB["idx"]), vw-1, "sizeFree mod VW"))
+          kl.append(inst("v_cmp_gt_u32", sgpr(sTmp2,sgprCnt), vgpr(vTmp2), 0, "this problem is not multiple size of glvw"))
+          kl.append(inst(kw.sAndBWf, sgpr(sTmp1,sgprCnt), sgpr(sTmp1,sgprCnt), sgpr(sTmp2,sgprCnt), "AND both conditions"))
           # calculate new coord
-          kStr += inst("_v_add_u32", vgpr(vTmp1), vgpr(self.coord1Vgpr), vgpr(vTmp2), "shift coord1")
-          kStr += inst("v_bfi_b32", vgpr(vTmp1), vw-1, vgpr(vTmp1), sgpr("SizesFree+%u"%kw.tPB["idx"]), "new coord1 = (shift coord1 & (vw-1)) |  (sizeFree & ~(vw-1))")
-          kStr += inst("_v_sub_i32", vgpr(vTmp2), vgpr(vTmp1), vgpr(self.coord1Vgpr), "shift how many column")
-          kStr += inst("v_cndmask_b32", vgpr(self.coord1Vgpr), vgpr(self.coord1Vgpr), vgpr(vTmp1), \
-                        sgpr(sTmp1,sgprCnt), "set new coord1 if meet conditions" )
-
-          kStr += inst("v_mad_i32_i24", vgpr(vTmp1), sgpr(strideC1), vgpr(vTmp2), vgpr(kw.cinRowPtr), \
-                       "new rowStart address += shift column * StridesC")
-          kStr += inst("v_cndmask_b32", vgpr(kw.cinRowPtr), vgpr(kw.cinRowPtr), vgpr(vTmp1), sgpr(sTmp1,sgprCnt), \
-                       "set new rowStart if meet conditions" )
-          kStr += inst("v_mad_i32_i24", vgpr(vTmp1), sgpr(strideD1), vgpr(vTmp2), vgpr(kw.coutRowPtr), \
-                       "new rowStart address += shift column * StridesD")
-          kStr += inst("v_cndmask_b32", vgpr(kw.coutRowPtr), vgpr(kw.coutRowPtr), vgpr(vTmp1), sgpr(sTmp1,sgprCnt), \
-                       "set new rowStart if meet conditions" )
+          kl.append(inst("_v_add_u32", vgpr(vTmp1), vgpr(self.coord1Vgpr), vgpr(vTmp2), "shift coord1"))
+          kl.append(inst("v_bfi_b32", vgpr(vTmp1), vw-1, vgpr(vTmp1), sgpr("SizesFree+%u"%kw.tPB["idx"]), "new coord1 = (shift coord1 & (vw-1)) |  (sizeFree & ~(vw-1))"))
+          kl.append(inst("_v_sub_i32", vgpr(vTmp2), vgpr(vTmp1), vgpr(self.coord1Vgpr), "shift how many column"))
+          kl.append(inst("v_cndmask_b32", vgpr(self.coord1Vgpr), vgpr(self.coord1Vgpr), vgpr(vTmp1), \
+                        sgpr(sTmp1,sgprCnt), "set new coord1 if meet conditions" ))
+
+          kl.append(inst("v_mad_i32_i24", vgpr(vTmp1), sgpr(strideC1), vgpr(vTmp2), vgpr(kw.cinRowPtr), \
+                       "new rowStart address += shift column * StridesC"))
+          kl.append(inst("v_cndmask_b32", vgpr(kw.cinRowPtr), vgpr(kw.cinRowPtr), vgpr(vTmp1), sgpr(sTmp1,sgprCnt), \
+                       "set new rowStart if meet conditions" ))
+          kl.append(inst("v_mad_i32_i24", vgpr(vTmp1), sgpr(strideD1), vgpr(vTmp2), vgpr(kw.coutRowPtr), \
+                       "new rowStart address += shift column * StridesD"))
+          kl.append(inst("v_cndmask_b32", vgpr(kw.coutRowPtr), vgpr(kw.coutRowPtr), vgpr(vTmp1), sgpr(sTmp1,sgprCnt), \
+                       "set new rowStart if meet conditions" ))
 
           if kernel["StoreRemapVectorWidth"]:
             ldsPad = max(kernel["StoreRemapVectorWidth"],kernel["MIOutputVectorWidth"])
-            kStr += inst("v_mov_b32", vgpr(vTmp1), hex((kernel["MacroTile0"]+ldsPad)*kw.bpeCexternal), \
-                        "lds byte stride = (MT0 + PAD) * bpe")
-            kStr += inst("v_mad_i32_i24", vgpr(vTmp1), vgpr(vTmp1), vgpr(vTmp2), vgpr(kw.storeRemapLW), \
-                        "new lds write address += shift column * Lds byte Stride")
-            kStr += inst("v_cndmask_b32", vgpr(kw.storeRemapLW), vgpr(kw.storeRemapLW), vgpr(vTmp1), \
-                          sgpr(sTmp1,sgprCnt), "set new rowStart if meet conditions" )
-          kStr += "\n"
+            kl.append(inst("v_mov_b32", vgpr(vTmp1), hex((kernel["MacroTile0"]+ldsPad)*kw.bpeCexternal), \
+                        "lds byte stride = (MT0 + PAD) * bpe"))
+            kl.append(inst("v_mad_i32_i24", vgpr(vTmp1), vgpr(vTmp1), vgpr(vTmp2), vgpr(kw.storeRemapLW), \
+                        "new lds write address += shift column * Lds byte Stride"))
+            kl.append(inst("v_cndmask_b32", vgpr(kw.storeRemapLW), vgpr(kw.storeRemapLW), vgpr(vTmp1), \
+                          sgpr(sTmp1,sgprCnt), "set new rowStart if meet conditions" ))
+          kl.append("\n")
 
-      return kStr
+      return "".join(kl)
 
 
     def emitLdChange(self, kernel, ss, tc, edge, beta, mask, singleUpdate, tmpVgpr, addr, BufAddr):
@@ -9985,19 +10355,19 @@ class KernelWriterAssembly(KernelWriter):
 
       laneSGPRCount = self.kernelWriter.laneSGPRCount
 
-      kStr = ""
+      kl = []
       if kernel["BufferStore"]:
-        kStr += self.emitScaleToBpe(kernel, ss, tmpVgpr, singleUpdate, tc)
-        if edge and (not kernel["StoreRemapVectorWidth"] or (kernel["StoreRemapVectorWidth"] and beta)):
-          kStr += inst("v_cndmask_b32", vgpr(self.addrVgpr), -1, vgpr(self.addrVgpr), \
-                       sgpr(mask,laneSGPRCount), "LD%s clip if OOB. offset" % tc )
+        kl.append(self.emitScaleToBpe(kernel, ss, tmpVgpr, singleUpdate, tc))
+        if ss.bufferEdgeClip:
+          kl.append(inst("v_cndmask_b32", vgpr(self.addrVgpr), -1, vgpr(self.addrVgpr), \
+                       sgpr(mask,laneSGPRCount), "LD%s clip if OOB. offset" % tc ))
       else:
         # store a copy of the offset in 2 of the tmpVgpr for D
-        kStr += inst("_v_add_co_u32",  vgpr(addr+0), self.kernelWriter.vcc, vgpr(BufAddr+0), vgpr(tmpVgpr+2), \
-                     "addr = C(D) + index*bytes (lo)" )
-        kStr += inst("_v_addc_co_u32", vgpr(addr+1), self.kernelWriter.vcc, vgpr(BufAddr+1), vgpr(tmpVgpr+3), \
-                     self.kernelWriter.vcc, "addr = C(D) + index*bytes (hi)")
-      return kStr
+        kl.append(inst("_v_add_co_u32",  vgpr(addr+0), self.kernelWriter.vcc, vgpr(BufAddr+0), vgpr(tmpVgpr+2), \
+                     "addr = C(D) + index*bytes (lo)" ))
+        kl.append(inst("_v_addc_co_u32", vgpr(addr+1), self.kernelWriter.vcc, vgpr(BufAddr+1), vgpr(tmpVgpr+3), \
+                     self.kernelWriter.vcc, "addr = C(D) + index*bytes (hi)"))
+      return "".join(kl)
 
 
     def incrementToNextRow(self, kernel, tc, ss, stmp):
@@ -10007,7 +10377,7 @@ class KernelWriterAssembly(KernelWriter):
       If not, this could generate some other instructions
       """
 
-      kStr = ""
+      kl = []
       numRows = self.rowInc
       tmpBpe = self.kernelWriter.bpeCexternal
       if ss.optSrdIncForRow:
@@ -10016,59 +10386,64 @@ class KernelWriterAssembly(KernelWriter):
           assert(len(packedC1) == 1)  # would need to extract each dim and scale
           strideCD1 = "Stride%s%s"%(tc,self.kernelWriter.indexChars[packedC1[0]])
           if numRows > 1:
-            kStr += inst("s_mul_i32", sgpr(stmp), \
+            kl.append(inst("s_mul_i32", sgpr(stmp), \
                          sgpr(strideCD1), \
                          numRows*tmpBpe, \
-                         "scale Stride%s *= numRows(%u) * bpe"%(tc,numRows))
+                         "scale Stride%s *= numRows(%u) * bpe"%(tc,numRows)))
           else:
-            kStr += inst("s_lshl_b32 ", \
+            kl.append(inst("s_lshl_b32 ", \
                   sgpr(stmp), \
                   sgpr(strideCD1), \
                   log2(tmpBpe), \
-                  "incToNextRow: Scale by BPE")
+                  "incToNextRow: Scale by BPE"))
 
-          kStr += inst("s_add_u32 ", \
+          kl.append(inst("s_add_u32 ", \
                sgpr("Srd%s+0"%(tc)), \
                sgpr("Srd%s+0"%(tc)), \
                sgpr(stmp), \
-               "incToNextRow: gra SRD += inc(lower)" )
-          kStr += inst("s_addc_u32 ", \
+               "incToNextRow: gra SRD += inc(lower)" ))
+          kl.append(inst("s_addc_u32 ", \
                sgpr("Srd%s+1"%(tc)), \
                sgpr("Srd%s+1"%(tc)), \
                0, \
-               "incToNextRow: gra SRD += inc(upper)" )
+               "incToNextRow: gra SRD += inc(upper)" ))
 
         None
 
-      return kStr
+      return "".join(kl)
 
   ##############################################################################
   # checkIsBetaZero
   # tmpSgpr is one temp sgpr
   # betaLabel is label to branch to if beta != 0
+  # Beta is a kernel argument so the branch is wave-uniform; keep it on SCC
   ##############################################################################
   def checkIsBetaZero(self, kernel, tmpSgpr, betaLabel):
-    kStr = ""
+    kl = []
     if kernel["ProblemType"]["UseBeta"]:
       if self.bpeCinternal <= self.bpr: # 1 register to check for Beta==0
-        kStr += inst("s_cmpk_eq_u32", sgpr("Beta"), hex(0), "Beta == 0")
+        kl.append(inst("s_cmpk_eq_u32", sgpr("Beta"), hex(0), "Beta == 0"))
       else: # multiple registers to check for Beta==0
-        kStr += inst("s_mov_b32", sgpr(tmpSgpr), sgpr("Beta+0"), "tmp = Beta[0]")
-        for i in range(1, self.bpeCinternal//self.bpr):
-          kStr += inst("s_or_b32", sgpr(tmpSgpr), sgpr("Beta+%u"%i), sgpr(tmpSgpr), "tmp |= Beta[%u] " % i)
-        kStr += inst("s_cmpk_eq_u32", sgpr(tmpSgpr), hex(0), "Beta == 0")
-      kStr += inst("s_cbranch_scc0 %s" % betaLabel, \
-          "Branch if Beta is not zero")
-      kStr += "\n"
-    return kStr
+        tmp = sgpr(tmpSgpr)
+        kl.append(inst("s_mov_b32", tmp, sgpr("Beta+0"), "tmp = Beta[0]"))
+        kl.append("".join([inst("s_or_b32", tmp, sgpr("Beta+%u"%i), tmp, "tmp |= Beta[%u] " % i) \
+                         for i in range(1, self.bpeCinternal//self.bpr)]))
+        kl.append(inst("s_cmpk_eq_u32", tmp, hex(0), "Beta == 0"))
+      kl.append(inst("s_cbranch_scc0 %s" % betaLabel, \
+          "Branch if Beta is not zero"))
+      kl.append("\n")
+    return "".join(kl)
 
   ##############################################################################
   # checkIsEdge
   # tmpSgpr must have at least 6 free SGPR
   # isEdgeTarget is the branch target if edges are required
+  # The condition only depends on sizes and workgroup ids (all SGPR), so the
+  # branch is wave-uniform and selects one of two full store paths; an exec
+  # mask would not remove it, it would just run both paths
   ##############################################################################
   def checkIsEdge(self, kernel, tmpSgpr, isEdgeTarget):
-    kStr = ""
+    kl = []
     tmpS01 = tmpSgpr
     tmpS23 = tmpS01 + 2
     tmpS45 = tmpS23 + 2
@@ -10091,20 +10466,22 @@ class KernelWriterAssembly(KernelWriter):
         sgpr("PackedSize1") if len(kernel["PackedC1IndicesX"]) > 1 \
         else self.sizeRef(kernel["ProblemType"]["Index1"])
 
-    kStr += scalarStaticDivideAndRemainder(tmpS23, tmpS01, sizeBoundary[0], \
-        kernel["MacroTile0"], tmpS45, 2)
+    kl.append(scalarStaticDivideAndRemainder(tmpS23, tmpS01, sizeBoundary[0], \
+        kernel["MacroTile0"], tmpS45, 2))
     # s23 = nwg0-1
-    kStr += inst("s_add_u32", sgpr(tmpS23), hex(-1), sgpr("NumWorkGroups0"), "" )
-    kStr += inst("s_cmp_ge_u32", sgpr(wg0), sgpr(tmpS23), "wg0 >= nwg0-1 ?")
-    kStr += inst("s_cselect_b32", sgpr(tmpS01), sgpr(tmpS01), 0, "set rMT0")
+    kl.append(inst("s_add_u32", sgpr(tmpS23), hex(-1), sgpr("NumWorkGroups0"), "" ))
+    kl.append(inst("s_cmp_ge_u32", sgpr(wg0), sgpr(tmpS23), "wg0 >= nwg0-1 ?"))
+    # 0 is an inline constant, so this s_cselect is already a single 4-byte
+    # SOP2; an inverted compare + s_cmovk_i32 would not save size or count
+    kl.append(inst("s_cselect_b32", sgpr(tmpS01), sgpr(tmpS01), 0, "set rMT0"))
     # s01 now = myMT0 = wg0 < nwg0-1 ? MT0 : rMT0
 
     # if rMT0 > 0 goto label_B?_E1
     if self.do["EdgeWrite"]:
-      kStr += inst("s_cmpk_gt_u32", sgpr(tmpS01), hex(0), "rMT0 > 0")
+      kl.append(inst("s_cmpk_gt_u32", sgpr(tmpS01), hex(0), "rMT0 > 0"))
       if self.db["ForceEdgeStores"]:
-        kStr += inst("s_cmp_eq_u32", sgpr(tmpS01), sgpr(tmpS01), "ForceEdgeStores!")
-      kStr += inst("s_cbranch_scc1 %s" % isEdgeTarget, "jump if edges required")
+        kl.append(inst("s_cmp_eq_u32", sgpr(tmpS01), sgpr(tmpS01), "ForceEdgeStores!"))
+      kl.append(inst("s_cbranch_scc1 %s" % isEdgeTarget, "jump if edges required"))
 
     # check edge1 ###
     # TODO-packed - this only needs to change to handle packing into C1 index
@@ -10112,61 +10489,62 @@ class KernelWriterAssembly(KernelWriter):
     # --
 
     # s23 = rMT1 = Size1 % MT1
-    kStr += scalarStaticDivideAndRemainder(tmpS23, tmpS01, sizeBoundary[1], \
-        kernel["MacroTile1"], tmpS45, 2)
+    kl.append(scalarStaticDivideAndRemainder(tmpS23, tmpS01, sizeBoundary[1], \
+        kernel["MacroTile1"], tmpS45, 2))
     # s01 now = myMT1 = wg1 < nwg1-1 ? MT1 : rMT1
 
     # s23 = nwg1-1
-    kStr += inst("s_add_u32", sgpr(tmpS23), hex(-1), sgpr("NumWorkGroups1"), "" )
-    kStr += inst("s_cmp_ge_u32", sgpr(wg1), sgpr(tmpS23), "wg1 >= nwg1-1")
-    kStr += inst("s_cselect_b32", sgpr(tmpS01), sgpr(tmpS01), 0, "set rMT1")
+    kl.append(inst("s_add_u32", sgpr(tmpS23), hex(-1), sgpr("NumWorkGroups1"), "" ))
+    kl.append(inst("s_cmp_ge_u32", sgpr(wg1), sgpr(tmpS23), "wg1 >= nwg1-1"))
+    kl.append(inst("s_cselect_b32", sgpr(tmpS01), sgpr(tmpS01), 0, "set rMT1"))
 
     # if rMT1 > 0 goto label_B?_E1
     if self.do["EdgeWrite"]:
-      kStr += inst("s_cmpk_gt_u32", sgpr(tmpS01), hex(0), "rMT1 > 0")
-      kStr += inst("s_cbranch_scc1 %s" % isEdgeTarget, "jump if edges required")
+      kl.append(inst("s_cmpk_gt_u32", sgpr(tmpS01), hex(0), "rMT1 > 0"))
+      kl.append(inst("s_cbranch_scc1 %s" % isEdgeTarget, "jump if edges required"))
 
-    return kStr
+    return "".join(kl)
 
   ##############################################################################
   # Convert Alpha, Beta from F16 to F32 for HPA
   ##############################################################################
   def checkAlphaBetaForHPA(self, kernel):
-    kStr = ""
-    useBeta = kernel["ProblemType"]["UseBeta"]
+    # ComputeType=H but using HPA (h,h,h,h,h,h), cvt alpha, beta f16->f32
+    return self.convertAlphaBetaForHPA(kernel, kernel["ProblemType"]["UseBeta"])
 
+  ##############################################################################
+  # Convert packed F16 Alpha (and Beta if useBeta) to F32 in place
+  # Used by checkAlphaBetaForHPA and by globalWriteElements for non-PK kernels
+  # The two callers are exclusive on PersistentKernel. Non-PK kernels may still
+  # emit this more than once (OptNLL and the regular store each call
+  # globalWriteElements), but those are separate runtime paths ending in their
+  # own s_endpgm, so each needs its own conversion - don't guard with a
+  # once-per-kernel flag.
+  ##############################################################################
+  def convertAlphaBetaForHPA(self, kernel, useBeta):
+    kl = []
     # Also can push alpha/beta recalc back to host for HPA mode?
-    # ComputeType=H but using HPA (h,h,h,h,h,h), cvt alpha, beta f16->f32
     if kernel["ProblemType"]["DataType"].isHalf() and \
        kernel["ProblemType"]["ComputeDataType"].isHalf() and \
        kernel["ProblemType"]["HighPrecisionAccumulate"]:
 
-      # skipCvtAlphaLabel = self.getNamedLabelUnique("SkipConvertAlphaBeta")
-      # if kernel["PersistentKernel"]:
-      #   kStr += inst("s_cmp_gt_u32", sgpr("PersistentLoopIter"), hex(1), "if PersistentLoop Iter > 1, not the first loop, don't cvt 16b->32b" )
-      #   kStr += inst("s_cbranch_scc1", skipCvtAlphaLabel, "don't cvt 16b->32b again" )
-
       alphaVgprTmp = self.vgprPool.checkOut(1, "alpha")
       # alpha, beta are packed halfs in half mode (f16.hi == f16.lo) - setup on host
-      kStr += inst("v_mov_b32", vgpr(alphaVgprTmp), sgpr("Alpha"), "sgpr -> vgpr b/c op_sel")
-      kStr += inst("v_cvt_f32_f16", vgpr(alphaVgprTmp), vgpr(alphaVgprTmp), "convert alpha to fp32")
-      kStr += inst("v_readfirstlane_b32", sgpr("Alpha"), vgpr(alphaVgprTmp), "restore alpha sgpr")
+      # VOP1 src0 reads the sgpr directly; the low f16 is converted
+      kl.append(inst("v_cvt_f32_f16", vgpr(alphaVgprTmp), sgpr("Alpha"), "convert alpha to fp32"))
+      kl.append(inst("v_readfirstlane_b32", sgpr("Alpha"), vgpr(alphaVgprTmp), "restore alpha sgpr"))
       self.vgprPool.checkIn(alphaVgprTmp)
 
       if useBeta:
+        # TODO - for hpa the host should pass in an F32 alpha so we don't have to do it here
         self.betaVgpr = self.vgprPool.checkOut(1, "beta")
-        kStr += inst("v_mov_b32", vgpr(self.betaVgpr), sgpr("Beta"), "sgpr -> vgpr b/c op_sel")
-        kStr += inst("v_cvt_f32_f16", vgpr(self.betaVgpr), vgpr(self.betaVgpr), "convert beta to fp32")
+        kl.append(inst("v_cvt_f32_f16", vgpr(self.betaVgpr), sgpr("Beta"), "convert beta to fp32"))
         if self.betaInSgpr:
-          kStr += inst("v_readfirstlane_b32", sgpr("Beta"), vgpr(self.betaVgpr), "restore beta sgpr")
+          kl.append(inst("v_readfirstlane_b32", sgpr("Beta"), vgpr(self.betaVgpr), "restore beta sgpr"))
           self.vgprPool.checkIn(self.betaVgpr)
           self.betaVgpr = None
 
-      # # This is only used for PersistentKernel
-      # kStr += "%s:\n"%(skipCvtAlphaLabel)
-      # kStr += self.endLine
-
-    return kStr
+    return "".join(kl)
 
   ##############################################################################
   # Global Write Elements
@@ -10176,9 +10554,16 @@ class KernelWriterAssembly(KernelWriter):
                           betas=None, # if left unspecified, then let global parameter decide
                           edges=None):
     if not self.do["PostLoop"]: return ""
-    kStr = ""
+    kl = []
     atomic = (kernel["GlobalSplitU"] > 1) and (kernel["_GlobalAccumulation"] != 'MultipleBuffer')
 
+    # kernel parameters used by every (beta, edge) write path below
+    storeRemapVW = kernel["StoreRemapVectorWidth"]
+    # TODO: Which of DataType or DestDataType is in a better sense? 0114: Check Using DestDataType + HSS
+    isHalfOrBF16 = kernel["ProblemType"]["DataType"].isHalf() or kernel["ProblemType"]["DataType"].isBFloat16()
+    numThreads = kernel["NumThreads"]
+    ldsSize = self.getLdsSize(kernel)
+
 
     # write possibilities and labels
     # if beta/edge combo not specified fall back to global param definition
@@ -10187,13 +10572,10 @@ class KernelWriterAssembly(KernelWriter):
       betas = [False, True] if hasBeta else [False]
     if edges is None:
       edges = [False, True] if self.do["EdgeWrite"] else [False]
-    writeLabels = {}
+    writeLabels = {} # keyed by (beta, edge)
     for beta in betas:
-      writeLabels[beta] = {}
       for edge in edges:
-        writeLabels[beta]["EdgeCheck0"] = self.getNamedLabelUnique("GW_B%u_E%u_EdgeCheck0" % ( 1 if beta else 0, 1 if edge else 0) )
-        writeLabels[beta]["EdgeCheck1"] = self.getNamedLabelUnique("GW_B%u_E%u_EdgeCheck1" % ( 1 if beta else 0, 1 if edge else 0) )
-        writeLabels[beta][edge] = self.getNamedLabelUnique("GW_B%u_E%u" % ( 1 if beta else 0, 1 if edge else 0) )
+        writeLabels[(beta, edge)] = self.getNamedLabelUnique("GW_B%u_E%u" % ( 1 if beta else 0, 1 if edge else 0) )
       if not beta:
         betaLabel = self.getNamedLabelUnique("GW_Beta")
     endLabel = self.getNamedLabelUnique("GW_End")
@@ -10220,30 +10602,10 @@ class KernelWriterAssembly(KernelWriter):
     """
     self.betaVgpr = None
 
-    # Also can push alpha/beta recalc back to host for HPA mode?
-    # only do this when no PK. (When PersistentKernel, move this to checkAlphaBetaForHPA() and do only once before PK-loop)
-    if not kernel["PersistentKernel"] and \
-       kernel["ProblemType"]["DataType"].isHalf() and \
-       kernel["ProblemType"]["ComputeDataType"].isHalf() and \
-       kernel["ProblemType"]["HighPrecisionAccumulate"]:
-
-      alphaVgprTmp = self.vgprPool.checkOut(1, "alpha")
-      # alpha, beta are packed halfs in half mode (f16.hi == f16.lo) - setup on host
-      kStr += inst("v_mov_b32", vgpr(alphaVgprTmp), sgpr("Alpha"), "sgpr -> vgpr b/c op_sel")
-      kStr += inst("v_cvt_f32_f16", vgpr(alphaVgprTmp), vgpr(alphaVgprTmp), "convert alpha to fp32")
-      kStr += inst("v_readfirstlane_b32", sgpr("Alpha"), vgpr(alphaVgprTmp), "restore alpha sgpr")
-      self.vgprPool.checkIn(alphaVgprTmp)
-
-      if beta:
-        #jgolds look at moving these converted values back to scalar regs and free up the VGPRs
-        # TODO - for hpa the host should pass in an F32 alpha so we don't have to do it here
-        self.betaVgpr = self.vgprPool.checkOut(1, "beta")
-        kStr += inst("v_mov_b32", vgpr(self.betaVgpr), sgpr("Beta"), "sgpr -> vgpr b/c op_sel")
-        kStr += inst("v_cvt_f32_f16", vgpr(self.betaVgpr), vgpr(self.betaVgpr), "convert beta to fp32")
-        if self.betaInSgpr:
-          kStr += inst("v_readfirstlane_b32", sgpr("Beta"), vgpr(self.betaVgpr), "restore beta sgpr")
-          self.vgprPool.checkIn(self.betaVgpr)
-          self.betaVgpr = None
+    # only do this when no PK. (When PersistentKernel, this is done by checkAlphaBetaForHPA() once before PK-loop)
+    # beta is the last entry of betas, left over from the label loop above
+    if not kernel["PersistentKernel"]:
+      kl.append(self.convertAlphaBetaForHPA(kernel, betas[-1]))
 
     ########################################
     # Vgprs
@@ -10265,12 +10627,12 @@ class KernelWriterAssembly(KernelWriter):
     betaLabel = self.getNamedLabelUnique("GW_Beta")
 
     if False in betas and True in betas:
-      kStr += self.checkIsBetaZero(kernel, tmpSgpr, betaLabel)
+      kl.append(self.checkIsBetaZero(kernel, tmpSgpr, betaLabel))
 
     for beta in betas:
       # start B1
       if beta:
-        kStr += "%s:\n"%(betaLabel)
+        kl.append("%s:\n"%(betaLabel))
 
       # if len(betas) == 1, then is for OptNLL (case 2), else is OrdNLL (case 3,4)
       if self.canOptimizePreLoopLWVmcnt:
@@ -10281,27 +10643,26 @@ class KernelWriterAssembly(KernelWriter):
           else:
             case = 3
             self.currPreLoopVmcntCase = PreLoopVmcntCase.OrdNLL_B0_Store
-          kStr += inst("s_mov_b32", sgpr("PreLoopLWVmcntCase"), hex(case), \
-            "for optimizing next PreLoop LWVmcnt, set to Case%u: OrdNLL and %sbeta"%(case, "" if beta else "no "))
+          kl.append(inst("s_mov_b32", sgpr("PreLoopLWVmcntCase"), hex(case), \
+            "for optimizing next PreLoop LWVmcnt, set to Case%u: OrdNLL and %sbeta"%(case, "" if beta else "no ")))
         else:                         # betas = [False], OptNLL
           self.currPreLoopVmcntCase = PreLoopVmcntCase.OptNLL_Store
-          kStr += inst("s_mov_b32", sgpr("PreLoopLWVmcntCase"), hex(2), \
-            "for optimizing next PreLoop LW vmcnt, set to Case2: OptNLL")
+          kl.append(inst("s_mov_b32", sgpr("PreLoopLWVmcntCase"), hex(2), \
+            "for optimizing next PreLoop LW vmcnt, set to Case2: OptNLL"))
 
       ########################################
       # branch if Edge0 or Edge1
       if False in edges and True in edges:
-        kStr += self.checkIsEdge(kernel, tmpSgpr, "%s" % writeLabels[beta][True])
+        kl.append(self.checkIsEdge(kernel, tmpSgpr, "%s" % writeLabels[(beta, True)]))
+
+      # for storeRemap edge case, non-beta still can enable vector stores
+      remapVectorEdge = bool(storeRemapVW) and not beta
 
       # by now we either jumped to E1 or stayed at E0
       for edge in edges:
-        kStr += "%s:%s"%(writeLabels[beta][edge], self.endLine)
+        kl.append("%s:%s"%(writeLabels[(beta, edge)], self.endLine))
 
-        # for storeRemap edge case, non-beta still can enable vector stores
-        if kernel["StoreRemapVectorWidth"] and not beta:
-          edgeI = False
-        else:
-          edgeI = edge
+        edgeI = edge and not remapVectorEdge
         #edgeI = True  # set to True to disable vector stores
         gwvw = vectorWidths[edgeI]
         #print "globalWriteElements: edge=", edge, "beta=", beta, "atomic=", atomic
@@ -10311,6 +10672,7 @@ class KernelWriterAssembly(KernelWriter):
         ########################################
 
         self.ss = self.StoreState(self, kernel, gwvw, edge, beta, atomic, elements[edgeI])
+        cfg = self.ss.cfg
 
         # how many vgprs are needed for zero elements
         # 2 for addressC in vgpr for addition - already checked out
@@ -10323,19 +10685,14 @@ class KernelWriterAssembly(KernelWriter):
         #  - if beta gwvw*rpe for new value
         #  - if atomic 2*rpe for old and cmp values
 
-        # print("numVgprsPerAddr=%u, numVgprsPerDataPerVI=%u, numVgprPerValuC=%u"%(self.ss.cfg.numVgprsPerAddr, self.ss.cfg.numVgprsPerDataPerVI, self.ss.cfg.numVgprPerValuC))
-        numVgprsPerElement = self.ss.cfg.numVgprPerValuC*gwvw + self.ss.cfg.numVgprsPerAddr + int(ceil(self.ss.cfg.numVgprsPerDataPerVI * gwvw))
+        # print("numVgprsPerAddr=%u, numVgprsPerDataPerVI=%u, numVgprPerValuC=%u"%(cfg.numVgprsPerAddr, cfg.numVgprsPerDataPerVI, cfg.numVgprPerValuC))
+        numVgprsPerElement = cfg.numVgprPerValuC*gwvw + cfg.numVgprsPerAddr + cfg.numVgprsPerDataPerElement
 
         #print self.vgprPool.state()
         # Use VGPR up to next occupancy threshold:
-        maxVgprs = self.getMaxRegsForOccupancy(kernel["NumThreads"], self.vgprPool.size(), self.getLdsSize(kernel), self.agprPool.size())
+        maxVgprs = self.getMaxRegsForOccupancy(numThreads, self.vgprPool.size(), ldsSize, self.agprPool.size())
         if self.serializedStore: # get aggresive when serializedStore is on; not necessarily exclusive to this parameter
-          len(elements[edgeI])
-          tl = []
-          for i in range(self.vgprPool.size()-self.vgprPool.available(), maxVgprs):
-            tl.append(self.vgprPool.checkOut(1, "grow-pool up to next occupancy for GlobalWrite"))
-          for t in tl:
-            self.vgprPool.checkIn(t)
+          self.vgprPool.growTo(maxVgprs, "grow-pool up to next occupancy for GlobalWrite")
         numVgprAvailable = self.vgprPool.availableBlock(numVgprsPerElement)
 
         # Grow the register pool if needed - we need enough regs for at least one element
@@ -10346,16 +10703,15 @@ class KernelWriterAssembly(KernelWriter):
         # range of the tmps.  Maybe want to move vgprSerial to first vgpr?
 
         # TODO: Minimum elems for StoreRemap
-        # TODO: Which of DataType or DestDataType is in a better sense? 0114: Check Using DestDataType + HSS
-        minElements = 2 if (kernel["ProblemType"]["DataType"].isHalf() or kernel["ProblemType"]["DataType"].isBFloat16()) else 1
+        minElements = 2 if isHalfOrBF16 else 1
         minNeeded = minElements*numVgprsPerElement
         shrinkDb = 0
         if shrinkDb:
           print("numVgprAvailable=", numVgprAvailable, "minElements=", minElements, "minNeeded=", minNeeded)
         if numVgprAvailable < minNeeded:
           gwvwOrig = gwvw
-          currentOccupancy = self.getOccupancy(kernel["NumThreads"], self.getLdsSize(kernel), self.vgprPool.size(), self.agprPool.size())
-          futureOccupancy = self.getOccupancy(kernel["NumThreads"], self.getLdsSize(kernel), \
+          currentOccupancy = self.getOccupancy(numThreads, ldsSize, self.vgprPool.size(), self.agprPool.size())
+          futureOccupancy = self.getOccupancy(numThreads, ldsSize, \
               self.vgprPool.size() - numVgprAvailable + minNeeded, self.agprPool.size())
 
           if shrinkDb:
@@ -10393,22 +10749,27 @@ class KernelWriterAssembly(KernelWriter):
         # print("NumVgprAvailable", numVgprAvailable)
         if numVgprsPerElement:
           numElementsPerBatch = numVgprAvailable // numVgprsPerElement
+          # the bf16 constants take what the batch leaves over; only give up
+          # elements if they don't fit there, rather than grow the pool
+          numBf16Spare = self.vgprPool.available() - numElementsPerBatch*numVgprsPerElement
+          if self.ss.numBf16Consts > numBf16Spare:
+            numElementsPerBatch = max(min(numElementsPerBatch, minElements), numElementsPerBatch \
+                - ceil_divide(self.ss.numBf16Consts - numBf16Spare, numVgprsPerElement))
         else:
           numElementsPerBatch = len(elements[edgeI]) # max, do 'em all
 
         assert(self.numVgprValuC % gwvw == 0) # sanity check
 
         if shrinkDb:
-          print("NumElementsPerBatch=", numElementsPerBatch, "LimitedBySgprs=", self.ss.cfg.numElementsPerBatchLimitedBySgprs, \
-              "WARNING" if self.ss.cfg.numElementsPerBatchLimitedBySgprs < numElementsPerBatch else "okay")
-        if self.ss.cfg.numElementsPerBatchLimitedBySgprs < numElementsPerBatch:
-          numElementsPerBatch = self.ss.cfg.numElementsPerBatchLimitedBySgprs
+          print("NumElementsPerBatch=", numElementsPerBatch, "LimitedBySgprs=", cfg.numElementsPerBatchLimitedBySgprs, \
+              "WARNING" if cfg.numElementsPerBatchLimitedBySgprs < numElementsPerBatch else "okay")
+        if cfg.numElementsPerBatchLimitedBySgprs < numElementsPerBatch:
+          numElementsPerBatch = cfg.numElementsPerBatchLimitedBySgprs
 
-        # TODO: Which of DataType or DestDataType is in a better sense? 0114: Check Using DestDataType + HSS
-        if (kernel["ProblemType"]["DataType"].isHalf() or kernel["ProblemType"]["DataType"].isBFloat16()):
+        if isHalfOrBF16:
           # only do an even number of halves - since these share hi/lo pieces of some registers?
           if numElementsPerBatch > 1:
-            numElementsPerBatch = int(numElementsPerBatch/2)*2
+            numElementsPerBatch &= ~1
           elif not kernel["EnableMatrixInstruction"]:
             # The globalWriteBatch routine below can't handle odd elements per batch
             # and 0 elements per batch is illegal.
@@ -10423,26 +10784,31 @@ class KernelWriterAssembly(KernelWriter):
         assert numElementsPerBatch > 0, "numElementsPerBatch=0 for %s"%self.kernelName
 
         #numElementsPerBatch=min(2,numElementsPerBatch) # hack to control number of batches
-        if atomic and (self.ss.optSingleColVgpr or self.ss.optSharedColVgpr):
+        atomicColVgpr = atomic and (self.ss.optSingleColVgpr or self.ss.optSharedColVgpr)
+        if atomicColVgpr or storeRemapVW:
+          # number of elements in the first row, used by both limits below
+          numFirstRow = sum(1 for e in elements[edgeI] if e[0]==0 and e[2]==0) # format for element = (tt1, tt0, vc1, vc0)
+
+        if atomicColVgpr:
           # hack to avoid re-using address vgpr across rows
           # atomics need to perform several memory operations
           # if the batch spans multiple rows, need multiple address vgpr
           # which is not currently supported in the two opt*ColVgpr modes
-          firstRow = [e for e in elements[edgeI] if e[0]==0 and e[2]==0]
-          numElementsPerBatch=min(len(firstRow),numElementsPerBatch)
+          numElementsPerBatch=min(numFirstRow,numElementsPerBatch)
 
         # check best numElementsPerBatch to handle a column block
         # elements of column block must be multiple size of numElementsPerBatch
-        if kernel["StoreRemapVectorWidth"]:
-          firstRow = [e for e in elements[edgeI] if e[0]==0 and e[2]==0] # format for element = (tt1, tt0, vc1, vc0)
+        if storeRemapVW:
           # find the largest factor and smaller than numElementPerBatch
           nBatchesPerRow = 1
-          for d in range(1, len(firstRow)+1):
-            largestFactor = len(firstRow)//d
-            if len(firstRow)%d == 0 and largestFactor <= numElementsPerBatch:
-              numElementsPerBatch = largestFactor
-              nBatchesPerRow = d
-              break
+          if numFirstRow:
+            factors = set()
+            for d in range(1, int(numFirstRow**0.5)+1):
+              if numFirstRow%d == 0:
+                factors.add(d)
+                factors.add(numFirstRow//d)
+            numElementsPerBatch = max(f for f in factors if f <= numElementsPerBatch)
+            nBatchesPerRow = numFirstRow//numElementsPerBatch
 
         # if no atomics and no edge, then write whole vectors
         #if not atomic and not edge:
@@ -10451,22 +10817,29 @@ class KernelWriterAssembly(KernelWriter):
         #  numElementsPerBatch = numVectorsPerBatch * kernel["GlobalWriteVectorWidth"]
         numBatches = max(1, ceil_divide(len(elements[edgeI]),numElementsPerBatch))
 
-        numSgprs = self.ss.cfg.fixedSgprsPerBatch + self.ss.cfg.numSgprsPerElement*numElementsPerBatch
+        numSgprs = cfg.fixedSgprsPerBatch + cfg.numSgprsPerElement*numElementsPerBatch
         if self.db["PrintStoreRegisterDb"]:
           print("edgeI", edgeI, "NumBatches", numBatches, "NumElementsPerBatch", numElementsPerBatch, "numVgprsPerElement", numVgprsPerElement, "len(elements[edgeI])", len(elements[edgeI]))
           print ("numSgprs=", numSgprs, "sgprPool.size()=", self.sgprPool.size(), \
-                  "fixedSgprsPerBatch=", self.ss.cfg.fixedSgprsPerBatch, "numSgprsPerElement=", self.ss.cfg.numSgprsPerElement)
+                  "fixedSgprsPerBatch=", cfg.fixedSgprsPerBatch, "numSgprsPerElement=", cfg.numSgprsPerElement)
           print(self.sgprPool.state())
-        kStr += self.comment("edge=%d, allocate %u sgpr. perBatch=%u perElement=%u elementsPerBatch=%u"%\
-            (edgeI, numSgprs, self.ss.cfg.fixedSgprsPerBatch, self.ss.cfg.numSgprsPerElement, numElementsPerBatch))
+        kl.append(self.comment("edge=%d, allocate %u sgpr. perBatch=%u perElement=%u elementsPerBatch=%u"%\
+            (edgeI, numSgprs, cfg.fixedSgprsPerBatch, cfg.numSgprsPerElement, numElementsPerBatch)))
         #kStr += "// storeStats, %d, %d, %d\n"% (edgeI, numSgprs, numElementsPerBatch)
         # so if we don't have *GPR resources to handle a larger batch then need
         # to mark overflowedResources rather than generate a kernel that won't work.
         tmpSgpr = self.getTmpSgpr(numSgprs, 2).idx()
 
-        elementSgprs = tmpSgpr + self.ss.cfg.fixedSgprsPerBatch
+        elementSgprs = tmpSgpr + cfg.fixedSgprsPerBatch
 
-        codeAccVgprRead = deepcopy(self.codeAccVgprRead) if self.serializedStore else None
+        codeAccVgprRead = None
+        if self.serializedStore:
+          # the batches consume the reads in order, so share one forward
+          # iterator across them.  Each read is stringified once and split
+          # around its ValuC placeholder so the batch only has to splice in
+          # the destination register index
+          codeAccVgprRead = iter([str(item).split("__placeholder__") \
+              for item in self.codeAccVgprRead.items()])
         for batchIdx in range(0, numBatches):
           elementStartIdx = batchIdx * numElementsPerBatch
           elementStopIdx = min( elementStartIdx + numElementsPerBatch, len(elements[edgeI]) )
@@ -10475,42 +10848,58 @@ class KernelWriterAssembly(KernelWriter):
           # elementVgprs can be large and should be perfectly tuned to the number of available
           # VGPRS.  We do not want to accidentally overflow and grow the pool here:
 
-          if kernel["StoreRemapVectorWidth"]:
+          if storeRemapVW:
             #Indication if this batch is last batch for this column block shape
             self.StoreRemapLastBatch = 1 if (batchIdx+1) % nBatchesPerRow == 0 else 0
 
-          kStr += self.globalWriteBatch(kernel, self.ss, batchIdx, applyAlpha, beta, edge, atomic, gwvw, atomicW, \
+          kl.append(self.globalWriteBatch(kernel, self.ss, batchIdx, applyAlpha, beta, edge, atomic, gwvw, atomicW, \
               elementsThisBatch, self.coord0, self.coord1, self.addrD, self.addrC, \
               tmpVgpr, \
-              elementSgprs, tmpSgpr, codeAccVgprRead)
+              elementSgprs, tmpSgpr, codeAccVgprRead))
         # TODO - if this is the last tile, don't need to jump to next instruction
-        kStr += inst("s_branch", "label_%s"%endLabel, "jump to end")
+        kl.append(inst("s_branch", "label_%s"%endLabel, "jump to end"))
+        self.vgprPool.checkInMulti(self.ss.vgprBf16Consts)
         del self.ss
 
         # Finish one write path, reset currPreLoopVmcntCase to Undefined
         self.currPreLoopVmcntCase = PreLoopVmcntCase.Undefined
 
     # End label
-    kStr += "label_%s:%s"%(endLabel, self.endLine)
+    kl.append("label_%s:%s"%(endLabel, self.endLine))
     self.vgprPool.checkIn(tmpVgpr)
-    return kStr
+    return "".join(kl)
 
 
   ##############################################################################
-  # chooseGlobalRead :
-  # create the load instruction for requested vector width and other parms
-  # return an Inst class
+  # Load instruction and vgpr count (as a multiple of rpv) for each
+  # (bytes-per-load, hi16); hi16 is only meaningful below a dword
+  ##############################################################################
+  bufferLoadInsts = {(1,0): ("buffer_load_ubyte_d16", 4), (1,1): ("buffer_load_ubyte_d16_hi", 4), \
+                     (2,0): ("buffer_load_short_d16", 2), (2,1): ("buffer_load_short_d16_hi", 2), \
+                     (4,0): ("buffer_load_dword", 1), (8,0): ("buffer_load_dwordx2", 1), \
+                     (16,0): ("buffer_load_dwordx4", 1)}
+  flatLoadInsts = {(2,0): ("flat_load_short_d16", 2), (2,1): ("flat_load_short_d16_hi", 2), \
+                   (4,0): ("flat_load_dword", 1), (8,0): ("flat_load_dwordx2", 1), \
+                   (16,0): ("flat_load_dwordx4", 1)}
+
+  ##############################################################################
+  # globalReadParts :
+  # pick the load(s) for requested vector width and other parms
+  # return (largeOffset, loads): largeOffset is the s_mov_b32 text that moves
+  # an offset too large for the 12-bit field into soffset ("" if none), and
+  # loads is a list of (opcode, operands..., comment) tuples
   #
   # bpl = bytes per load op
   ##############################################################################
-  def chooseGlobalRead(self, useBuffer, bpl, destVgpr, \
-                       addr0, addr1, soffset, offset, extraFields, hi16=0, comment="load C"):
+  def globalReadParts(self, useBuffer, bpl, destVgpr, \
+                      addr0, addr1, soffset, offset, extraFields, hi16, comment):
 
   # rpv = regs per vector
     rpv = bpl/4.0
+    loadKey = (bpl, 1 if (hi16 and bpl < 4) else 0)
 
     if useBuffer:
-      rv = Code.Module("Global Read")
+      largeOffset = ""
       tailFields = "offen offset:%u"%offset
       # buffer_load offset field is 12-bit.
       # if offset >= 4096, use soffset instead
@@ -10518,69 +10907,71 @@ class KernelWriterAssembly(KernelWriter):
         if soffset == 0 or soffset == "0":
           tailFields = "offen offset:0"
           soffset = sgpr(self.getTmpSgpr(1).idx())
-          rv.addCode(inst("s_mov_b32", soffset, offset, "large offset"))
+          largeOffset = inst("s_mov_b32", soffset, offset, "large offset")
         else:
           assert 0, "offset too large and soffset set"
       if extraFields != "":
         tailFields += ", %s"% extraFields
-      if bpl==1 and hi16:
-        rv.addCode(Code.GlobalReadInst("buffer_load_ubyte_d16_hi", vgpr(destVgpr, rpv*4), addr0, \
-                  addr1, soffset, tailFields, comment))
-        return rv
-      elif bpl==1 and not hi16:
-        rv.addCode(Code.GlobalReadInst("buffer_load_ubyte_d16", vgpr(destVgpr, rpv*4), addr0, \
-                  addr1, soffset, tailFields, comment))
-        return rv
-      elif bpl==2 and hi16:
-        rv.addCode(Code.GlobalReadInst("buffer_load_short_d16_hi", vgpr(destVgpr, rpv*2), addr0, \
-                  addr1, soffset, tailFields, comment))
-        return rv
-      elif bpl==2 and not hi16:
-        rv.addCode(Code.GlobalReadInst("buffer_load_short_d16", vgpr(destVgpr, rpv*2), addr0, \
-                  addr1, soffset, tailFields, comment))
-        return rv
-      elif bpl==4:
-        rv.addCode(Code.GlobalReadInst("buffer_load_dword", vgpr(destVgpr, rpv), addr0, \
-                  addr1, soffset, tailFields, comment))
-        return rv
-      elif bpl==8:
-        rv.addCode(Code.GlobalReadInst("buffer_load_dwordx2", vgpr(destVgpr, rpv), addr0, \
-                  addr1, soffset, tailFields, comment))
-        return rv
-      elif bpl==16:
-        rv.addCode(Code.GlobalReadInst("buffer_load_dwordx4", vgpr(destVgpr, rpv), addr0, \
-                  addr1, soffset, tailFields, comment))
-        return rv
+      if loadKey in self.bufferLoadInsts:
+        (loadInst, regMult) = self.bufferLoadInsts[loadKey]
+        return (largeOffset, [(loadInst, vgpr(destVgpr, rpv*regMult), addr0, \
+                addr1, soffset, tailFields, comment)])
       elif bpl==32:
         # split into two dwordx4 loads. Second load offset is +0.5 bpl
         tailFields1 = "offen offset:%u"%(offset + bpl/2)
         if extraFields != "":
           tailFields1 += ", %s"% extraFields
-
-        rv = Code.Module("emulated buffer_load_dwordx8")
-        rv.addCode(Code.GlobalReadInst("buffer_load_dwordx4", vgpr(destVgpr, rpv/2), addr0, \
-                  addr1, soffset, tailFields, comment))
-        rv.addCode(Code.GlobalReadInst("buffer_load_dwordx4", vgpr(int(destVgpr + rpv/2), rpv/2), addr0, \
-                  addr1, soffset, tailFields1, comment))
+        return (largeOffset, [("buffer_load_dwordx4", vgpr(destVgpr, rpv/2), addr0, \
+                addr1, soffset, tailFields, comment), \
+                ("buffer_load_dwordx4", vgpr(int(destVgpr + rpv/2), rpv/2), addr0, \
+                addr1, soffset, tailFields1, comment)])
       else:
         assert 0, "chooseGlobalRead: bad bpl"
 
-      return rv
-
     else:
-      if bpl==2 and hi16:
-        return Code.GlobalReadInst("flat_load_short_d16_hi", vgpr(destVgpr, rpv*2), addr0, extraFields, comment )
-      elif bpl==2 and not hi16:
-        return Code.GlobalReadInst("flat_load_short_d16", vgpr(destVgpr, rpv*2), addr0, extraFields, comment )
-      elif bpl==4:
-        return Code.GlobalReadInst("flat_load_dword", vgpr(destVgpr, rpv), addr0, extraFields, comment )
-      elif bpl==8:
-        return Code.GlobalReadInst("flat_load_dwordx2", vgpr(destVgpr, rpv), addr0, extraFields, comment )
-      elif bpl==16:
-        return Code.GlobalReadInst("flat_load_dwordx4", vgpr(destVgpr, rpv), addr0, extraFields, comment )
+      if loadKey in self.flatLoadInsts:
+        (loadInst, regMult) = self.flatLoadInsts[loadKey]
+        return ("", [(loadInst, vgpr(destVgpr, rpv*regMult), addr0, extraFields, comment)])
       else:
         assert 0, "chooseGlobalRead: bad bpl"
 
+  ##############################################################################
+  # chooseGlobalRead :
+  # create the load instruction for requested vector width and other parms
+  # return a Module for buffer loads, a GlobalReadInst for flat loads
+  ##############################################################################
+  def chooseGlobalRead(self, useBuffer, bpl, destVgpr, \
+                       addr0, addr1, soffset, offset, extraFields, hi16=0, comment="load C"):
+    (largeOffset, loads) = self.globalReadParts(useBuffer, bpl, destVgpr, \
+        addr0, addr1, soffset, offset, extraFields, hi16, comment)
+    if not useBuffer:
+      return Code.GlobalReadInst(*loads[0])
+
+    rv = Code.Module("emulated buffer_load_dwordx8" if len(loads) > 1 else "Global Read")
+    if largeOffset:
+      rv.addCode(largeOffset)
+    for load in loads:
+      rv.addCode(Code.GlobalReadInst(*load))
+    return rv
+
+  ##############################################################################
+  # chooseGlobalReadStr :
+  # same load as chooseGlobalRead, but formatted straight to text for the
+  # store epilogue, which emits one per element and never inspects the Inst
+  ##############################################################################
+  def chooseGlobalReadStr(self, useBuffer, bpl, destVgpr, \
+                          addr0, addr1, soffset, offset, extraFields, hi16=0, comment="load C"):
+    (largeOffset, loads) = self.globalReadParts(useBuffer, bpl, destVgpr, \
+        addr0, addr1, soffset, offset, extraFields, hi16, comment)
+    return largeOffset + "".join([_globalReadText(*load) for load in loads])
+
+  ##############################################################################
+  # Store instruction for each dword-multiple bytes-per-store
+  ##############################################################################
+  bufferStoreInsts = {4: "buffer_store_dword", 8: "buffer_store_dwordx2", 16: "buffer_store_dwordx4"}
+  flatStoreInsts = {4: "flat_store_dword", 8: "flat_store_dwordx2", 16: "flat_store_dwordx4"}
+
+  ##############################################################################
   ##############################################################################
   def chooseGlobalWrite(self, useBuffer, bps, srcVgpr, rpv, \
                         addr0, addr1, offset, extraFields, hi16=0):
@@ -10590,7 +10981,7 @@ class KernelWriterAssembly(KernelWriter):
     rpv = regs per vector
     """
 
-    kStr = ""
+    kl = []
 
     if useBuffer:
       tmpSgpr = 0
@@ -10598,48 +10989,36 @@ class KernelWriterAssembly(KernelWriter):
       # if offset >= 4096, use soffset instead
       if offset >= 4096:
         tmpSgpr = sgpr(self.getTmpSgpr(1).idx())
-        kStr += inst("s_mov_b32", tmpSgpr, offset, "large offset")
+        kl.append(inst("s_mov_b32", tmpSgpr, offset, "large offset"))
         offset = 0
 
-      if bps==2 and hi16:
-        kStr += inst("buffer_store_short_d16_hi", vgpr(srcVgpr, rpv*2), addr0, \
-                  addr1, tmpSgpr, "offen", "offset:%u"%offset, extraFields, "store D")
-      elif bps==2 and not hi16:
-        kStr += inst("buffer_store_short", vgpr(srcVgpr, rpv*2), addr0, \
-                  addr1, tmpSgpr, "offen", "offset:%u"%offset, extraFields, "store D")
-      elif bps==4:
-        kStr += inst("buffer_store_dword", vgpr(srcVgpr, rpv), addr0, \
-                  addr1, tmpSgpr, "offen", "offset:%u"%offset, extraFields, "store D")
-      elif bps==8:
-        kStr += inst("buffer_store_dwordx2", vgpr(srcVgpr, rpv), addr0, \
-                  addr1, tmpSgpr, "offen", "offset:%u"%offset, extraFields, "store D")
-      elif bps==16:
-        kStr += inst("buffer_store_dwordx4", vgpr(srcVgpr, rpv), addr0, \
-                  addr1, tmpSgpr, "offen", "offset:%u"%offset, extraFields, "store D")
+      if bps==2:
+        storeInst = "buffer_store_short_d16_hi" if hi16 else "buffer_store_short"
+        kl.append(inst(storeInst, vgpr(srcVgpr, rpv*2), addr0, \
+                  addr1, tmpSgpr, "offen", "offset:%u"%offset, extraFields, "store D"))
+      elif bps in self.bufferStoreInsts:
+        kl.append(inst(self.bufferStoreInsts[bps], vgpr(srcVgpr, rpv), addr0, \
+                  addr1, tmpSgpr, "offen", "offset:%u"%offset, extraFields, "store D"))
       elif bps == 32:
         # split into two dwordx4 loads. Offset the second by +0.5 bps
-        kStr += inst("buffer_store_dwordx4", vgpr(srcVgpr, rpv/2), addr0, \
-                  addr1, tmpSgpr, "offen", "offset:%u"%offset, extraFields, "store D")
+        kl.append(inst("buffer_store_dwordx4", vgpr(srcVgpr, rpv/2), addr0, \
+                  addr1, tmpSgpr, "offen", "offset:%u"%offset, extraFields, "store D"))
 
-        kStr += inst("buffer_store_dwordx4", vgpr(int(srcVgpr +rpv/2), rpv/2), addr0, \
-                  addr1, tmpSgpr, "offen", "offset:%u"%(int(offset+bps/2)), extraFields, "store D")
+        kl.append(inst("buffer_store_dwordx4", vgpr(int(srcVgpr +rpv/2), rpv/2), addr0, \
+                  addr1, tmpSgpr, "offen", "offset:%u"%(int(offset+bps/2)), extraFields, "store D"))
       else:
         assert 0, "bad bps"
     else:
       if bps==2 and hi16:
-        kStr += inst("flat_store_short_d16_hi", addr0, vgpr(srcVgpr*2), extraFields, "store D" )
+        kl.append(inst("flat_store_short_d16_hi", addr0, vgpr(srcVgpr*2), extraFields, "store D" ))
       elif bps==2 and not hi16:
-        kStr += inst("flat_store_short", addr0, vgpr(srcVgpr, rpv*2), extraFields, "store D" )
-      elif bps==4:
-        kStr += inst("flat_store_dword", addr0, vgpr(srcVgpr, rpv), extraFields, "store D" )
-      elif bps==8:
-        kStr += inst("flat_store_dwordx2", addr0, vgpr(srcVgpr, rpv), extraFields, "store D" )
-      elif bps==16:
-        kStr += inst("flat_store_dwordx4", addr0, vgpr(srcVgpr, rpv), extraFields, "store D" )
+        kl.append(inst("flat_store_short", addr0, vgpr(srcVgpr, rpv*2), extraFields, "store D" ))
+      elif bps in self.flatStoreInsts:
+        kl.append(inst(self.flatStoreInsts[bps], addr0, vgpr(srcVgpr, rpv), extraFields, "store D" ))
       else:
          assert 0, "bad bps"
 
-    return kStr
+    return "".join(kl)
 
   ##############################################################################
   #
@@ -10649,16 +11028,12 @@ class KernelWriterAssembly(KernelWriter):
     Add stores for the element with addrCalc and sumIdx.
     tmpS01 is a single :temp sGPR
     """
-    kStr = ""
+    kl = []
     if self.do["GlobalWrite"]:
       # perform vector stores here, so no VI indexing.
       # if GWVW > Vw, might need to support loops to
       # implement wider stores
-      ntStr = ""
-      if kernel["NonTemporalC"]%2==1:
-        ntStr += " glc"
-      if kernel["NonTemporalC"]//2==1:
-        ntStr += " slc"
+      ntStr = self.ntStrC
 
       bps = self.bpeCexternal * ss.cfg.gwvw
       rpv = self.bpeCexternal * ss.cfg.gwvw / self.bpr
@@ -10672,157 +11047,183 @@ class KernelWriterAssembly(KernelWriter):
 
       useBuffer = kernel["BufferStore"]
       if ss.optSrdIncForRow and addrCalc.rowInc:
-        kStr += addrCalc.incrementToNextRow(kernel, "D", ss, tmpS01)
-      if kernel["ProblemType"]["DestDataType"].isHalf() or kernel["ProblemType"]["DestDataType"].isBFloat16():
-        if not kernel["ProblemType"]["HighPrecisionAccumulate"]:
-          # (H,H,H,H,H,H), internal H
-          kStr += self.chooseGlobalWrite(useBuffer, bps, sumIdx//2, rpv, \
-                    addr0, addr1, addrCalc.globalOffset, ntStr, hi16=sumIdx%2)
-        else:
-          # (B,B,B,B,S,S), internal S
-          # (H,H,H,H,H,H), internal S
-          # (H,H,H,H,S,S), internal S -> new
-          kStr += self.chooseGlobalWrite(useBuffer, bps, sumIdx, rpv, \
-                    addr0, addr1, addrCalc.globalOffset, ntStr, hi16=0)
-      elif kernel["ProblemType"]["DestDataType"].isInt32() or kernel["ProblemType"]["DestDataType"].isSingle():
-        kStr += self.chooseGlobalWrite(useBuffer, bps, sumIdx, rpv, \
-                  addr0, addr1, addrCalc.globalOffset, ntStr)
-      elif kernel["ProblemType"]["DestDataType"].isDouble() or kernel["ProblemType"]["DestDataType"].isSingleComplex():
-        kStr += self.chooseGlobalWrite(useBuffer, bps, sumIdx*2, rpv, \
-                  addr0, addr1, addrCalc.globalOffset, ntStr)
-      elif kernel["ProblemType"]["DestDataType"].isDoubleComplex():
-        rps = kernel["ProblemType"]["DestDataType"].numRegisters()
-        kStr += self.chooseGlobalWrite(useBuffer, bps, sumIdx*rps, rpv, \
-                  addr0, addr1, addrCalc.globalOffset, ntStr)
+        kl.append(addrCalc.incrementToNextRow(kernel, "D", ss, tmpS01))
+      if self.storePackedHalf:
+        kl.append(self.chooseGlobalWrite(useBuffer, bps, sumIdx//2, rpv, \
+                  addr0, addr1, addrCalc.globalOffset, ntStr, hi16=sumIdx%2))
+      elif self.storeRegsPerSumIdx:
+        kl.append(self.chooseGlobalWrite(useBuffer, bps, sumIdx*self.storeRegsPerSumIdx, rpv, \
+                  addr0, addr1, addrCalc.globalOffset, ntStr))
 
-    return kStr
+    return "".join(kl)
 
 
   ##############################################################################
   # choose the ADD instruction for combining external C with internal C
   # used in atomic=1 case to compute expected external data
+  # returns None when no add is needed
   ##############################################################################
-  def chooseAddForAtomic(self, kernel, dst, src0, src1, comment):
-    kStr = ""
-    if kernel["ProblemType"]["DataType"].isBFloat16():
+  def addOpcodeForAtomic(self, kernel):
+    dataType = kernel["ProblemType"]["DataType"]
+    if dataType.isBFloat16():
       if kernel["_GlobalAccumulation"]:
-        kStr += inst("v_add_f32", dst, src0, src1, comment)
-    elif kernel["ProblemType"]["DataType"].isHalf():
+        return "v_add_f32"
+      return None
+    elif dataType.isHalf():
       if kernel["_GlobalAccumulation"]:
-        kStr += inst("v_add_f32", dst, src0, src1, comment)
+        return "v_add_f32"
       elif kernel["ProblemType"]["HighPrecisionAccumulate"]:
-        kStr += inst("v_mad_mix need madmix bozo", \
-                  dst, src0, src1, \
-                  comment)
+        return "v_mad_mix need madmix bozo"
       else:
-        kStr += inst("v_pk_add_f16", \
-                  dst, src0, src1, \
-                  comment)
-    elif kernel["ProblemType"]["DataType"].isInt8x4() or kernel["ProblemType"]["DataType"].isInt8():
+        return "v_pk_add_f16"
+    elif dataType.isInt8x4() or dataType.isInt8():
       # assume v_add_i32 can be used in place of v_add_f32
       # need to add saturation directive to v_add_i32 instruction to clamp integer arithmetic
-      kStr += inst("_v_add_i32", \
-                dst, src0, src1, \
-                comment)
-    elif kernel["ProblemType"]["DataType"].isSingle():
-      kStr += inst("v_add_f32", \
-                dst, src0, src1, \
-                comment)
+      return "_v_add_i32"
+    elif dataType.isSingle():
+      return "v_add_f32"
     else:
        #support for double
-      kStr += inst("v_add_f64", \
-                 dst, src0, src1, \
-                 comment)
+      return "v_add_f64"
 
-    return kStr
+  def chooseAddForAtomic(self, kernel, dst, src0, src1, comment):
+    addOp = self.addOpcodeForAtomic(kernel)
+    return inst(addOp, dst, src0, src1, comment) if addOp else ""
+
+  ##############################################################################
+  # OR the lane masks together into sDst.  With 4 or more masks sTmp is used as
+  # a second accumulator so the two s_or chains (even / odd masks) don't depend
+  # on each other; fewer masks are cheaper as one chain
+  # returns a list of instructions
+  ##############################################################################
+  def orLaneMasks(self, sDst, sTmp, masks):
+    kl = []
+    if len(masks) < 2:
+      if masks:
+        kl.append(inst(self.sMovBWf, sDst, masks[0], "or to add threads"))
+      return kl
+    chains = [(sDst, masks[0::2]), (sTmp, masks[1::2])] if len(masks) >= 4 else [(sDst, masks)]
+    for step in range(0, len(chains[0][1]) - 1):
+      for acc, chainMasks in chains:
+        if step == 0:
+          kl.append(inst(self.sOrBWf, acc, chainMasks[0], chainMasks[1], "or to add threads"))
+        elif step+1 < len(chainMasks):
+          kl.append(inst(self.sOrBWf, acc, chainMasks[step+1], acc, "or to add threads"))
+    if len(chains) > 1:
+      kl.append(inst(self.sOrBWf, sDst, sDst, sTmp, "combine partial masks"))
+    return kl
 
   ##############################################################################
   ##############################################################################
   def applyAlpha(self, kernel, gwvw, elementSumIdx, elementIdx, tmpS01):
-    kStr = ""
-
     if kernel["_GlobalAccumulation"] == 'MultipleBuffer':
-      return kStr
+      return ""
+
+    kl = []
 
     if self.do["ApplyAlpha"]:
-      for vi in range(0, gwvw):
-        sumIdxV = elementSumIdx[elementIdx] + vi
-        if kernel["ProblemType"]["ComputeDataType"].isHalf():
-          # (h,h,h,h,h,h), internal alpha is f16 (2-16bits)
-          if not kernel["ProblemType"]["HighPrecisionAccumulate"]:
-            if sumIdxV%2:
-              kStr += inst("v_pk_mul_f16", vgpr("ValuC+%u"%(sumIdxV//2)), sgpr("Alpha"), vgpr("ValuC+%u"%(sumIdxV//2)), "*= alpha sumIdx=%u vi=%u"%(elementSumIdx[elementIdx], vi))
+      # the type dispatch below does not depend on vi
+      computeDataType = kernel["ProblemType"]["ComputeDataType"]
+      hpa = kernel["ProblemType"]["HighPrecisionAccumulate"]
+      # complex temps are reused by every vi, so check them out once
+      if computeDataType.isSingleComplex():
+        tmpVgpr = self.vgprPool.checkOut(1)
+      elif computeDataType.isDoubleComplex():
+        vtmp1 = self.vgprPool.checkOutAligned(2, 2)
+        vtmp2 = self.vgprPool.checkOutAligned(2, 2)
+      # (h,h,h,h,h,h), internal alpha is f16 (2-16bits)
+      # one v_pk_mul_f16 scales a packed pair, issued at the odd sumIdx of each pair
+      packedHalf = computeDataType.isHalf() and not hpa
+      if packedHalf:
+        sumIdx = elementSumIdx[elementIdx]
+        for sumIdxV in range(sumIdx | 1, sumIdx + gwvw, 2):
+          vc = _vgprValuC(sumIdxV//2)
+          kl.append(inst("v_pk_mul_f16", vc, sgpr("Alpha"), vc, "*= alpha sumIdx=%u vi=%u"%(sumIdx, sumIdxV - sumIdx)))
+      else:
+        for vi in range(0, gwvw):
+          sumIdxV = elementSumIdx[elementIdx] + vi
           # (h,h,h,h,h,h) + HPA, internal alpha is cvt to single
-          else:
-            kStr += inst("v_mul_f32", vgpr("ValuC+%u"%sumIdxV), sgpr("Alpha"), vgpr("ValuC+%u"%sumIdxV), "*= alpha")
+          if computeDataType.isHalf():
+            vc = _vgprValuC(sumIdxV)
+            kl.append(inst("v_mul_f32", vc, sgpr("Alpha"), vc, "*= alpha"))
             if self.db["ForceExpectedValue"]:
-              kStr += inst("v_mov_b32", vgpr("ValuC+%u"%sumIdxV), self.db["ValueCExpectedValue"], "force expected value" )
+              kl.append(inst("v_mov_b32", vc, self.db["ValueCExpectedValue"], "force expected value" ))
             if self.db["ForceVSerial"]:
-              kStr += inst("v_mov_b32", vgpr("ValuC+%u"%sumIdxV), vgpr("Serial"), "force expected value to serial" )
+              kl.append(inst("v_mov_b32", vc, vgpr("Serial"), "force expected value to serial" ))
             if self.db["CheckValueC"]:
-              kStr += inst("s_mov_b32", sgpr(tmpS01), self.db["ValueCExpectedValue"], "Move expected value")
-              kStr += self.assert_eq(vgpr("ValuC+%u"%sumIdxV), sgpr(tmpS01))
-
-        # Int8 (TODO- Int8x4 not checked, but should be OK)
-        elif kernel["ProblemType"]["ComputeDataType"].isInt32():
-          # below assume we use v_mul_lo_u32. Could also use v_mul_i32_i24.
-          # kStr += inst("v_mul_i32_i24", vgpr("ValuC+%u"%sumIdxV), sgpr("Alpha"), vgpr("ValuC+%u"%sumIdxV), "*= alpha" )
-          kStr += inst("v_mul_lo_u32", vgpr("ValuC+%u"%sumIdxV), sgpr("Alpha"), vgpr("ValuC+%u"%sumIdxV), "*= alpha" )
-          if self.db["ForceExpectedValue"]:
-            kStr += inst("v_mov_b32", vgpr("ValuC+%u"%sumIdxV), self.db["ValueCExpectedValue"], "force expected value" )
-          if self.db["CheckValueC"]:
-            kStr += inst("s_mov_b32", sgpr(tmpS01), self.db["ValueCExpectedValue"], "Move expected value")
-            kStr += self.assert_eq(vgpr("ValuC+%u"%sumIdxV), sgpr(tmpS01))
-
-        # sgemm, HPA-bfgemm(b,b,b,b,s,s), and HPA-hgemm(h,h,h,h,s,s) (new)
-        elif kernel["ProblemType"]["ComputeDataType"].isSingle():
-          kStr += inst("v_mul_f32", vgpr("ValuC+%u"%sumIdxV), sgpr("Alpha"), vgpr("ValuC+%u"%sumIdxV), "*= alpha" )
-          if self.db["ForceExpectedValue"]:
-            kStr += inst("v_mov_b32", vgpr("ValuC+%u"%sumIdxV), self.db["ValueCExpectedValue"], "force expected value" )
-          if self.db["ForceVSerial"]:
-            kStr += inst("v_mov_b32", vgpr("ValuC+%u"%sumIdxV), vgpr("Serial"), "force expected value to serial" )
-          if self.db["CheckValueC"]:
-            kStr += inst("s_mov_b32", sgpr(tmpS01), self.db["ValueCExpectedValue"], "Move expected value")
-            kStr += self.assert_eq(vgpr("ValuC+%u"%sumIdxV), sgpr(tmpS01))
-
-        # dgemm
-        elif kernel["ProblemType"]["ComputeDataType"].isDouble():
-          kStr += inst("v_mul_f64", vgpr("ValuC+%u"%(sumIdxV*2),2), sgpr("Alpha",2), vgpr("ValuC+%u"%(sumIdxV*2),2), "*= alpha")
+              kl.append(inst("s_mov_b32", sgpr(tmpS01), self.db["ValueCExpectedValue"], "Move expected value"))
+              kl.append(self.assert_eq(vc, sgpr(tmpS01)))
+
+          # Int8 (TODO- Int8x4 not checked, but should be OK)
+          elif computeDataType.isInt32():
+            # below assume we use v_mul_lo_u32. Could also use v_mul_i32_i24.
+            # kStr += inst("v_mul_i32_i24", vgpr("ValuC+%u"%sumIdxV), sgpr("Alpha"), vgpr("ValuC+%u"%sumIdxV), "*= alpha" )
+            vc = _vgprValuC(sumIdxV)
+            kl.append(inst("v_mul_lo_u32", vc, sgpr("Alpha"), vc, "*= alpha" ))
+            if self.db["ForceExpectedValue"]:
+              kl.append(inst("v_mov_b32", vc, self.db["ValueCExpectedValue"], "force expected value" ))
+            if self.db["CheckValueC"]:
+              kl.append(inst("s_mov_b32", sgpr(tmpS01), self.db["ValueCExpectedValue"], "Move expected value"))
+              kl.append(self.assert_eq(vc, sgpr(tmpS01)))
 
-        # single precision complex
-        elif kernel["ProblemType"]["ComputeDataType"].isSingleComplex():
-          tmpVgpr = self.vgprPool.checkOut(1)
-          kStr += inst("v_mov_b32", vgpr(tmpVgpr), vgpr("ValuC+%u"%(sumIdxV*2)), "store Cr")
-          kStr += inst("v_mul_f32", vgpr("ValuC+%u"%(sumIdxV*2)), sgpr("Alpha"), vgpr("ValuC+%u"%(sumIdxV*2)), "*= alpha ( Cr = Ar * Cr)")
-          kStr += inst("_v_mac_f32", vgpr("ValuC+%u"%(sumIdxV*2)), "-" + sgpr("Alpha+1"), vgpr("ValuC+%u"%(sumIdxV*2+1)), "*= alpha ( Cr += -Ai * Ci )")
-          kStr += inst("v_mul_f32", vgpr("ValuC+%u"%(sumIdxV*2+1)), sgpr("Alpha"), vgpr("ValuC+%u"%(sumIdxV*2+1)), "*= alpha ( Ci = Ar * Ci)")
-          kStr += inst("_v_mac_f32", vgpr("ValuC+%u"%(sumIdxV*2+1)), sgpr("Alpha+1"), vgpr(tmpVgpr), "*= alpha ( Ci += Ai * Cr_backup )")
-          self.vgprPool.checkIn(tmpVgpr)
-
-        # double precision complex
-        elif kernel["ProblemType"]["ComputeDataType"].isDoubleComplex():
-          vtmp1 = self.vgprPool.checkOutAligned(2, 2)
-          vtmp2 = self.vgprPool.checkOutAligned(2, 2)
-          # tmp1 = a.real * b.real
-          kStr += inst("v_mul_f64", vgpr(vtmp1,2), sgpr("Alpha+0",2), vgpr("ValuC+%u"%(sumIdxV*4+0),2), "")
-          # tmp2 = a.imag * b.real
-          kStr += inst("v_mul_f64", vgpr(vtmp2,2), sgpr("Alpha+2",2), vgpr("ValuC+%u"%(sumIdxV*4+0),2), "")
-          # c.real = a.real * b.real - a.imag * b.imag = tmp1 - a.imag * b.imag
-          kStr += "v_fma_f64 %s, %s, -%s, %s%s" % (vgpr("ValuC+%u"%(sumIdxV*4+0),2), sgpr("Alpha+2",2), vgpr("ValuC+%u"%(sumIdxV*4+2),2), vgpr(vtmp1,2), self.endLine)
-          # c.imag = a.real * b.imag + a.imag * b.real = a.real * b.imag + tmp2
-          kStr += "v_fma_f64 %s, %s, %s, %s%s" % (vgpr("ValuC+%u"%(sumIdxV*4+2),2), sgpr("Alpha+0",2), vgpr("ValuC+%u"%(sumIdxV*4+2),2), vgpr(vtmp2,2), self.endLine)
-          self.vgprPool.checkIn(vtmp1)
-          self.vgprPool.checkIn(vtmp2)
+          # sgemm, HPA-bfgemm(b,b,b,b,s,s), and HPA-hgemm(h,h,h,h,s,s) (new)
+          elif computeDataType.isSingle():
+            vc = _vgprValuC(sumIdxV)
+            kl.append(inst("v_mul_f32", vc, sgpr("Alpha"), vc, "*= alpha" ))
+            if self.db["ForceExpectedValue"]:
+              kl.append(inst("v_mov_b32", vc, self.db["ValueCExpectedValue"], "force expected value" ))
+            if self.db["ForceVSerial"]:
+              kl.append(inst("v_mov_b32", vc, vgpr("Serial"), "force expected value to serial" ))
+            if self.db["CheckValueC"]:
+              kl.append(inst("s_mov_b32", sgpr(tmpS01), self.db["ValueCExpectedValue"], "Move expected value"))
+              kl.append(self.assert_eq(vc, sgpr(tmpS01)))
+
+          # dgemm
+          elif computeDataType.isDouble():
+            vc = _vgprValuC(sumIdxV*2, 2)
+            kl.append(inst("v_mul_f64", vc, sgpr("Alpha",2), vc, "*= alpha"))
+
+          # single precision complex
+          elif computeDataType.isSingleComplex():
+            vcR = _vgprValuC(sumIdxV*2)
+            vcI = _vgprValuC(sumIdxV*2+1)
+            kl.append(inst("v_mov_b32", vgpr(tmpVgpr), vcR, "store Cr"))
+            kl.append(inst("v_mul_f32", vcR, sgpr("Alpha"), vcR, "*= alpha ( Cr = Ar * Cr)"))
+            kl.append(inst("_v_mac_f32", vcR, "-" + sgpr("Alpha+1"), vcI, "*= alpha ( Cr += -Ai * Ci )"))
+            kl.append(inst("v_mul_f32", vcI, sgpr("Alpha"), vcI, "*= alpha ( Ci = Ar * Ci)"))
+            kl.append(inst("_v_mac_f32", vcI, sgpr("Alpha+1"), vgpr(tmpVgpr), "*= alpha ( Ci += Ai * Cr_backup )"))
+
+          # double precision complex
+          elif computeDataType.isDoubleComplex():
+            vcR = _vgprValuC(sumIdxV*4+0, 2)
+            vcI = _vgprValuC(sumIdxV*4+2, 2)
+            # both products of a.imag are taken before c.real is overwritten,
+            # then the two fmas are independent of each other
+            # tmp1 = a.imag * b.imag
+            kl.append(inst("v_mul_f64", vgpr(vtmp1,2), sgpr("Alpha+2",2), vcI, ""))
+            # tmp2 = a.imag * b.real
+            kl.append(inst("v_mul_f64", vgpr(vtmp2,2), sgpr("Alpha+2",2), vcR, ""))
+            # c.real = a.real * b.real - a.imag * b.imag = a.real * b.real - tmp1
+            kl.append("v_fma_f64 %s, %s, %s, -%s%s" % (vcR, sgpr("Alpha+0",2), vcR, vgpr(vtmp1,2), self.endLine))
+            # c.imag = a.real * b.imag + a.imag * b.real = a.real * b.imag + tmp2
+            kl.append("v_fma_f64 %s, %s, %s, %s%s" % (vcI, sgpr("Alpha+0",2), vcI, vgpr(vtmp2,2), self.endLine))
+
+      if computeDataType.isSingleComplex():
+        self.vgprPool.checkIn(tmpVgpr)
+      elif computeDataType.isDoubleComplex():
+        self.vgprPool.checkIn(vtmp1)
+        self.vgprPool.checkIn(vtmp2)
 
-    return kStr
+    return "".join(kl)
 
 
   ##############################################################################
   # Global Read C Input
   ##############################################################################
   def readCInput(self, kernel, ss, addrCalc, vc0, data, gwvw, addr, tmpS01):
-    kStr = ""
-    bps = kernel["ProblemType"]["DestDataType"].numBytes() * gwvw
+    kl = []
+    destDataType = kernel["ProblemType"]["DestDataType"]
+    bps = destDataType.numBytes() * gwvw
     useBuffer = kernel["BufferStore"]
 
     if kernel["BufferStore"]:
@@ -10833,25 +11234,25 @@ class KernelWriterAssembly(KernelWriter):
       addr1 = ""
 
     if ss.optSrdIncForRow and addrCalc.rowInc:
-      kStr += addrCalc.incrementToNextRow(kernel, "C", ss, tmpS01)
+      kl.append(addrCalc.incrementToNextRow(kernel, "C", ss, tmpS01))
 
-    if kernel["ProblemType"]["DestDataType"].isHalf():
-      kStr += self.chooseGlobalRead(useBuffer, bps, data, \
+    if destDataType.isHalf():
+      kl.append(self.chooseGlobalReadStr(useBuffer, bps, data, \
                 addr0, addr1, soffset=0, offset=addrCalc.globalOffset, \
                 extraFields="", hi16=vc0 % 2,
-                comment="load C for beta calc").toStr()
-    elif kernel["ProblemType"]["DestDataType"].isBFloat16() or \
-         kernel["ProblemType"]["DestDataType"].isInt32() or \
-         kernel["ProblemType"]["DestDataType"].isSingle() or \
-         kernel["ProblemType"]["DestDataType"].isDouble() or \
-         kernel["ProblemType"]["DestDataType"].isSingleComplex() or \
-         kernel["ProblemType"]["DestDataType"].isDoubleComplex():
-      kStr += self.chooseGlobalRead(useBuffer, bps, data, \
+                comment="load C for beta calc"))
+    elif destDataType.isBFloat16() or \
+         destDataType.isInt32() or \
+         destDataType.isSingle() or \
+         destDataType.isDouble() or \
+         destDataType.isSingleComplex() or \
+         destDataType.isDoubleComplex():
+      kl.append(self.chooseGlobalReadStr(useBuffer, bps, data, \
                 addr0, addr1, soffset=0, offset=addrCalc.globalOffset, \
                 extraFields="", \
-                comment="load C for beta calc").toStr()
+                comment="load C for beta calc"))
 
-    return kStr
+    return "".join(kl)
 
 
   ##############################################################################
@@ -10860,10 +11261,10 @@ class KernelWriterAssembly(KernelWriter):
   def globalWriteBatch(self, kernel, ss, batchIdx, applyAlpha, beta, edge, atomic, gwvw, atomicW, \
       batchElements, coord0, coord1, addrD, addrC, \
       tmpVgpr, batchElementSgprs, tmpSgpr, codeAccVgprRead):
-    kStr = ""
+    kl = []
 
-    kStr += self.comment1("optSingleColVgpr=%u optSharedColVgpr=%u optSharedMask=%u optSrdIncForRow=%u" % \
-              (ss.optSingleColVgpr, ss.optSharedColVgpr, ss.optSharedMask, ss.optSrdIncForRow))
+    kl.append(self.comment1("optSingleColVgpr=%u optSharedColVgpr=%u optSharedMask=%u optSrdIncForRow=%u" % \
+              (ss.optSingleColVgpr, ss.optSharedColVgpr, ss.optSharedMask, ss.optSrdIncForRow)))
     if atomic:
       # all kinds of code relies on this assumption:
       assert(atomicW <= gwvw)
@@ -10875,14 +11276,11 @@ class KernelWriterAssembly(KernelWriter):
     # tt = trhead tile, vc=vector component
     commentStr = "Global Write%s%s Batch #%u (d1,d0,vc1,vc0) =\n   " \
         % (" Beta" if beta else "", " Edge" if edge else "", batchIdx)
-    for elementIdx in range(0, len(batchElements)):
-      element = batchElements[elementIdx]
-      commentStr += "(%u,%u,%u,%u:vw%u%s)" % \
-        (element[0], element[1], element[2], element[3], gwvw,
-         ":vaw:%u"%atomicW if atomic else "")
-      if elementIdx < len(batchElements)-1:
-        commentStr += "; "
-    kStr += self.comment3(commentStr)
+    vawStr = ":vaw:%u"%atomicW if atomic else ""
+    commentStr += "; ".join("(%u,%u,%u,%u:vw%u%s)" % \
+        (element[0], element[1], element[2], element[3], gwvw, vawStr) \
+        for element in batchElements)
+    kl.append(self.comment3(commentStr))
     # print(self.kernelName)
     # print(commentStr)
 
@@ -10893,30 +11291,44 @@ class KernelWriterAssembly(KernelWriter):
     tmpS01 = tmpSgpr # scratch sgprs
     tmpS23 = tmpS01+self.laneSGPRCount
 
-    wavelen = self.kernel["WavefrontSize"]
     laneSGPRC = self.laneSGPRCount
 
+    # loop invariants for the per-element / per-avi loops below
+    destDataType = kernel["ProblemType"]["DestDataType"]
+    isDoubleDest = destDataType.isDouble()
+    isHalfDest = destDataType.isHalf()
+    isBF16Dest = destDataType.isBFloat16()
+    hpa = kernel["ProblemType"]["HighPrecisionAccumulate"]
+    bufferStore = kernel["BufferStore"]
+    globalAccum = kernel["_GlobalAccumulation"]
+    sgprSrdD4 = sgpr("SrdD", 4)
+    sgprSrdC4 = sgpr("SrdC", 4)
+    numVgprsPerDataPerVI = ss.cfg.numVgprsPerDataPerVI
+    # atomic add in a single instruction, no CAS loop and no D preload
+    usePkAtomicAdd = self.useAtomicPkAddF16 and atomicW == 2
+    useNativeAtomic = self.useAtomicAdd or usePkAtomicAdd
+
     ########################################
     # calculate addr and masks
-    kStr += self.comment("calc coords, apply mask, and issue loads (if necessary)")
+    kl.append(self.comment("calc coords, apply mask, and issue loads (if necessary)"))
     # On input, coord0 and coord1 are VGPRs computed in the pre-batch code, based
     # on the thread and tid number.  These are ELEMENT offsets from start of tensor C
     # for the top-left corner this thread will write.  These are not changed
     # across all the store loop iters.
     if self.db["ConservativeWaitCnt"] & 0x10:
-      kStr += "s_barrier // debug\n"
-      kStr += inst("s_waitcnt", "vmcnt(0)", "ConservativeWaitCnt" )
+      kl.append("s_barrier // debug\n")
+      kl.append(inst("s_waitcnt", "vmcnt(0)", "ConservativeWaitCnt" ))
       if self.archCaps["SeparateVscnt"]:
-        kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
-      kStr += "s_barrier // debug\n"
+        kl.append(inst("s_waitcnt_vscnt", "null", "0", "writes"))
+      kl.append("s_barrier // debug\n")
     if not edge and self.db["ForceEdgeStores"]>=2:
-      kStr += self.bomb() # should not get here
+      kl.append(self.bomb()) # should not get here
     if edge and self.db["AssertNoEdge"]:
-      kStr += self.bomb() # should not get here
+      kl.append(self.bomb()) # should not get here
 
     for elementIdx in range(0, len(batchElements)):
       element = batchElements[elementIdx]
-      addr = ss.elementAddr[elementIdx].addrVgpr
+      addr = ss.elementAddrVgpr[elementIdx]
       addrCalc = ss.elementAddr[elementIdx]
       data = ss.elementData[elementIdx]
       mask = ss.elementMask[elementIdx]
@@ -10926,77 +11338,79 @@ class KernelWriterAssembly(KernelWriter):
       vc1 = element[2]
       vc0 = element[3]
 
-      kStr += addrCalc.emitAddressSetupCode(kernel, ss, tmpVgpr, tmpS01, edge, beta, atomic, mask, elementIdx, addr)
+      kl.append(addrCalc.emitAddressSetupCode(kernel, ss, tmpVgpr, tmpS01, edge, beta, atomic, mask, elementIdx, addr))
 
       if edge:
-        kStr += addrCalc.edgeProtectCode(kernel, edge, beta, atomic, mask, tmpSgpr)
+        kl.append(addrCalc.edgeProtectCode(kernel, ss, edge, beta, atomic, mask, tmpSgpr))
 
       if beta:
-        kStr += addrCalc.emitLdChange(kernel, ss, 'C', edge, beta, mask, (elementIdx == 0), tmpVgpr, addr, addrC)
-        kStr += self.readCInput(kernel, ss, addrCalc, vc0, data, gwvw, addr, tmpS01)
+        kl.append(addrCalc.emitLdChange(kernel, ss, 'C', edge, beta, mask, (elementIdx == 0), tmpVgpr, addr, addrC))
+        kl.append(self.readCInput(kernel, ss, addrCalc, vc0, data, gwvw, addr, tmpS01))
         loadsIssued += 1
 
-      kStr += addrCalc.emitLdChange(kernel, ss, 'D', edge, beta, mask, (elementIdx == len(batchElements)-1), tmpVgpr, addr, addrD)
+      kl.append(addrCalc.emitLdChange(kernel, ss, 'D', edge, beta, mask, (elementIdx == len(batchElements)-1), tmpVgpr, addr, addrD))
 
-      if atomic and (not self.useAtomicAdd):
+      if atomic and (not useNativeAtomic):
         # load c into data+1 because of CAS structure
         # TODO - Fix for double here, would need bigger load
         # FIME
-        bps = kernel["ProblemType"]["DestDataType"].numBytes()
+        bps = destDataType.numBytes()
         # gwvw is the number of elements in the batch
         # iterate over number of atomic operations to perform, each of width atomicW
         for avi in range(0, gwvw//atomicW):
-          dataV = ss.elementData[elementIdx] + int(avi*ss.cfg.numVgprsPerDataPerVI)
+          dataV = data + int(avi*numVgprsPerDataPerVI)
           bpm = self.bpeCexternal * atomicW
-          useBuffer = kernel["BufferStore"]
-          if kernel["BufferStore"]: # yes, BufferStore here - use same addressing regs for this load
+          useBuffer = bufferStore
+          if bufferStore: # yes, BufferStore here - use same addressing regs for this load
             addr0 = vgpr(addr)
-            addr1 = sgpr("SrdD", 4)
+            addr1 = sgprSrdD4
           else:
             addr0 = vgpr(addr,2)
             addr1 = ""
           # Calculate vgpr Indx for 32-bit/64-bit instruction
           # DGEMM use SRCS[2] register
           vgprIdx = 1*(bpm//4)
-          kStr += self.chooseGlobalRead(useBuffer, bpm, dataV+vgprIdx, \
+          kl.append(self.chooseGlobalReadStr(useBuffer, bpm, dataV+vgprIdx, \
                     addr0, addr1, soffset=0, offset=addrCalc.globalOffset, extraFields="",
-                    comment="load D (atomic) bpm=%u vaw=%u"%(bpm,atomicW)).toStr()
+                    comment="load D (atomic) bpm=%u vaw=%u"%(bpm,atomicW)))
 
       if kernel["InterleaveAlpha"] and applyAlpha:
-        kStr += self.applyAlpha(kernel, gwvw, ss.elementSumIdx, elementIdx, tmpS01)
+        kl.append(self.applyAlpha(kernel, gwvw, ss.elementSumIdx, elementIdx, tmpS01))
 
-      if not kernel["BufferStore"]:
+      if not bufferStore:
         offsetSrc = (tmpVgpr+2) if beta else addr
 
-        kStr += inst("_v_add_co_u32",  vgpr(addr+0), self.vcc, vgpr(addrD+0), \
-            vgpr(offsetSrc+0), "addr = D + index*bytes (lo)" )
-        kStr += inst("_v_addc_co_u32", vgpr(addr+1), self.vcc, vgpr(addrD+1), \
-            vgpr(offsetSrc+1), self.vcc, "addr = D + index*bytes (hi)")
+        kl.append(inst("_v_add_co_u32",  vgpr(addr+0), self.vcc, vgpr(addrD+0), \
+            vgpr(offsetSrc+0), "addr = D + index*bytes (lo)" ))
+        kl.append(inst("_v_addc_co_u32", vgpr(addr+1), self.vcc, vgpr(addrD+1), \
+            vgpr(offsetSrc+1), self.vcc, "addr = D + index*bytes (hi)"))
 
         # restore full exec mask for calculating addr of next element
         if edge and (beta or atomic):
-          kStr += inst("s_mov_b{}".format(kernel["WavefrontSize"]), self.exec, -1, "full mask -1 -> exec" )
+          kl.append(inst(self.sMovBWf, self.exec, -1, "full mask -1 -> exec" ))
 
     ########################################
     # AccVgpr read
     if codeAccVgprRead is not None:
       assert(self.serializedStore) # sanity check
       regsPerScalar = self.bpeCinternal//self.bpr # register per scalar
+      nextAccVgprRead = codeAccVgprRead.__next__
+      # offset of each register (scalar-major) within one store instruction
+      accOffsets = [regsPerScalar*vi + rIdx for vi in range(0, gwvw) for rIdx in range(0, regsPerScalar)]
       # loop over store instructions within one batch
       for elementIdx in range(0, len(batchElements)):
-        # loop over scalars within one store instruction
-        for vi in range(0, gwvw):
-          # loop over registers within one scalar
-          for rIdx in range(0, regsPerScalar):
-            kStr += str(codeAccVgprRead.items().pop(0)).replace("__placeholder__", str(ss.elementSumIdx[elementIdx]*regsPerScalar + regsPerScalar*vi + rIdx))
-      kStr += inst("s_nop 1", "2 wait states required before reading vgpr")
+        accBase = ss.elementSumIdx[elementIdx]*regsPerScalar
+        for accOffset in accOffsets:
+          left, right = nextAccVgprRead()
+          kl.append(left + str(accBase + accOffset) + right)
+      kl.append(inst("s_nop 1", "2 wait states required before reading vgpr"))
 
     ########################################
     # rC *= alpha
     if not kernel["InterleaveAlpha"] and applyAlpha:
-      kStr += self.comment("rC *= alpha batchEements=%s"%batchElements)
+      kl.append(self.comment("rC *= alpha batchEements=%s"%batchElements))
       for elementIdx in range(0, len(batchElements)):
-        kStr += self.applyAlpha(kernel, gwvw, ss.elementSumIdx, elementIdx, tmpS01)
+        kl.append(self.applyAlpha(kernel, gwvw, ss.elementSumIdx, elementIdx, tmpS01))
 
     ########################################
     # Atomic
@@ -11038,14 +11452,16 @@ class KernelWriterAssembly(KernelWriter):
       labelString += "EarlyExit"
       labelAfterAtomicLoop = self.getLabelNum(labelString)
 
-      if self.useAtomicAdd:
+      if useNativeAtomic:
         ########################################
         # first attempt write
-        kStr += self.comment("issue first atomic writes")
+        kl.append(self.comment("issue first atomic writes"))
         for elementIdx in range(0, len(batchElements)):
           element  = batchElements[elementIdx]
           addrCalc = ss.elementAddr[elementIdx]
           mask     = ss.elementMask[elementIdx]
+          data     = ss.elementData[elementIdx]
+          sumIdx   = ss.elementSumIdx[elementIdx]
           d1       = element[0]
           d0       = element[1]
           vc1      = element[2]
@@ -11053,39 +11469,66 @@ class KernelWriterAssembly(KernelWriter):
 
           # apply in-bounds exec mask
           if edge:
-            kStr += inst("s_mov_b{}".format(wavelen), self.exec, sgpr(mask,laneSGPRC), "sgprs -> exec (before atomic)" )
+            kl.append(inst(self.sMovBWf, self.exec, sgpr(mask,laneSGPRC), "sgprs -> exec (before atomic)" ))
 
           for avi in range(0, gwvw//atomicW):
-            dataV = ss.elementData[elementIdx] + int(avi*ss.cfg.numVgprsPerDataPerVI)
-            sumIdxV = ss.elementSumIdx[elementIdx] + avi
+            sumIdxV = sumIdx + avi
             if self.do["GlobalWrite"]:
-              if kernel["BufferStore"]:
-                kStr += "buffer_atomic_add_f32 %s, %s, %s, %s    // %s%s" % \
-                    (vgpr("ValuC+%u"%sumIdxV), \
-                     vgpr(addrCalc.addrVgpr,1), \
-                     sgpr("SrdD", 4), \
-                     "0 offen offset:%u" % addrCalc.globalOffset, \
-                     "attempt write avi=%u" % (avi), self.endLine )
+              if usePkAtomicAdd:
+                # ValuC holds packed halves, two per vgpr
+                kl.append(_bufferAtomicPkAddF16(_vgprValuC(sumIdxV//2), \
+                    vgpr(addrCalc.addrVgpr,1), sgprSrdD4, \
+                    addrCalc.globalOffset, avi, self.endLine))
+              elif bufferStore:
+                kl.append(_bufferAtomicAddF32(_vgprValuC(sumIdxV), \
+                    vgpr(addrCalc.addrVgpr,1), sgprSrdD4, \
+                    addrCalc.globalOffset, avi, self.endLine))
               else:
                 pass # TODO:
 
         if edge:
-          kStr += inst("s_mov_b{}".format(wavelen), self.exec, -1, "full mask -> exec" )
+          kl.append(inst(self.sMovBWf, self.exec, -1, "full mask -> exec" ))
       else:
+        # the CAS compares are the same shape for every element and avi,
+        # only the registers change
+        numAvi = gwvw//atomicW
+        addOp = self.addOpcodeForAtomic(kernel)
+        cmpNeInst = "v_cmp_ne_u64" if isDoubleDest else "v_cmp_ne_u32"
+        cmpWidth = 2 if isDoubleDest else 1
+        origCOffset = 2 if isDoubleDest else 1 # original C within dataV
+        atomicDestOffset = 0 if bufferStore else 2
+        # cmpswap_x2 for DGEMM, cmpswap for SGEMM in CAS loop
+        bufferCmpswap = _bufferAtomicCmpswapX2 if isDoubleDest else _bufferAtomicCmpswap
+        cmpswapDataCnt = 4 if isDoubleDest else 2
+        ## number of src[s]/dsst[s] register for DGEMM / SGEMM HGEMM
+        vgprCnt = 2 if isDoubleDest else 1
+        # Calculate vgpr Indx for 32-bit/64-bit instruction
+        # DGEMM use SRCS[2] register
+        vgprIdx = 1*((self.bpeCexternal * atomicW)//4)
+        # ValuC holds packed halves, two per vgpr
+        packedHalfC = destDataType.numRegisters() < 1 and not globalAccum
+        sTmp01 = sgpr(tmpS01,laneSGPRC)
+        sTmp23 = sgpr(tmpS23,laneSGPRC)
+        orTmpMask = inst(self.sOrBWf, sTmp01, sTmp01, sTmp23, "combine with tmp mask")
+        orElementMasks = self.orLaneMasks(sTmp01, sTmp23, \
+            [sgpr(mask,laneSGPRC) for mask in ss.elementMask[:len(batchElements)]])
+
         ########################################
         # wait for batched load
         # TODO - we are always atomic here?
-        kStr += inst("s_waitcnt", "vmcnt(0)", "wait C (atomic)" )
+        kl.append(inst("s_waitcnt", "vmcnt(0)", "wait C (atomic)" ))
         if self.archCaps["SeparateVscnt"]:
-          kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
+          kl.append(inst("s_waitcnt_vscnt", "null", "0", "writes"))
 
         ########################################
         # first attempt write
-        kStr += self.comment("issue first atomic writes")
+        kl.append(self.comment("issue first atomic writes"))
         for elementIdx in range(0, len(batchElements)):
           element = batchElements[elementIdx]
           addrCalc = ss.elementAddr[elementIdx]
           mask = ss.elementMask[elementIdx]
+          data = ss.elementData[elementIdx]
+          sumIdx = ss.elementSumIdx[elementIdx]
           d1 = element[0]
           d0 = element[1]
           vc1 = element[2]
@@ -11093,219 +11536,192 @@ class KernelWriterAssembly(KernelWriter):
 
           # apply in-bounds exec mask
           if edge:
-            kStr += inst("s_mov_b{}".format(wavelen), self.exec, sgpr(mask,laneSGPRC), "sgprs -> exec (before atomic)" )
+            kl.append(inst(self.sMovBWf, self.exec, sgpr(mask,laneSGPRC), "sgprs -> exec (before atomic)" ))
 
           for avi in range(0, gwvw//atomicW):
-            dataV = ss.elementData[elementIdx] + int(avi*ss.cfg.numVgprsPerDataPerVI)
-            sumIdxV = ss.elementSumIdx[elementIdx] + avi
-            ## number of src[s]/dsst[s] register for DGEMM / SGEMM HGEMM
-            vgprCnt = 2 if kernel["ProblemType"]["DestDataType"].isDouble() else 1
-            if kernel["ProblemType"]["DestDataType"].numRegisters() < 1 and not kernel["_GlobalAccumulation"]:
+            dataV = data + int(avi*numVgprsPerDataPerVI)
+            sumIdxV = sumIdx + avi
+            if packedHalfC:
               sumIdxV //= 2
-            if kernel["ProblemType"]["DestDataType"].isDouble(): sumIdxV = sumIdxV * 2
-            bpm = self.bpeCexternal * atomicW
-            # Calculate vgpr Indx for 32-bit/64-bit instruction
-            # DGEMM use SRCS[2] register
-            vgprIdx = 1*(bpm//4)
+            if isDoubleDest: sumIdxV = sumIdxV * 2
             # for atomic, data[1] = original c, data[0] = new c
-            kStr += self.chooseAddForAtomic(kernel, \
-                      vgpr(dataV+0,vgprCnt), vgpr(dataV+1*vgprIdx,vgprCnt), vgpr("ValuC+%u"%sumIdxV,vgprCnt), \
-                      "desired value avi=%u"%avi)
+            if addOp:
+              kl.append(inst(addOp, vgpr(dataV+0,vgprCnt), vgpr(dataV+1*vgprIdx,vgprCnt), _vgprValuC(sumIdxV, vgprCnt), \
+                        "desired value avi=%u"%avi))
 
             # attempt write
-            atomicDestVgpr = dataV if kernel["BufferStore"] else dataV+2
+            atomicDestVgpr = dataV if bufferStore else dataV+2
             if self.do["GlobalWrite"]:
-              if kernel["BufferStore"]:
-                # use cmpswap_x2 for DGEMM in CAS loop
-                if kernel["ProblemType"]["DestDataType"].isDouble():
-                  kStr += "buffer_atomic_cmpswap_x2 %s, %s, %s %s    // %s%s" % \
-                      (vgpr(dataV,4), \
-                      vgpr(addrCalc.addrVgpr,1), \
-                      sgpr("SrdD", 4),  \
-                      "0 offen offset:%u glc" % addrCalc.globalOffset, \
-                      "attempt write avi=%u"%(avi), self.endLine )
-                else:
-                # use cmpswap for SGEMM in CAS loop
-                  kStr += "buffer_atomic_cmpswap %s, %s, %s %s    // %s%s" % \
-                      (vgpr(dataV,2), \
-                      vgpr(addrCalc.addrVgpr,1), \
-                      sgpr("SrdD", 4),  \
-                      "0 offen offset:%u glc" % addrCalc.globalOffset, \
-                      "attempt write avi=%u"%(avi), self.endLine )
+              if bufferStore:
+                kl.append(bufferCmpswap(vgpr(dataV,cmpswapDataCnt), \
+                    vgpr(addrCalc.addrVgpr,1), sgprSrdD4, addrCalc.globalOffset, \
+                    "attempt write avi=%u"%(avi), self.endLine))
               else:
-                kStr += "flat_atomic_cmpswap %s, %s, %s %s    // %s%s" % \
-                    (vgpr(atomicDestVgpr), vgpr(addrCalc.addrVgpr,2), \
-                    vgpr(dataV,2), "glc", "attempt write", self.endLine )
+                kl.append(_flatAtomicCmpswap(vgpr(atomicDestVgpr), vgpr(addrCalc.addrVgpr,2), \
+                    vgpr(dataV,2), "attempt write", self.endLine))
             else:
-               kStr += inst("v_mov_b32", vgpr(atomicDestVgpr), vgpr(dataV+1), "Fake successful CAS" )
+               kl.append(inst("v_mov_b32", vgpr(atomicDestVgpr), vgpr(dataV+1), "Fake successful CAS" ))
                # Fake successful CAS swap:
 
         ########################################
         # wait for first attempt write
-        kStr += inst("s_waitcnt vmcnt(0)", "wait for atomic writes" )
+        # without per-element exec masks the returning atomics complete in
+        # issue order, so each element's check only waits for its own writes
+        interleaveAtomicVmcnt = self.interleaveStoreVmcnt and not edge and self.do["GlobalWrite"]
+        atomicsIssued = len(batchElements) * numAvi
+        if not interleaveAtomicVmcnt:
+          kl.append(inst("s_waitcnt vmcnt(0)", "wait for atomic writes" ))
         if self.archCaps["SeparateVscnt"]:
-          kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
+          kl.append(inst("s_waitcnt_vscnt", "null", "0", "writes"))
+        maxVmcnt = globalParameters["AsmCaps"][self.version]["MaxVmcnt"]
 
         ########################################
         # check first attempt
-        kStr += self.comment("check success of writes, update masks")
+        kl.append(self.comment("check success of writes, update masks"))
         for elementIdx in range(0, len(batchElements)):
           element = batchElements[elementIdx]
           mask = ss.elementMask[elementIdx]
+          if interleaveAtomicVmcnt:
+            vmcnt = atomicsIssued - (elementIdx+1) * numAvi
+            kl.append(inst("s_waitcnt", "vmcnt(%u)"%min(vmcnt, maxVmcnt), \
+                "wait for atomic writes (interleaved) {} = {} - ({} + 1) * {}".format(vmcnt, atomicsIssued, elementIdx, numAvi)))
           d1 = element[0]
           d0 = element[1]
           vc1 = element[2]
           vc0 = element[3]
 
+          data = ss.elementData[elementIdx]
+          dataVs = [data + int(avi*numVgprsPerDataPerVI) for avi in range(0, numAvi)]
+
           # calculate new masks
           if edge:
-            kStr += inst("s_mov_b{}".format(wavelen), self.exec, sgpr(mask,laneSGPRC), "sgprs -> exec" )
-            for avi in range(0, gwvw//atomicW):
-              dataV = ss.elementData[elementIdx] + int(avi*ss.cfg.numVgprsPerDataPerVI)
-              atomicDestVgpr = dataV if kernel["BufferStore"] else dataV+2
-              # need to apply element mask before comparison
-              # so that all valid lanes are doing the cmp
-              if avi == 0:
-                # use u64 for DGEMM
-                if kernel["ProblemType"]["DestDataType"].isDouble():
-                  kStr += inst("v_cmp_ne_u64", sgpr(tmpS01,laneSGPRC), vgpr(atomicDestVgpr,2), \
-                      vgpr(dataV+2,2), "c read during atomic == c read during prior load (avi=%u, first)"%avi )
-                else:
-                  kStr += inst("v_cmp_ne_u32", sgpr(tmpS01,laneSGPRC), vgpr(atomicDestVgpr), \
-                      vgpr(dataV+1), "c read during atomic == c read during prior load (avi=%u, first)"%avi )
-              else:
-                if kernel["ProblemType"]["DestDataType"].isDouble():
-                  kStr += inst("v_cmp_ne_u64", sgpr(tmpS23,laneSGPRC), vgpr(atomicDestVgpr,2), \
-                      vgpr(dataV+2,2), "c read during atomic != c read during prior load" )
-                else:
-                  kStr += inst("v_cmp_ne_u32", sgpr(tmpS23,laneSGPRC), vgpr(atomicDestVgpr), \
-                      vgpr(dataV+1), "c read during atomic == c read during prior load (avi=%u)"%avi )
-                kStr += inst("s_or_b{}".format(wavelen), sgpr(tmpS01,laneSGPRC), \
-                      sgpr(tmpS01,laneSGPRC), sgpr(tmpS23,laneSGPRC), "combine with tmp mask")
+            kl.append(inst(self.sMovBWf, self.exec, sgpr(mask,laneSGPRC), "sgprs -> exec" ))
+            # need to apply element mask before comparison
+            # so that all valid lanes are doing the cmp
+            kl.append(inst(cmpNeInst, sTmp01, vgpr(dataVs[0]+atomicDestOffset,cmpWidth), \
+                vgpr(dataVs[0]+origCOffset,cmpWidth), "c read during atomic == c read during prior load (avi=0, first)"))
+            # later avis compare into tmpS23 and are or'ed into tmpS01
+            kl.extend(code for avi in range(1, numAvi) for code in ( \
+                inst(cmpNeInst, sTmp23, vgpr(dataVs[avi]+atomicDestOffset,cmpWidth), vgpr(dataVs[avi]+origCOffset,cmpWidth), \
+                    "c read during atomic != c read during prior load" if isDoubleDest else \
+                    "c read during atomic == c read during prior load (avi=%u)"%avi), \
+                orTmpMask))
 
             if kernel["DisableAtomicFail"]:
-              kStr += inst("s_mov_b{}".format(wavelen),  sgpr(mask,laneSGPRC), 0, "DisableAtomicFail, force 0" )
+              kl.append(inst(self.sMovBWf,  sgpr(mask,laneSGPRC), 0, "DisableAtomicFail, force 0" ))
             else:
-              kStr += inst("s_and_b{}".format(wavelen),  sgpr(mask,laneSGPRC), sgpr(tmpS01,laneSGPRC), sgpr(mask,laneSGPRC), "inBounds & must try again" )
+              kl.append(inst(self.sAndBWf,  sgpr(mask,laneSGPRC), sTmp01, sgpr(mask,laneSGPRC), "inBounds & must try again" ))
 
           else:
-            for avi in range(0, gwvw//atomicW):
-              dataV = ss.elementData[elementIdx] + int(avi*ss.cfg.numVgprsPerDataPerVI)
-              atomicDestVgpr = dataV if kernel["BufferStore"] else dataV+2
-              if kernel["DisableAtomicFail"]:
-                kStr += inst("s_mov_b{}".format(wavelen),  sgpr(mask,laneSGPRC), 0, "DisableAtomicFail, force 0" )
-              else:
-                if kernel["ProblemType"]["DestDataType"].isDouble():
-                  kStr += inst("v_cmp_ne_u64", sgpr(mask,laneSGPRC), vgpr(atomicDestVgpr,2), \
-                      vgpr(dataV+2,2), "c read during atomic != c read during prior load" )
-                else:
-                  kStr += inst("v_cmp_ne_u32", sgpr(mask,laneSGPRC), vgpr(atomicDestVgpr), \
-                      vgpr(dataV+1), "c read during atomic != c read during prior load" )
+            if kernel["DisableAtomicFail"]:
+              kl.extend([inst(self.sMovBWf,  sgpr(mask,laneSGPRC), 0, "DisableAtomicFail, force 0" )] * numAvi)
+            else:
+              kl.extend(inst(cmpNeInst, sgpr(mask,laneSGPRC), vgpr(dataV+atomicDestOffset,cmpWidth), \
+                  vgpr(dataV+origCOffset,cmpWidth), "c read during atomic != c read during prior load") for dataV in dataVs)
 
         # or masks together to check early exit
-        kStr += self.comment("or masks to check for exit")
-        kStr += inst("s_mov_b{}".format(wavelen), sgpr(tmpS01,laneSGPRC), hex(0), "empty mask" )
-        for elementIdx in range(0, len(batchElements)):
-          mask = ss.elementMask[elementIdx]
-          kStr += inst("s_or_b{}".format(wavelen), sgpr(tmpS01,laneSGPRC), sgpr(mask,laneSGPRC), sgpr(tmpS01,laneSGPRC), "or to add threads" )
-        kStr += inst("s_or_saveexec_b{}".format(wavelen), sgpr(tmpS23,laneSGPRC), sgpr(tmpS01,laneSGPRC), "apply combined mask" )
-        kStr += inst("s_cbranch_execz", "label_%04u" % labelAfterAtomicLoop, "if exec is zero skip loop" )
+        kl.append(self.comment("or masks to check for exit"))
+        kl.extend(orElementMasks)
+        kl.append(inst(self.sOrSaveExecBWf, sTmp23, sTmp01, "apply combined mask" ))
+        kl.append(inst("s_cbranch_execz", "label_%04u" % labelAfterAtomicLoop, "if exec is zero skip loop" ))
 
         # begin atomic loop
-        kStr += self.comment("atomic CAS loop")
-        kStr += "label_%04u:%s" % (label, self.endLine)
-
-        kStr += self.comment("apply updated masks and issue writes again")
+        kl.append(self.comment("atomic CAS loop"))
+        kl.append("label_%04u:%s" % (label, self.endLine))
+
+        kl.append(self.comment("apply updated masks and issue writes again"))
+        # the retry steps of different avis can only be reordered when their
+        # data registers don't overlap (half atomics step one vgpr per VI)
+        aviRegsDisjoint = numVgprsPerDataPerVI >= \
+                          max(2*cmpWidth, atomicDestOffset+cmpWidth, (self.bpeCexternal*atomicW)//4+cmpWidth)
         for elementIdx in range(0, len(batchElements)):
           element = batchElements[elementIdx]
           addrCalc = ss.elementAddr[elementIdx]
-          addr = ss.elementAddr[elementIdx].addrVgpr
+          addr = ss.elementAddrVgpr[elementIdx]
           mask = ss.elementMask[elementIdx]
-          vgprCnt = 2 if kernel["ProblemType"]["DestDataType"].isDouble() else 1   # number of registers for f32/f64
-          bpm = self.bpeCexternal * atomicW
-          vgprIdx = 1*(bpm//4)   # index register
+          data = ss.elementData[elementIdx]
+          sumIdx = ss.elementSumIdx[elementIdx]
 
+          # apply mask for element
+          # the mask is not updated until the success check, so one exec
+          # write covers every avi of the element
+          kl.append(inst(self.sMovBWf, self.exec, sgpr(mask,laneSGPRC), "must try again" ))
+
+          # per avi: restore original C, compute the new C, then cmpswap
+          aviCode = []
           for avi in range(0, gwvw//atomicW):
-            dataV = ss.elementData[elementIdx] + int(avi*ss.cfg.numVgprsPerDataPerVI)
-            atomicDestVgpr = dataV if kernel["BufferStore"] else dataV+2
-            sumIdxV = ss.elementSumIdx[elementIdx] + avi
-            if kernel["ProblemType"]["DestDataType"].numRegisters() < 1 and not kernel["_GlobalAccumulation"]:
+            dataV = data + int(avi*numVgprsPerDataPerVI)
+            atomicDestVgpr = dataV if bufferStore else dataV+2
+            sumIdxV = sumIdx + avi
+            if packedHalfC:
               sumIdxV //= 2
-            if kernel["ProblemType"]["DestDataType"].isDouble():  sumIdxV =  sumIdxV * 2
+            if isDoubleDest:  sumIdxV =  sumIdxV * 2
 
-            # apply mask for element
-            kStr += inst("s_mov_b{}".format(wavelen), self.exec, sgpr(mask,laneSGPRC), "must try again" )
-            if kernel["ProblemType"]["DestDataType"].isDouble():
+            if isDoubleDest:
               #64-bit C val move by 2 32-bit instructions
-              kStr += inst("v_mov_b32", vgpr(dataV+2), vgpr(atomicDestVgpr), "dataV+2 = tmp (new original C)" )
-              kStr += inst("v_mov_b32", vgpr(dataV+3), vgpr(atomicDestVgpr+1), "dataV+3 = tmp (new original C)" )
+              movCode = inst("v_mov_b32", vgpr(dataV+2), vgpr(atomicDestVgpr), "dataV+2 = tmp (new original C)" ) + \
+                        inst("v_mov_b32", vgpr(dataV+3), vgpr(atomicDestVgpr+1), "dataV+3 = tmp (new original C)" )
             else:
-              kStr += inst("v_mov_b32", vgpr(dataV+1), vgpr(atomicDestVgpr), "dataV+1 = tmp (new original C)" )
-            kStr += self.chooseAddForAtomic(kernel, \
-                      vgpr(dataV+0,vgprCnt), vgpr(dataV+1*vgprIdx,vgprCnt), vgpr("ValuC+%u"%sumIdxV,vgprCnt), \
-                      "newC = rC + originalC")
+              movCode = inst("v_mov_b32", vgpr(dataV+1), vgpr(atomicDestVgpr), "dataV+1 = tmp (new original C)" )
+            addCode = ""
+            if addOp:
+              addCode = inst(addOp, vgpr(dataV+0,vgprCnt), vgpr(dataV+1*vgprIdx,vgprCnt), _vgprValuC(sumIdxV, vgprCnt), \
+                        "newC = rC + originalC")
+            writeCode = ""
             if self.do["GlobalWrite"]:
-              if kernel["BufferStore"]:
+              if bufferStore:
                 # Using no-ret version here?
-                # cmpswap_x2 for DGEMM
-                if kernel["ProblemType"]["DestDataType"].isDouble():
-                  kStr += "buffer_atomic_cmpswap_x2 %s, %s, %s %s    // %s%s" % \
-                    (vgpr(dataV,4), \
-                     vgpr(addr,1), \
-                     sgpr("SrdD", 4), \
-                     "0 offen offset:%u glc" % (addrCalc.globalOffset), \
-                     "try again", self.endLine )
-                else:
-                  kStr += "buffer_atomic_cmpswap %s, %s, %s %s    // %s%s" % \
-                      (vgpr(dataV,2), \
-                       vgpr(addr,1), \
-                       sgpr("SrdD", 4), \
-                       "0 offen offset:%u glc" % (addrCalc.globalOffset), \
-                       "try again", self.endLine )
+                writeCode = bufferCmpswap(vgpr(dataV,cmpswapDataCnt), \
+                    vgpr(addr,1), sgprSrdD4, addrCalc.globalOffset, \
+                    "try again", self.endLine)
               else:
-                kStr += "flat_atomic_cmpswap %s, %s, %s %s    // %s%s" % ( vgpr(atomicDestVgpr), \
-                    vgpr(addr,2), vgpr(dataV,2), "glc", "try again", self.endLine)
+                writeCode = _flatAtomicCmpswap(vgpr(atomicDestVgpr), \
+                    vgpr(addr,2), vgpr(dataV,2), "try again", self.endLine)
+            aviCode.append((movCode, addCode, writeCode))
+
+          if aviRegsDisjoint:
+            # emit each step for all avis before the next step, so the
+            # mov -> add -> cmpswap chains don't issue back to back
+            for step in range(0, 3):
+              kl.extend(code[step] for code in aviCode)
+          else:
+            for code in aviCode:
+              kl.extend(code)
 
         # wait for batched write
-        kStr += inst("s_waitcnt vmcnt(0)", "wait for atomic writes" )
+        kl.append(inst("s_waitcnt vmcnt(0)", "wait for atomic writes" ))
         if self.archCaps["SeparateVscnt"]:
-          kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
+          kl.append(inst("s_waitcnt_vscnt", "null", "0", "writes"))
 
         # check batched write success
-        kStr += self.comment("apply masks and check for success")
+        kl.append(self.comment("apply masks and check for success"))
         for elementIdx in range(0, len(batchElements)):
           element = batchElements[elementIdx]
           data = ss.elementData[elementIdx]
           mask = ss.elementMask[elementIdx]
-          for avi in range(0, gwvw//atomicW):
-            dataV = ss.elementData[elementIdx] + int(avi*ss.cfg.numVgprsPerDataPerVI)
-            atomicDestVgpr = dataV if kernel["BufferStore"] else dataV+2
-
-            # apply mask for element
-            kStr += inst("s_mov_b{}".format(wavelen), self.exec, sgpr(mask,laneSGPRC), "must try again" )
-
-            # compare success
-            if kernel["ProblemType"]["DestDataType"].isDouble():
-              kStr += inst("v_cmp_ne_u64", sgpr(tmpS01,laneSGPRC), vgpr(data+2,2), vgpr(atomicDestVgpr,2), \
-                  "c read during atomic != c read during prior load" )
-            else:
-              kStr += inst("v_cmp_ne_u32", sgpr(tmpS01,laneSGPRC), vgpr(data+1), vgpr(atomicDestVgpr), \
-                  "c read during atomic == c read during prior load" )
-            # update element mask
-            kStr += inst("s_and_b{}".format(wavelen),  sgpr(mask,laneSGPRC), sgpr(tmpS01,laneSGPRC), sgpr(mask,laneSGPRC), "inBounds & must try again" )
+          # apply mask for element
+          applyMask = inst(self.sMovBWf, self.exec, sgpr(mask,laneSGPRC), "must try again" )
+          # update element mask
+          updateMask = inst(self.sAndBWf,  sgpr(mask,laneSGPRC), sTmp01, sgpr(mask,laneSGPRC), "inBounds & must try again" )
+          cmpSrc = vgpr(data+origCOffset,cmpWidth)
+          cmpComment = "c read during atomic != c read during prior load" if isDoubleDest else \
+                       "c read during atomic == c read during prior load"
+          # compare success
+          kl.extend(code for avi in range(0, numAvi) for code in ( \
+              applyMask, \
+              inst(cmpNeInst, sTmp01, cmpSrc, \
+                  vgpr(data+int(avi*numVgprsPerDataPerVI)+atomicDestOffset,cmpWidth), cmpComment), \
+              updateMask))
 
         # or masks together
-        kStr += self.comment("or masks to check for exit")
-        kStr += inst("s_mov_b{}".format(wavelen), sgpr(tmpS01,laneSGPRC), hex(0), "empty mask" )
-        for elementIdx in range(0, len(batchElements)):
-          mask = ss.elementMask[elementIdx]
-          kStr += inst("s_or_b{}".format(wavelen), sgpr(tmpS01,laneSGPRC), sgpr(mask,laneSGPRC), sgpr(tmpS01,laneSGPRC), "or to add threads" )
+        kl.append(self.comment("or masks to check for exit"))
+        kl.extend(orElementMasks)
 
         # apply combined masks and exit
-        kStr += inst("s_or_saveexec_b{}".format(wavelen), sgpr(tmpS23,laneSGPRC), sgpr(tmpS01,laneSGPRC), "apply combined mask" )
-        kStr += inst("s_cbranch_execnz", "label_%04u" % label, "try again if not complete" )
-        kStr += "label_%04u:%s" % (labelAfterAtomicLoop, self.endLine)
-        kStr += inst("s_mov_b{}".format(wavelen), self.exec, -1, "full mask -> exec" )
+        kl.append(inst(self.sOrSaveExecBWf, sTmp23, sTmp01, "apply combined mask" ))
+        kl.append(inst("s_cbranch_execnz", "label_%04u" % label, "try again if not complete" ))
+        kl.append("label_%04u:%s" % (labelAfterAtomicLoop, self.endLine))
+        kl.append(inst(self.sMovBWf, self.exec, -1, "full mask -> exec" ))
 
     ########################################
     # Not Atomic
@@ -11314,28 +11730,29 @@ class KernelWriterAssembly(KernelWriter):
       # edge has v_cndmask so loads or stores may not issue, hard to track vmcnt:
       interleaveStoreVmcnt = self.interleaveStoreVmcnt and not edge
 
-      for elementIdx in range(0, len(batchElements)):
-        for vi in range(0, gwvw):
-          sumIdxV = ss.elementSumIdx[elementIdx] + vi
-          # covers sgemm, bfgemm, hgemm(HPA), int8 (int8x4?)
-          if kernel["ProblemType"]["ComputeDataType"].isInt32() or \
-             kernel["ProblemType"]["ComputeDataType"].isSingle() or \
-             (kernel["ProblemType"]["ComputeDataType"].isHalf() and \
-             kernel["ProblemType"]["HighPrecisionAccumulate"]):
-              if self.db["ForceExpectedValue"]:
-                kStr += inst("v_mov_b32", vgpr("ValuC+%u"%sumIdxV), self.db["ValueCExpectedValue"], "force expected value" )
-              if self.db["ForceVSerial"]:
-                kStr += inst("v_mov_b32", vgpr("ValuC+%u"%sumIdxV), vgpr("Serial"), "force expected value to serial" )
-              if self.db["CheckValueC"]:
-                kStr += inst("s_mov_b32", sgpr(tmpS01), self.db["ValueCExpectedValue"], "Move expected value")
-                kStr += self.assert_eq(vgpr("ValuC+%u"%sumIdxV), sgpr(tmpS01))
+      # covers sgemm, bfgemm, hgemm(HPA), int8 (int8x4?)
+      computeDataType = kernel["ProblemType"]["ComputeDataType"]
+      debugValuC = (computeDataType.isInt32() or computeDataType.isSingle() or \
+                    (computeDataType.isHalf() and hpa)) and \
+                   (self.db["ForceExpectedValue"] or self.db["ForceVSerial"] or self.db["CheckValueC"])
+      if debugValuC:
+        for elementIdx in range(0, len(batchElements)):
+          for vi in range(0, gwvw):
+            sumIdxV = ss.elementSumIdx[elementIdx] + vi
+            if self.db["ForceExpectedValue"]:
+              kl.append(inst("v_mov_b32", _vgprValuC(sumIdxV), self.db["ValueCExpectedValue"], "force expected value" ))
+            if self.db["ForceVSerial"]:
+              kl.append(inst("v_mov_b32", _vgprValuC(sumIdxV), vgpr("Serial"), "force expected value to serial" ))
+            if self.db["CheckValueC"]:
+              kl.append(inst("s_mov_b32", sgpr(tmpS01), self.db["ValueCExpectedValue"], "Move expected value"))
+              kl.append(self.assert_eq(_vgprValuC(sumIdxV), sgpr(tmpS01)))
 
       ########################################
       # wait for batched load
       if beta and not interleaveStoreVmcnt:
-        kStr += inst("s_waitcnt", "vmcnt(0)", "wait C")
+        kl.append(inst("s_waitcnt", "vmcnt(0)", "wait C"))
         if self.archCaps["SeparateVscnt"]:
-          kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
+          kl.append(inst("s_waitcnt_vscnt", "null", "0", "writes"))
 
         # PreLoop LWVmcnt: When a vmcnt(cnt) is inserted here, means the GlobalLoad for PAP is finished
         # So the preLoopVmcntDict value is meaningless since we no longer need to wait in next PreLoop
@@ -11343,41 +11760,69 @@ class KernelWriterAssembly(KernelWriter):
         assert self.currPreLoopVmcntCase not in self.preLoopVmcntDict, \
           "PreLoopVmcntCase 2 or 3 shouldn't enter the beta true case"
 
-      kStr += self.comment("apply mask, calc new C and issue writes")
+      kl.append(self.comment("apply mask, calc new C and issue writes"))
       #kStr += self.bomb() # can see store addresses just before the store inst
 
-      if kernel["ProblemType"]["DestDataType"].isBFloat16() and kernel["ProblemType"]["HighPrecisionAccumulate"]:
-        vgprBf16Temp = self.vgprPool.checkOut(4)
-        vgprBf16Mask = vgprBf16Temp + 1
-        vgprFp32Nan = vgprBf16Temp + 2
-        vgprBf16Inc = vgprBf16Temp + 3
-        kStr += inst("v_mov_b32", vgpr(vgprBf16Mask), "0xffff0000", "mask for pack two bfloat16 element to 32bit" )
-        kStr += inst("v_mov_b32", vgpr(vgprFp32Nan), "0x7fff0000", "fp32 Nan" )
-        kStr += inst("v_mov_b32", vgpr(vgprBf16Inc), "0x7fff", "rounding bias for bfloat16" )
+      # beta operands and type tests are invariant across the element/vi loops
+      isSingleDest = destDataType.isSingle()
+      isInt32Dest = destDataType.isInt32()
+      isSingleComplexDest = destDataType.isSingleComplex()
+      isDoubleComplexDest = destDataType.isDoubleComplex()
+      sgprBeta = sgpr("Beta")
+      sgprBeta1 = sgpr("Beta+1")
+      sgprBeta64 = sgpr("Beta",2)
+      sgprBeta64Real = sgpr("Beta+0",2)
+      sgprBeta64Imag = sgpr("Beta+2",2)
+      # pairs of fp32 results round and pack to bf16 in one instruction
+      cvtPkBF16 = isBF16Dest and hpa and self.asmCaps["v_cvt_pk_bf16_f32"] and gwvw % 2 == 0
+
+      if isBF16Dest and hpa:
+        # the first batch loads the constants after its element vgprs are
+        # placed, one vgpr each so they fit in whatever the batch left over
+        if ss.firstBatch:
+          ss.vgprBf16Consts = [self.vgprPool.checkOut(1, "bf16 pack") for i in range(0, ss.numBf16Consts)]
+          if not cvtPkBF16:
+            kl.append(inst("v_mov_b32", vgpr(ss.vgprBf16Consts[1]), "0x7fff0000", "fp32 Nan" ))
+            kl.append(inst("v_mov_b32", vgpr(ss.vgprBf16Consts[2]), "0x7fff", "rounding bias for bfloat16" ))
+            # v_perm_b32 is VOP3 and can't take the selector as a literal
+            kl.append(inst("v_mov_b32", vgpr(ss.vgprBf16Consts[3]), "0x07060302", "perm selector for pack two bfloat16 element to 32bit" ))
+          if beta:
+            kl.append(inst("v_mov_b32", vgpr(ss.vgprBf16Consts[-1]), "0xffff0000", "mask for pack two bfloat16 element to 32bit" ))
+        # operand text for them, reused by every element
+        if beta:
+          vBf16Mask = vgpr(ss.vgprBf16Consts[-1])
+        if not cvtPkBF16:
+          vBf16Temp = vgpr(ss.vgprBf16Consts[0])
+          vFp32Nan = vgpr(ss.vgprBf16Consts[1])
+          vBf16Inc = vgpr(ss.vgprBf16Consts[2])
+          vBf16PackSel = vgpr(ss.vgprBf16Consts[3])
+          sTmp01 = sgpr(tmpS01,laneSGPRC)
 
       for elementIdx in range(0, len(batchElements)):
         element = batchElements[elementIdx]
-        addr = ss.elementAddr[elementIdx].addrVgpr
+        addr = ss.elementAddrVgpr[elementIdx]
         mask = ss.elementMask[elementIdx]
         addrCalc = ss.elementAddr[elementIdx]
+        data = ss.elementData[elementIdx]
         d1 = element[0]
         d0 = element[1]
         vc1 = element[2]
         vc0 = element[3]
         sumIdx = ss.elementSumIdx[elementIdx]
 
-        # print(str(element)+" rowInc="+str(addrCalc.rowInc))
+        rowInc = ss.elementRowInc[elementIdx]
+        # print(str(element)+" rowInc="+str(rowInc))
         # Already write wave column block into LDS
         # Now read lds data back to registers and write to global memroy
-        if ss.optSrdIncForRow and addrCalc.rowInc and kernel["StoreRemapVectorWidth"] > 0:
-          kStr += self.comment("StoreRemap: shift coord1 address")
-          kStr += addrCalc.incrementToNextRow(kernel, "D", ss, tmpS01)
-          kStr += inst("v_mov_b32", vgpr(tmpVgpr), addrCalc.rowInc, "set shift rows")
-          kStr += inst("_v_add_u32", vgpr(self.storeRemapCoord1), vgpr(self.storeRemapCoord1), vgpr(tmpVgpr), "shift storeRemap coord1")
+        if ss.optSrdIncForRow and rowInc and kernel["StoreRemapVectorWidth"] > 0:
+          kl.append(self.comment("StoreRemap: shift coord1 address"))
+          kl.append(addrCalc.incrementToNextRow(kernel, "D", ss, tmpS01))
+          kl.append(inst("v_mov_b32", vgpr(tmpVgpr), rowInc, "set shift rows"))
+          kl.append(inst("_v_add_u32", vgpr(self.storeRemapCoord1), vgpr(self.storeRemapCoord1), vgpr(tmpVgpr), "shift storeRemap coord1"))
 
         # apply in-bounds exec mask
-        if edge and not kernel["BufferStore"]:
-          kStr += inst("s_mov_b{}".format(wavelen), self.exec, sgpr(mask,laneSGPRC), "sgprs -> exec" )
+        if edge and not bufferStore:
+          kl.append(inst(self.sMovBWf, self.exec, sgpr(mask,laneSGPRC), "sgprs -> exec" ))
 
         if beta:
           # if GWVW=1 the half path still assumes we have
@@ -11395,8 +11840,8 @@ class KernelWriterAssembly(KernelWriter):
             maxVmcnt = globalParameters["AsmCaps"][self.version]["MaxVmcnt"]
             vmcnt = min(vmcnt, maxVmcnt)
             #print "wmvcnt=", vmcnt
-            kStr += "\n"
-            kStr += inst("s_waitcnt", "vmcnt(%u)"%vmcnt, "wait C (interleaved) " + vmComment)
+            kl.append("\n")
+            kl.append(inst("s_waitcnt", "vmcnt(%u)"%vmcnt, "wait C (interleaved) " + vmComment))
 
             # PreLoop LWVmcnt: When a vmcnt(cnt) is inserted here, means the GlobalLoad for PAP is finished
             # So the preLoopVmcntDict value is meaningless since we no longer need to wait in next PreLoop
@@ -11405,17 +11850,17 @@ class KernelWriterAssembly(KernelWriter):
               "PreLoopVmcntCase 2 or 3 shouldn't enter the beta true case"
 
           for vi in range(0, gwvw):
-            dataV = ss.elementData[elementIdx] + int(vi*ss.cfg.numVgprsPerDataPerVI)
-            sumIdxV = ss.elementSumIdx[elementIdx] + vi
-            if kernel["ProblemType"]["DestDataType"].isHalf():
-              if not kernel["ProblemType"]["HighPrecisionAccumulate"]:
+            dataV = data + int(vi*numVgprsPerDataPerVI)
+            sumIdxV = sumIdx + vi
+            if isHalfDest:
+              if not hpa:
                 if sumIdxV%2==0:
                   # dataV+0 = new c = old c*beta
-                  kStr += inst("v_pk_mul_f16", vgpr(dataV), sgpr("Beta"), vgpr(dataV+0), \
-                      "%s = C*beta ei=%u vi=%u"%(vgpr(dataV),elementIdx, vi))
+                  kl.append(inst("v_pk_mul_f16", vgpr(dataV), sgprBeta, vgpr(dataV+0), \
+                      "%s = C*beta ei=%u vi=%u"%(vgpr(dataV),elementIdx, vi)))
                   # dataV+0 = new c = old c*beta + rC
-                  kStr += inst("v_pk_add_f16", vgpr("ValuC+%u"%(sumIdxV//2)), vgpr(dataV), vgpr("ValuC+%u"%(sumIdxV//2)), \
-                      "sum*alpha + C*beta")
+                  kl.append(inst("v_pk_add_f16", _vgprValuC(sumIdxV//2), vgpr(dataV), _vgprValuC(sumIdxV//2), \
+                      "sum*alpha + C*beta"))
                 else:
                   pass # add will have been done previously
               else: # HPA
@@ -11423,195 +11868,210 @@ class KernelWriterAssembly(KernelWriter):
                 # src0 = beta = f32 = opsel 00
                 # src1 = dataV = f16.lo = opsel 10 or 11 depending on even/odd
                 # src2 = sumIdxV = f32 = opsel 00
-                dataCExternal = ss.elementData[elementIdx] + vi//2
+                dataCExternal = data + vi//2
                 hi16 = (vi + gwvw*vc0) % 2
-                kStr += inst(self.mixinst, vgpr("ValuC+%u"%sumIdxV), sgpr("Beta"), \
-                    vgpr(dataCExternal), vgpr("ValuC+%u"%sumIdxV), \
+                kl.append(inst(self.mixinst, _vgprValuC(sumIdxV), sgprBeta, \
+                    vgpr(dataCExternal), _vgprValuC(sumIdxV), \
                     "op_sel:[0,%u,0] op_sel_hi:[0,1,0]" % (hi16), \
-                    "//C*=beta")
+                    "//C*=beta"))
 
-            elif kernel["ProblemType"]["DestDataType"].isBFloat16():
-              if kernel["ProblemType"]["HighPrecisionAccumulate"]:
+            elif isBF16Dest:
+              if hpa:
                 # dataV+0 = new c = old c*beta + rC
                 # src0 = beta = f32 = opsel 00
                 # src1 = dataV = f16.lo = opsel 10 or 11 depending on even/odd
                 # src2 = sumIdxV = f32 = opsel 00
-                dataCExternal = ss.elementData[elementIdx] + vi//2
+                dataCExternal = data + vi//2
                 if (vi%2) == 1:
-                  kStr += inst("v_and_b32", vgpr(tmpVgpr), vgpr(dataCExternal), vgpr(vgprBf16Mask), "convert bf16 to fp32")
+                  kl.append(inst("v_and_b32", vgpr(tmpVgpr), vgpr(dataCExternal), vBf16Mask, "convert bf16 to fp32"))
                 else:
-                  kStr += inst("v_lshlrev_b32", vgpr(tmpVgpr), "16", vgpr(dataCExternal), "convert bf16 to fp32" )
-                kStr += inst("_v_mac_f32", vgpr("ValuC+%u"%sumIdxV), vgpr(tmpVgpr), sgpr("Beta"), \
-                    "finalSum = sum*alpha + C*beta")
+                  kl.append(inst("v_lshlrev_b32", vgpr(tmpVgpr), "16", vgpr(dataCExternal), "convert bf16 to fp32" ))
+                kl.append(inst("_v_mac_f32", _vgprValuC(sumIdxV), vgpr(tmpVgpr), sgprBeta, \
+                    "finalSum = sum*alpha + C*beta"))
 
-            elif kernel["ProblemType"]["DestDataType"].isSingle():
-              kStr += inst("_v_mac_f32", vgpr("ValuC+%u"%sumIdxV), vgpr(dataV+0), sgpr("Beta"), \
-                  "finalSum = sum*alpha + C*beta")
+            elif isSingleDest:
+              kl.append(inst("_v_mac_f32", _vgprValuC(sumIdxV), vgpr(dataV+0), sgprBeta, \
+                  "finalSum = sum*alpha + C*beta"))
 
-            elif kernel["ProblemType"]["DestDataType"].isInt32():
+            elif isInt32Dest:
               # assume we will need to replace v_mac_f32 with v_add_u32 and s_mul_lo_i32
               # v_mad_i32_i24
               # kStr += inst("v_mad_i32_i24", vgpr("ValuC+%u"%sumIdxV), vgpr(dataV+0), sgpr("Beta"), vgpr("ValuC+%u"%sumIdxV), \
               #     "finalSum = sum*alpha + C*beta")
-              kStr += inst("v_mul_lo_u32", vgpr(dataV+0), sgpr("Beta"), vgpr(dataV+0), \
-                  "C = C*beta")
-              kStr += inst("_v_add_u32", vgpr("ValuC+%u"%sumIdxV), vgpr(dataV+0), vgpr("ValuC+%u"%sumIdxV), \
-                  "finalSum = sum*alpha + C*beta")
+              kl.append(inst("v_mul_lo_u32", vgpr(dataV+0), sgprBeta, vgpr(dataV+0), \
+                  "C = C*beta"))
+              kl.append(inst("_v_add_u32", _vgprValuC(sumIdxV), vgpr(dataV+0), _vgprValuC(sumIdxV), \
+                  "finalSum = sum*alpha + C*beta"))
 
-            elif kernel["ProblemType"]["DestDataType"].isDouble():
+            elif isDoubleDest:
               # dataV+0 = new c = old c*beta
-              kStr += inst("v_fma_f64", vgpr("ValuC+%u"%(sumIdxV*2),2), vgpr(dataV+0,2), sgpr("Beta",2), vgpr("ValuC+%u"%(sumIdxV*2),2), \
-                  "finalSum = sum*alpha + C*beta")
+              kl.append(inst("v_fma_f64", _vgprValuC(sumIdxV*2, 2), vgpr(dataV+0,2), sgprBeta64, _vgprValuC(sumIdxV*2, 2), \
+                  "finalSum = sum*alpha + C*beta"))
 
             # single precision complex
-            elif kernel["ProblemType"]["DestDataType"].isSingleComplex():
-              kStr += inst("_v_mac_f32", vgpr("ValuC+%u"%(sumIdxV*2)), vgpr(dataV+0), sgpr("Beta"), "finalSum Cr += old Cr * Br")
-              kStr += inst("_v_mac_f32", vgpr("ValuC+%u"%(sumIdxV*2)), vgpr(dataV+1), "-"+sgpr("Beta+1"), "finalSum Cr += old Ci * -Bi")
-              kStr += inst("_v_mac_f32", vgpr("ValuC+%u"%(sumIdxV*2+1)), vgpr(dataV+1), sgpr("Beta"), "finalSum Ci += old Ci * Br")
-              kStr += inst("_v_mac_f32", vgpr("ValuC+%u"%(sumIdxV*2+1)), vgpr(dataV+0), sgpr("Beta+1"), "finalSum Ci += old Cr * Bi")
+            elif isSingleComplexDest:
+              kl.append(inst("_v_mac_f32", _vgprValuC(sumIdxV*2), vgpr(dataV+0), sgprBeta, "finalSum Cr += old Cr * Br"))
+              kl.append(inst("_v_mac_f32", _vgprValuC(sumIdxV*2), vgpr(dataV+1), "-"+sgprBeta1, "finalSum Cr += old Ci * -Bi"))
+              kl.append(inst("_v_mac_f32", _vgprValuC(sumIdxV*2+1), vgpr(dataV+1), sgprBeta, "finalSum Ci += old Ci * Br"))
+              kl.append(inst("_v_mac_f32", _vgprValuC(sumIdxV*2+1), vgpr(dataV+0), sgprBeta1, "finalSum Ci += old Cr * Bi"))
 
             # double precision complex
-            elif kernel["ProblemType"]["DestDataType"].isDoubleComplex():
+            elif isDoubleComplexDest:
+              # the real and imag chains are independent, so alternate them
+              # to keep back-to-back FMAs from depending on each other
+              vcR = _vgprValuC(sumIdxV*4+0, 2)
+              vcI = _vgprValuC(sumIdxV*4+2, 2)
+              dataR = vgpr(dataV+0,2)
+              dataI = vgpr(dataV+2,2)
               # c.real += a.real * b.real
-              kStr += "v_fma_f64 %s, %s, %s, %s%s" % (vgpr("ValuC+%u"%(sumIdxV*4+0),2), vgpr(dataV+0,2), sgpr("Beta+0",2), vgpr("ValuC+%u"%(sumIdxV*4+0),2), self.endLine)
-              # c.real -= a.imag * b.imag
-              kStr += "v_fma_f64 %s, %s, -%s, %s%s" % (vgpr("ValuC+%u"%(sumIdxV*4+0),2), vgpr(dataV+2,2), sgpr("Beta+2",2), vgpr("ValuC+%u"%(sumIdxV*4+0),2), self.endLine)
+              kl.append("v_fma_f64 %s, %s, %s, %s%s" % (vcR, dataR, sgprBeta64Real, vcR, self.endLine))
               # c.imag += a.real * b.imag
-              kStr += "v_fma_f64 %s, %s, %s, %s%s" % (vgpr("ValuC+%u"%(sumIdxV*4+2),2), vgpr(dataV+0,2), sgpr("Beta+2",2), vgpr("ValuC+%u"%(sumIdxV*4+2),2), self.endLine)
+              kl.append("v_fma_f64 %s, %s, %s, %s%s" % (vcI, dataR, sgprBeta64Imag, vcI, self.endLine))
+              # c.real -= a.imag * b.imag
+              kl.append("v_fma_f64 %s, %s, -%s, %s%s" % (vcR, dataI, sgprBeta64Imag, vcR, self.endLine))
               # c.imag += a.imag * b.real
-              kStr += "v_fma_f64 %s, %s, %s, %s%s" % (vgpr("ValuC+%u"%(sumIdxV*4+2),2), vgpr(dataV+2,2), sgpr("Beta+0",2), vgpr("ValuC+%u"%(sumIdxV*4+2),2), self.endLine)
+              kl.append("v_fma_f64 %s, %s, %s, %s%s" % (vcI, dataI, sgprBeta64Real, vcI, self.endLine))
 
         # pack stores, beta and non-beta reach here:
-        if kernel["ProblemType"]["HighPrecisionAccumulate"] and (kernel["_GlobalAccumulation"] != 'MultipleBuffer'):
+        if hpa and (globalAccum != 'MultipleBuffer'):
           for vi in range(0, gwvw):
-            sumIdxV = ss.elementSumIdx[elementIdx] + vi
-            if kernel["ProblemType"]["DestDataType"].isHalf():
-              kStr += inst("v_cvt_f16_f32", vgpr("ValuC+%u"%sumIdxV), vgpr("ValuC+%u"%sumIdxV), "convert C to fp16" )
+            sumIdxV = sumIdx + vi
+            vc = _vgprValuC(sumIdxV)
+            if isHalfDest:
+              kl.append(inst("v_cvt_f16_f32", vc, vc, "convert C to fp16" ))
               if vi%2 == 1:
                 assert (gwvw % 2 == 0)
-                d = ss.elementSumIdx[elementIdx] + vi//2
-                kStr += inst("v_pack_b32_f16", vgpr(d), vgpr("ValuC+%u"%(sumIdxV-1)), vgpr("ValuC+%u"%sumIdxV), "Pack with neighbor" )
-
-            elif kernel["ProblemType"]["DestDataType"].isBFloat16():
-              kStr += inst("v_cmp_u_f32", sgpr(tmpS01,laneSGPRC), vgpr("ValuC+%u"%sumIdxV), vgpr("ValuC+%u"%sumIdxV), "check Nan" )
-              kStr += inst("v_bfe_u32", vgpr(vgprBf16Temp), vgpr("ValuC+%u"%sumIdxV), "16", "1", "Non-Nan case: store lsb of bf16" )
-              kStr += inst("v_add3_u32", vgpr(vgprBf16Temp), vgpr("ValuC+%u"%sumIdxV), vgpr(vgprBf16Temp), vgpr(vgprBf16Inc), "Non-Nan case: add lsb and the increment for rounding" )
-              kStr += inst("v_cndmask_b32", vgpr("ValuC+%u"%sumIdxV), vgpr(vgprBf16Temp), vgpr(vgprFp32Nan), sgpr(tmpS01,laneSGPRC), "" )
+                d = sumIdx + vi//2
+                kl.append(inst("v_pack_b32_f16", vgpr(d), _vgprValuC(sumIdxV-1), vc, "Pack with neighbor" ))
+
+            elif cvtPkBF16:
+              if vi%2 == 1:
+                d = sumIdx + vi//2
+                kl.append(inst("v_cvt_pk_bf16_f32", vgpr(d), _vgprValuC(sumIdxV-1), vc, "convert and pack two bf16 to dword"))
+
+            elif isBF16Dest:
+              kl.append(inst("v_cmp_u_f32", sTmp01, vc, vc, "check Nan" ))
+              kl.append(inst("v_bfe_u32", vBf16Temp, vc, "16", "1", "Non-Nan case: store lsb of bf16" ))
+              kl.append(inst("v_add3_u32", vBf16Temp, vc, vBf16Temp, vBf16Inc, "Non-Nan case: add lsb and the increment for rounding" ))
+              kl.append(inst("v_cndmask_b32", vc, vBf16Temp, vFp32Nan, sTmp01, "" ))
               if vi%2 == 0:
-                kStr += inst("v_lshrrev_b32", vgpr("ValuC+%u"%sumIdxV), "16", vgpr("ValuC+%u"%sumIdxV), "convert C to bf16" )
+                # an even vi with an odd neighbor is packed by the v_perm below
+                if vi == gwvw-1:
+                  kl.append(inst("v_lshrrev_b32", vc, "16", vc, "convert C to bf16" ))
               elif vi%2 == 1:
-                d = ss.elementSumIdx[elementIdx] + vi//2
-                kStr += inst("v_and_or_b32", vgpr(d), vgpr("ValuC+%u"%sumIdxV), vgpr(vgprBf16Mask), vgpr("ValuC+%u"%(sumIdxV-1)), "pack two bf16 to dword")
+                d = sumIdx + vi//2
+                # select the upper (bf16) halves: lo16 from vi-1, hi16 from vi
+                kl.append(inst("v_perm_b32", vgpr(d), vc, _vgprValuC(sumIdxV-1), vBf16PackSel, "pack two bf16 to dword"))
 
         if not kernel["StoreRemapVectorWidth"]:
-          kStr += self.addStore(kernel, ss, addrCalc, sumIdx, tmpS01, edge)
+          kl.append(self.addStore(kernel, ss, addrCalc, sumIdx, tmpS01, edge))
           storesIssued += 1
 
         else:
           rpe = self.bpeCinternal//self.bpr
-          kStr += self.storeRemapAddLocalWrite(kernel, ss, addrCalc, sumIdx*rpe)
+          # exec is rewritten per element on the edge path without buffer stores,
+          # so the local write can't be held back to the next element there
+          deferWrite = not (edge and not bufferStore)
+          kl.append(self.storeRemapAddLocalWrite(kernel, ss, addrCalc, sumIdx*rpe, deferWrite))
           # Column Block Shape has been written to LDS
           # Now read back and write out to global memory
 
-      if kernel["ProblemType"]["DestDataType"].isBFloat16() and kernel["ProblemType"]["HighPrecisionAccumulate"]:
-        self.vgprPool.checkIn(vgprBf16Temp)
+      if kernel["StoreRemapVectorWidth"]:
+        kl.append(self.storeRemapFlushLocalWrite(kernel, ss))
 
           #kStr += self.bomb(5)
       if self.db["CheckStoreC"]>=0:
-        useBuffer = kernel["BufferStore"]
+        useBuffer = bufferStore
         # Note - CheckStoreC won't work for EDGE store cases since they load 0 for OOB, would need more sophisticated check
         # Note - TODO- CheckStoreC also won't work for StoreRemap
-        kStr += inst("s_waitcnt", "vmcnt(0)", "CheckStoreC, wait for stores to complete" )
+        kl.append(inst("s_waitcnt", "vmcnt(0)", "CheckStoreC, wait for stores to complete" ))
         if self.archCaps["SeparateVscnt"]:
-          kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
+          kl.append(inst("s_waitcnt_vscnt", "null", "0", "writes"))
         for elementIdx in range(0, len(batchElements)):
-          addr = ss.elementAddr[elementIdx].addrVgpr
+          addr = ss.elementAddrVgpr[elementIdx]
           sumIdx = ss.elementSumIdx[elementIdx]
 
-          bps = kernel["ProblemType"]["DestDataType"].numBytes() * gwvw
-          if kernel["BufferStore"]:
+          bps = destDataType.numBytes() * gwvw
+          if bufferStore:
             addr0 = vgpr(addr)
-            addr1 = sgpr("SrdC", 4)
+            addr1 = sgprSrdC4
           else:
             addr0 = vgpr(addr,2)
             addr1 = ""
 
-          if kernel["ProblemType"]["DestDataType"].isHalf() or kernel["ProblemType"]["DestDataType"].isBFloat16():
-            if not kernel["ProblemType"]["HighPrecisionAccumulate"]:
-              kStr += self.chooseGlobalRead(useBuffer, bps, sumIdx//2, \
-                        addr0, addr1, soffset=0, offset=0, extraFields="", hi16=sumIdx%2).toStr()
+          if isHalfDest or isBF16Dest:
+            if not hpa:
+              kl.append(self.chooseGlobalReadStr(useBuffer, bps, sumIdx//2, \
+                        addr0, addr1, soffset=0, offset=0, extraFields="", hi16=sumIdx%2))
             else:
-              kStr += self.chooseGlobalRead(useBuffer, bps, sumIdx, \
-                        addr0, addr1, soffset=0, offset=0, extraFields="", hi16=0).toStr()
-          elif kernel["ProblemType"]["DestDataType"].isInt32() or kernel["ProblemType"]["DestDataType"].isSingle():
-            kStr += self.chooseGlobalRead(useBuffer, bps, sumIdx, \
-                      addr0, addr1, soffset=0, offset=0, extraFields="").toStr()
-          elif kernel["ProblemType"]["DestDataType"].isDouble() or kernel["ProblemType"]["DestDataType"].isSingleComplex() :
-            kStr += self.chooseGlobalRead(useBuffer, bps, sumIdx*2, \
-                      addr0, addr1, soffset=0, offset=0, extraFields="").toStr()
-          elif kernel["ProblemType"]["DestDataType"].isDoubleComplex():
-            kStr += self.chooseGlobalRead(useBuffer, bps, sumIdx*4, \
-                      addr0, addr1, soffset=0, offset=0, extraFields="").toStr()
-        kStr += inst("s_waitcnt", "vmcnt(0)", "CheckStoreC, wait for stores to complete" )
+              kl.append(self.chooseGlobalReadStr(useBuffer, bps, sumIdx, \
+                        addr0, addr1, soffset=0, offset=0, extraFields="", hi16=0))
+          elif destDataType.isInt32() or destDataType.isSingle():
+            kl.append(self.chooseGlobalReadStr(useBuffer, bps, sumIdx, \
+                      addr0, addr1, soffset=0, offset=0, extraFields=""))
+          elif isDoubleDest or destDataType.isSingleComplex() :
+            kl.append(self.chooseGlobalReadStr(useBuffer, bps, sumIdx*2, \
+                      addr0, addr1, soffset=0, offset=0, extraFields=""))
+          elif destDataType.isDoubleComplex():
+            kl.append(self.chooseGlobalReadStr(useBuffer, bps, sumIdx*4, \
+                      addr0, addr1, soffset=0, offset=0, extraFields=""))
+        kl.append(inst("s_waitcnt", "vmcnt(0)", "CheckStoreC, wait for stores to complete" ))
         if self.archCaps["SeparateVscnt"]:
-          kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
+          kl.append(inst("s_waitcnt_vscnt", "null", "0", "writes"))
 
         # Add checks for expected values:
-        kStr += inst("s_mov_b32", sgpr(tmpS01), self.db["CheckStoreC"], "expected value")
+        kl.append(inst("s_mov_b32", sgpr(tmpS01), self.db["CheckStoreC"], "expected value"))
         for elementIdx in range(0, len(batchElements)):
           sumIdx = ss.elementSumIdx[elementIdx]
           # Need to fix for other types:
-          assert (kernel["ProblemType"]["DestDataType"].isSingle() or kernel["ProblemType"]["DestDataType"].isInt32())
-          kStr += self.assert_eq(vgpr(sumIdx), sgpr(tmpS01))
+          assert (destDataType.isSingle() or destDataType.isInt32())
+          kl.append(self.assert_eq(vgpr(sumIdx), sgpr(tmpS01)))
 
 
-      if edge and (atomic or not kernel["BufferStore"]):
+      if edge and (atomic or not bufferStore):
         # subsequent batch must start with full exec mask
         # BufferStore doesn't need exec since it used buffer range checking when
         # possible
-        kStr += inst("s_mov_b{}".format(wavelen), self.exec, -1, "full mask -> exec" )
+        kl.append(inst(self.sMovBWf, self.exec, -1, "full mask -> exec" ))
 
       if self.db["ConservativeWaitCnt"] & 0x40:
-        kStr += "s_barrier // debug\n"
-        kStr += inst("s_waitcnt", "vmcnt(0)", "ConservativeWaitCnt" )
+        kl.append("s_barrier // debug\n")
+        kl.append(inst("s_waitcnt", "vmcnt(0)", "ConservativeWaitCnt" ))
         if self.archCaps["SeparateVscnt"]:
-          kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
-        kStr += "s_barrier // debug\n"
+          kl.append(inst("s_waitcnt_vscnt", "null", "0", "writes"))
+        kl.append("s_barrier // debug\n")
 
     # return registers to pool:
+    freeVgprs = [] if ss.sharedColVgprs else list(ss.elementAddrVgpr[:len(batchElements)])
     lastData = -1
-    for elementIdx in range(0, len(batchElements)):
-      if not ss.sharedColVgprs:
-        addr = ss.elementAddr[elementIdx].addrVgpr
-        self.vgprPool.checkIn(addr)
-
-      data = ss.elementData[elementIdx]
+    for data in ss.elementData[:len(batchElements)]:
       if data != 0:
         if data != lastData:
-          self.vgprPool.checkIn(data)
+          freeVgprs.append(data)
         lastData = data
+    self.vgprPool.checkInMulti(freeVgprs)
 
     self.ss.firstBatch = False
     self.ss.checkInTempVgprC()
     if kernel["StoreRemapVectorWidth"]:
       if self.StoreRemapLastBatch == 1:
-        kStr += self.comment("Handle local read and global write")
+        kl.append(self.comment("Handle local read and global write"))
         # this seems buggy? it's possible to issue more than one stores for SR
         # kStr += self.storeRemapAddStore(kernel, ss, addrCalc, tmpVgpr, tmpS01, edge)
         # storesIssued += 1
         storeStr, numNewStores = self.storeRemapAddStore(kernel, ss, addrCalc, tmpVgpr, tmpS01, edge)
-        kStr += storeStr
+        kl.append(storeStr)
         storesIssued += numNewStores
 
     if self.serializedStore:
-      kStr += inst("s_nop 0", "1 wait state required when next inst writes vgprs held by previous dwordx4 store inst")
+      kl.append(inst("s_nop 0", "1 wait state required when next inst writes vgprs held by previous dwordx4 store inst"))
 
     # Update the store cnt to preLoopVmcntDict for Case2/3
     # (No need to update for Case0:'Undefined' or Case4:'OrdNLL_B1_Store')
     if self.currPreLoopVmcntCase in self.preLoopVmcntDict:
       self.preLoopVmcntDict[self.currPreLoopVmcntCase] += storesIssued
 
-    return kStr
+    return "".join(kl)
 
   ##############################################################################
   ##############################################################################
@@ -11817,24 +12277,33 @@ class KernelWriterAssembly(KernelWriter):
     kStr = ""
     if globalParameters["DebugKernel"]:
       kStr += self.comment("dump lds state")
-      kStr += inst("s_waitcnt", "lgkmcnt(0) & vmcnt(0)", "" )
-      if self.archCaps["SeparateVscnt"]:
-        kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
+      kStr += _waitAllLdsVmem(self.archCaps["SeparateVscnt"], "")
       kStr += inst("s_barrier", "dump LDS" )
-      tmp = self.vgprPool.checkOut(1)
+      # issue up to ring reads back to back before a single wait, then dump them
+      ring = max(1, min(numU, 4))
+      # wide flat stores need an aligned vgpr tuple (gfx90a)
+      tmp = self.vgprPool.checkOutAligned(ring, 2, "dump lds")
       tmpAddr = self.vgprPool.checkOut(1)
       kStr += inst("v_lshlrev_b32", \
           vgpr(tmpAddr), \
           hex(log2(self.bpeAB)), \
           vgpr("Serial"), \
           "dump lds")
-      for i in range(startU, startU+numU):
-        kStr += inst("ds_read_b32", vgpr(tmp), \
-            vgpr(tmpAddr) + " offset:%u"%(i*kernel["NumThreads"]*4), "dump lds")
-        kStr += inst("s_waitcnt", "lgkmcnt(0) & vmcnt(0)", "dump" )
-        if self.archCaps["SeparateVscnt"]:
-          kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
-        kStr += self.dump(vgpr(tmp))
+      # stores were drained above, so only rings after the first have dump
+      # stores of their own left for vscnt
+      dumpWait = _waitAllLdsVmem(self.archCaps["SeparateVscnt"], "dump")
+      for batchStart in range(startU, startU+numU, ring):
+        batch = range(0, min(ring, startU+numU-batchStart))
+        kStr += "".join([inst("ds_read_b32", vgpr(tmp+j), \
+            vgpr(tmpAddr) + " offset:%u"%((batchStart+j)*kernel["NumThreads"]*4), "dump lds") \
+            for j in batch])
+        kStr += dumpWait if batchStart != startU else _waitAllLdsVmem(False, "dump")
+        # flush with x4/x2/x1 stores only - a 3-wide ring goes out as x2 + x1
+        j = 0
+        while j < len(batch):
+          numStores = 4 if len(batch)-j >= 4 else (2 if len(batch)-j >= 2 else 1)
+          kStr += self.dumpMany(vgpr(tmp+j, numStores), numStores)
+          j += numStores
       self.vgprPool.checkIn(tmp)
       self.vgprPool.checkIn(tmpAddr)
     return kStr
@@ -11846,36 +12315,49 @@ class KernelWriterAssembly(KernelWriter):
   def initLds(self, kernel, value):
     kStr = ""
     kStr += self.comment("init lds state")
-    kStr += inst("s_waitcnt", "lgkmcnt(0) & vmcnt(0)", "" )
-    if self.archCaps["SeparateVscnt"]:
-      kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
+    kStr += _waitAllLdsVmem(self.archCaps["SeparateVscnt"], "")
     kStr += inst("s_barrier", "init LDS" )
-    tmp = self.vgprPool.checkOut(1)
-    tmpAddr = self.vgprPool.checkOut(1)
-    kStr += inst("v_mov_b32", vgpr(tmp), hex(value), "Init value")
     numBytesPerElement = kernel["ProblemType"]["DataType"].numBytes()
     writesPerThread = ((kernel["LdsNumElements"]*numBytesPerElement-1)//kernel["NumThreads"]//4) + 1
-    kStr += inst("v_lshlrev_b32", \
-        vgpr(tmpAddr), \
-        2,
-        vgpr("Serial"), \
-        "set per-thread address to init LDS")
-    for i in range(0, writesPerThread):
-      kStr += "ds_write_b32 %s, %s offset:%u %s" \
-          %( vgpr(tmpAddr), vgpr(tmp), (i*kernel["NumThreads"]*4), \
-          "//init lds" + self.endLine)
-
-    kStr += inst("s_waitcnt", "lgkmcnt(0) & vmcnt(0)", "wait for LDS init to complete" )
-    if self.archCaps["SeparateVscnt"]:
-      kStr += inst("s_waitcnt_vscnt", "null", "0", "writes")
+    # cover whole quads with ds_write_b128 and finish the tail with ds_write_b32
+    writesB128 = writesPerThread // 4
+    writesB32 = writesPerThread % 4
+    numInitVgprs = 4 if writesB128 else 1
+    tmp = self.vgprPool.checkOutAligned(numInitVgprs, numInitVgprs)
+    tmpAddr = self.vgprPool.checkOut(1)
+    for i in range(0, numInitVgprs):
+      kStr += inst("v_mov_b32", vgpr(tmp+i), hex(value), "Init value")
+    if writesB128:
+      kStr += inst("v_lshlrev_b32", \
+          vgpr(tmpAddr), \
+          4,
+          vgpr("Serial"), \
+          "set per-thread address to init LDS")
+      kStr += "".join(["ds_write_b128 %s, %s offset:%u %s" \
+          %( vgpr(tmpAddr), vgpr(tmp, 4), (i*kernel["NumThreads"]*16), \
+          "//init lds" + self.endLine) for i in range(0, writesB128)])
+    if writesB32:
+      kStr += inst("v_lshlrev_b32", \
+          vgpr(tmpAddr), \
+          2,
+          vgpr("Serial"), \
+          "set per-thread address to init LDS")
+      tailOffset = writesB128*kernel["NumThreads"]*16
+      kStr += "".join(["ds_write_b32 %s, %s offset:%u %s" \
+          %( vgpr(tmpAddr), vgpr(tmp), (tailOffset+i*kernel["NumThreads"]*4), \
+          "//init lds" + self.endLine) for i in range(0, writesB32)])
+
+    # only LDS writes were issued since the entry drain, no vscnt needed
+    kStr += _waitAllLdsVmem(False, "wait for LDS init to complete")
     kStr += inst("s_barrier", "init LDS exit" )
     self.vgprPool.checkIn(tmp)
     self.vgprPool.checkIn(tmpAddr)
     return kStr
 
+  # number of acc registers per real/imag plane; only acc2arch is needed, and
+  # it is cached per shape
   def AccVgprImagNumOffset(self, kernel):
-    acc2arch, _ = self.AccToArchMapper(kernel)
-    return len(acc2arch)
+    return len(accToArchMap(*self.accMapShape(kernel)))
 
   ##############################################################################
   # AccToArchMapper
@@ -11885,39 +12367,15 @@ class KernelWriterAssembly(KernelWriter):
   #    C-tile index back to original acc index
   ##############################################################################
   def AccToArchMapper(self, kernel):
-    acc2arch = dict()
-    arch2acc = dict()
-
-    if kernel["MatrixInstM"] == 4:
-      numInst = kernel["MIOutputVectorWidth"] * kernel["MIWaveTile"][0] * kernel["MIWaveTile"][1] * kernel["MIRegPerOut"]
-      for i in range(0, numInst):
-        acc2arch[i] = i
-        arch2acc[i] = i
-    else:
-      if kernel["SourceSwap"]:
-        OutputsPerMFMA = kernel["MatrixInstM"] * kernel["MatrixInstN"] // self.kernel["WavefrontSize"]
-        for wgIdx1 in range(0, kernel["MIWaveTile"][1]):
-          for tIdx1 in range(0, OutputsPerMFMA):
-            for wgIdx0 in range(0, kernel["MIWaveTile"][0]):
-              for tIdx0 in range(0, kernel["MIRegPerOut"]):
-                # TODO MatrixInstBM and BN support
-                src = tIdx0 + kernel["MIRegPerOut"] * (tIdx1 + OutputsPerMFMA * (wgIdx0 + kernel["MIWaveTile"][0] * wgIdx1))
-                dst = tIdx0 + kernel["MIRegPerOut"] * (wgIdx0 + kernel["MIWaveTile"][0] * (tIdx1 + OutputsPerMFMA * wgIdx1))
-                acc2arch[src] = dst
-                arch2acc[dst] = src
-      else:
-        OutputsPerMFMA1B = kernel["MatrixInstM"] * kernel["MatrixInstN"] // self.kernel["WavefrontSize"] * kernel["MIRegPerOut"]
-        for wgIdx1 in range(0, kernel["MIWaveTile"][1]):
-          for wgIdx0 in range(0, kernel["MIWaveTile"][0]):
-            for bIdx1 in range(0, kernel["MatrixInstBN"]):
-              for bIdx0 in range(0, kernel["MatrixInstBM"]):
-                for tIdx in range(0, OutputsPerMFMA1B):
-                  src = tIdx + OutputsPerMFMA1B * (bIdx0 + kernel["MatrixInstBM"] * (bIdx1 + kernel["MatrixInstBN"] * (wgIdx0 + kernel["MIWaveTile"][0] * wgIdx1)))
-                  dst = tIdx + OutputsPerMFMA1B * (bIdx0 + kernel["MatrixInstBM"] * (wgIdx0 + kernel["MIWaveTile"][0] * (bIdx1 + kernel["MatrixInstBN"] * wgIdx1)))
-                  acc2arch[src] = dst
-                  arch2acc[dst] = src
+    shape = self.accMapShape(kernel)
+    return accToArchMap(*shape), archToAccMap(*shape)
 
-    return acc2arch, arch2acc
+  # arguments of accToArchMap/archToAccMap for this kernel
+  def accMapShape(self, kernel):
+    return (kernel["MatrixInstM"], kernel["MatrixInstN"], \
+        kernel["MIWaveTile"][0], kernel["MIWaveTile"][1], kernel["MIRegPerOut"], \
+        kernel["MIOutputVectorWidth"], kernel["MatrixInstBM"], kernel["MatrixInstBN"], \
+        kernel["SourceSwap"], self.kernel["WavefrontSize"])
 
   ##############################################################################
   # MapAcctoArch
@@ -11931,75 +12389,79 @@ class KernelWriterAssembly(KernelWriter):
     kStr = ""
     kStr += self.comment("Mapping of Acc register -> C Vgpr register")
 
-    acc2arch, _ = self.AccToArchMapper(kernel)
+    acc2arch = accToArchMap(*self.accMapShape(kernel))
 
     self.codeAccVgprRead = Code.Module("AccVgprRead")
-    self.codeAccVgprRead.itemList = [None] * len(acc2arch) * self.agprMultiplier
+    itemList = [None] * len(acc2arch) * self.agprMultiplier
+    self.codeAccVgprRead.itemList = itemList
+    Inst = Code.Inst
+    placeholderValuC = vgpr("ValuC+__placeholder__") if self.serializedStore else None
 
     if kernel["ProblemType"]["DataType"].isComplex():
       accImOffset = self.AccVgprImagNumOffset(kernel)
       rpe = self.bpeCinternal//self.bpr
-      for i, e in enumerate(acc2arch):
-        if kernel["ProblemType"]["DataType"].isSingleComplex():
-          realNumIdx = acc2arch[i]*rpe+0
-          imagNumIdx = acc2arch[i]*rpe+1
-          self.codeAccVgprRead.itemList[realNumIdx] = Code.Inst("v_accvgpr_read_b32",
-                                                            vgpr("ValuC+__placeholder__") if self.serializedStore else vgpr("ValuC+%u" % realNumIdx),
-                                                            "acc%u" % i,
-                                                            "copy areg (real) to vreg[%u]"%realNumIdx)
-          self.codeAccVgprRead.itemList[imagNumIdx] = Code.Inst("v_accvgpr_read_b32",
-                                                            vgpr("ValuC+__placeholder__") if self.serializedStore else vgpr("ValuC+%u" % imagNumIdx),
-                                                            "acc%u" % (i+accImOffset),
-                                                            "copy areg (imag) to vreg[%u]"%imagNumIdx)
+      if kernel["ProblemType"]["DataType"].isSingleComplex():
+        for i, arch in enumerate(acc2arch):
+          realNumIdx = arch*rpe+0
+          imagNumIdx = arch*rpe+1
+          itemList[realNumIdx] = Inst("v_accvgpr_read_b32",
+                                      placeholderValuC or vgpr("ValuC+%u" % realNumIdx),
+                                      "acc%u" % i,
+                                      "copy areg (real) to vreg[%u]"%realNumIdx)
+          itemList[imagNumIdx] = Inst("v_accvgpr_read_b32",
+                                      placeholderValuC or vgpr("ValuC+%u" % imagNumIdx),
+                                      "acc%u" % (i+accImOffset),
+                                      "copy areg (imag) to vreg[%u]"%imagNumIdx)
     else:
-      for i, e in enumerate(acc2arch):
-        self.codeAccVgprRead.itemList[acc2arch[i]] = Code.Inst("v_accvgpr_read_b32", \
-                                                    vgpr("ValuC+__placeholder__") if self.serializedStore else vgpr("ValuC+%u" % acc2arch[i]),
-                                                    "acc%u" % i,
-                                                    "copy areg to vreg[%u]"%acc2arch[i])
+      for i, arch in enumerate(acc2arch):
+        itemList[arch] = Inst("v_accvgpr_read_b32", \
+                              placeholderValuC or vgpr("ValuC+%u" % arch),
+                              "acc%u" % i,
+                              "copy areg to vreg[%u]"%arch)
 
     return kStr if self.serializedStore else kStr+str(self.codeAccVgprRead)
 
 
-  # Perform 32-bit scalar mul and save u64 result in two SGPR
-  # src0 and src1 are 32-bit unsigned ints in scalar sgpr or small int constants (<64?))
+  # Perform 32-bit scalar mul and save 64-bit result in two SGPR
+  # mulHi selects the signedness of the high half ("u32" or "i32")
+  # src0 and src1 are 32-bit ints in scalar sgpr or small int constants (<64?))
   # return retuns in dst0:dest (lower 32-bit in dst0, high 64-bit in dst1))
-  def s_mul_u64_u32 (self, dst0, dst1,  src0, src1, comment):
-    kStr = ""
+  def s_mul_64_32 (self, mulHi, dst0, dst1,  src0, src1, comment):
     assert(dst1 != src0) # no worky since dst1 overwritten by first mul operations
     assert(dst1 != src1) # no worky since dst1 overwritten by first mul operations
     # the else path below has less restrictions but prefer consistency
-    if globalParameters["AsmCaps"][self.version]["HasSMulHi"]:
-      kStr += inst("s_mul_hi_u32", dst1, src0, src1, comment)
-      kStr += inst("s_mul_i32", dst0, src0, src1, comment)
-    else:
-      if type(src1) != 'str' or not src1.startswith("s"):
-        # Swap operands, need a scalar sgpr in src1 (not a constant)
-        t = src0
-        src0 = src1
-        src1 = t
-      vtmp0 = self.vgprPool.checkOut(2)
-      vtmp1 = vtmp0+1
-      kStr += inst("v_mov_b32", vgpr(vtmp0), src0, comment)
-      kStr += inst("v_mul_hi_u32", vgpr(vtmp1), vgpr(vtmp0), src1, comment)
-      kStr += inst("v_readfirstlane_b32", dst1, vgpr(vtmp1), comment)
-      kStr += inst("v_mul_lo_u32", vgpr(vtmp1), vgpr(vtmp0), src1, comment)
-      kStr += inst("v_readfirstlane_b32", dst0, vgpr(vtmp1), comment)
-      self.vgprPool.checkIn(vtmp0)
+    if self.hasSMulHi:
+      return inst("s_mul_hi_%s"%mulHi, dst1, src0, src1, comment) \
+           + inst("s_mul_i32", dst0, src0, src1, comment)
+    kStr = ""
+    if type(src1) != 'str' or not src1.startswith("s"):
+      # Swap operands, need a scalar sgpr in src1 (not a constant)
+      t = src0
+      src0 = src1
+      src1 = t
+    vtmp0 = self.vgprPool.checkOut(2)
+    vtmp1 = vtmp0+1
+    kStr += inst("v_mov_b32", vgpr(vtmp0), src0, comment)
+    kStr += inst("v_mul_hi_%s"%mulHi, vgpr(vtmp1), vgpr(vtmp0), src1, comment)
+    kStr += inst("v_readfirstlane_b32", dst1, vgpr(vtmp1), comment)
+    kStr += inst("v_mul_lo_u32", vgpr(vtmp1), vgpr(vtmp0), src1, comment)
+    kStr += inst("v_readfirstlane_b32", dst0, vgpr(vtmp1), comment)
+    self.vgprPool.checkIn(vtmp0)
     return kStr
 
+  # Perform 32-bit scalar mul and save u64 result in two SGPR
+  # src0 and src1 are 32-bit unsigned ints in scalar sgpr or small int constants (<64?))
+  # return retuns in dst0:dest (lower 32-bit in dst0, high 64-bit in dst1))
+  def s_mul_u64_u32 (self, dst0, dst1,  src0, src1, comment):
+    return self.s_mul_64_32("u32", dst0, dst1, src0, src1, comment)
+
   # dividend is a symbol (constant or sgpr).  Used directly not inside automatic sgpr(..)
   # dst is 2 consecutive SGPR
   #   result returned in dst0. dst1 is used as a temp,
   # dst[1] cannot be same as divident, dst[0] can be same as dividend and this can be useful
   def scalarMagicDivExplicit(self, dst, dividend, magicNumber, magicAbit, magicShift):
-    kStr = ""
     kStr = self.comment("dst1:0 = dividend(%s) / magicTag(%s)" % (dividend, magicNumber))
-    kStr += inst("s_mul_hi_u32", sgpr(dst+1), dividend, sgpr(magicNumber), "scalar magic div (magicnum)")
-    kStr += inst("s_mul_i32", sgpr(dst+0), dividend, sgpr(magicAbit), "scalar magic div (abit)")
-    kStr += inst("s_add_u32", sgpr(dst+0), sgpr(dst+0), sgpr(dst+1), "scalar magic div (combine)")
-    kStr += inst("s_lshr_b32", sgpr(dst+0), sgpr(dst+0), sgpr(magicShift), \
-                "scalar magic div (shift), quotient in s%s"%dst)
+    kStr += _scalarMagicDivText(dst, dividend, magicNumber, magicAbit, magicShift)
     return kStr
 
   def scalarMagicDiv(self, dst, dividend, magicTag):
@@ -12008,32 +12470,11 @@ class KernelWriterAssembly(KernelWriter):
                                         magicAbit="MagicAbitSize"+magicTag,
                                         magicShift="MagicShiftSize"+magicTag)
 
-  # Perform 32-bit scalar mul and save u64 result in two SGPR
-  # src0 and src1 are 32-bit unsigned ints in scalar sgpr or small int constants (<64?))
+  # Perform 32-bit scalar mul and save i64 result in two SGPR
+  # src0 and src1 are 32-bit signed ints in scalar sgpr or small int constants (<64?))
   # return retuns in dst0:dest (lower 32-bit in dst0, high 64-bit in dst1))
   def s_mul_i64_i32 (self, dst0, dst1,  src0, src1, comment):
-    kStr = ""
-    assert(dst1 != src0) # no worky since dst1 overwritten by first mul operations
-    assert(dst1 != src1) # no worky since dst1 overwritten by first mul operations
-    # the else path below has less restrictions but prefer consistency
-    if globalParameters["AsmCaps"][self.version]["HasSMulHi"]:
-      kStr += inst("s_mul_hi_i32", dst1, src0, src1, comment)
-      kStr += inst("s_mul_i32", dst0, src0, src1, comment)
-    else:
-      if type(src1) != 'str' or not src1.startswith("s"):
-        # Swap operands, need a scalar sgpr in src1 (not a constant)
-        t = src0
-        src0 = src1
-        src1 = t
-      vtmp0 = self.vgprPool.checkOut(2)
-      vtmp1 = vtmp0+1
-      kStr += inst("v_mov_b32", vgpr(vtmp0), src0, comment)
-      kStr += inst("v_mul_hi_i32", vgpr(vtmp1), vgpr(vtmp0), src1, comment)
-      kStr += inst("v_readfirstlane_b32", dst1, vgpr(vtmp1), comment)
-      kStr += inst("v_mul_lo_u32", vgpr(vtmp1), vgpr(vtmp0), src1, comment)
-      kStr += inst("v_readfirstlane_b32", dst0, vgpr(vtmp1), comment)
-      self.vgprPool.checkIn(vtmp0)
-    return kStr
+    return self.s_mul_64_32("i32", dst0, dst1, src0, src1, comment)
 
 
 
@@ -12085,21 +12526,35 @@ class KernelWriterAssembly(KernelWriter):
 
     return kStr
 
+  ##############################################################################
+  # assertSaveExec / assertRestoreExec : save exec to SaveExecMask before an
+  # assert and restore it afterwards.  andMask ands exec with the value already
+  # in SaveExecMask instead of enabling all lanes.
+  ##############################################################################
+  def assertSaveExec(self, andMask=False):
+    if andMask:
+      return inst(self.sAndSaveExecBWf, sgpr("SaveExecMask",self.laneSGPRCount), sgpr("SaveExecMask",self.laneSGPRCount), \
+          "assert: saved execmask")
+    return inst(self.sOrSaveExecBWf, sgpr("SaveExecMask",self.laneSGPRCount), 0, \
+        "assert: saved execmask")
+
+  def assertRestoreExec(self):
+    return inst(self.sOrSaveExecBWf, self.vcc, sgpr("SaveExecMask",self.laneSGPRCount), \
+        "assert: restore execmask")
+
   ##############################################################################
   # assertCmpCommon : Common routine for all assert comparison functions
   ##############################################################################
   def assertCmpCommon(self, cond, val0, val1, cookie=-1):
     kStr = ""
     if self.db["EnableAsserts"]:
-      kStr += inst("s_or_saveexec_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask",self.laneSGPRCount), 0, \
-          "assert: saved execmask")
+      kStr += self.assertSaveExec()
 
       kStr += inst("_v_cmpx_%s"%cond, self.vcc, val0, val1, "v_cmp" )
 
       kStr += self.assertCommon(cookie)
 
-      kStr += inst("s_or_saveexec_b{}".format(self.kernel["WavefrontSize"]), self.vcc, sgpr("SaveExecMask",self.laneSGPRCount), \
-          "assert: restore execmask")
+      kStr += self.assertRestoreExec()
 
     return kStr
 
@@ -12164,34 +12619,28 @@ class KernelWriterAssembly(KernelWriter):
 
       stmp = sgpr("SaveExecMask") # repurpose to get a tmp sgpr
 
-      kStr += inst("s_and_b{}".format(self.kernel["WavefrontSize"]), stmp, sval, multiple2-1, "mask" )
-      kStr += inst("s_cmp_eq_u32", stmp, 0, "if maskedBits==0 then SCC=1 == no fault" )
-      kStr += inst("s_mov_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask",self.laneSGPRCount), -1, "")
-      kStr += inst("s_cmov_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask", self.laneSGPRCount),  0, "Clear exec mask")
+      kStr += inst("s_and_b32", stmp, sval, multiple2-1, "mask, SCC=1 if maskedBits!=0 == fault" )
+      kStr += inst(self.sCselectBWf, sgpr("SaveExecMask",self.laneSGPRCount), -1, 0, "Clear exec mask if no fault")
 
-      kStr += inst("s_and_saveexec_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask",self.laneSGPRCount), sgpr("SaveExecMask",self.laneSGPRCount), \
-          "assert: saved execmask")
+      kStr += self.assertSaveExec(andMask=True)
 
       kStr += self.assertCommon(cookie)
 
-      kStr += inst("s_or_saveexec_b{}".format(self.kernel["WavefrontSize"]), self.vcc, sgpr("SaveExecMask",self.laneSGPRCount), \
-          "assert: restore execmask")
+      kStr += self.assertRestoreExec()
 
     return kStr
 
   def assert_s_eq(self, sval0, sval1, cookie=-1):
     kStr = ""
     if self.db["EnableAsserts"]:
-      kStr += inst("s_and_saveexec_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask",self.laneSGPRCount), sgpr("SaveExecMask",self.laneSGPRCount), \
-          "assert: saved execmask")
+      kStr += self.assertSaveExec(andMask=True)
 
-      kStr += inst("s_mov_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask", self.laneSGPRCount), -1, "")
+      kStr += inst(self.sMovBWf, sgpr("SaveExecMask", self.laneSGPRCount), -1, "")
       kStr += inst("s_cmp_eq_u32", sval0, sval1, "cmp")
-      kStr += inst("s_cmov_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask", self.laneSGPRCount),  0, "No assert if SCC=1")
+      kStr += inst(self.sCmovBWf, sgpr("SaveExecMask", self.laneSGPRCount),  0, "No assert if SCC=1")
 
       kStr += self.assertCommon(cookie)
-      kStr += inst("s_or_saveexec_b{}".format(self.kernel["WavefrontSize"]), self.vcc, sgpr("SaveExecMask",self.laneSGPRCount), \
-          "assert: restore execmask")
+      kStr += self.assertRestoreExec()
 
       return kStr
 
@@ -12199,31 +12648,27 @@ class KernelWriterAssembly(KernelWriter):
   def assert_scc_is_1(self, cookie=-1):
     kStr = ""
     if self.db["EnableAsserts"]:
-      kStr += inst("s_and_saveexec_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask",self.laneSGPRCount), sgpr("SaveExecMask",self.laneSGPRCount), \
-          "assert: saved execmask")
+      kStr += self.assertSaveExec(andMask=True)
 
-      kStr += inst("s_mov_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask",self.laneSGPRCount), -1, "")
-      kStr += inst("s_cmov_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask",self.laneSGPRCount),  0, "No assert if SCC=1")
+      kStr += inst(self.sMovBWf, sgpr("SaveExecMask",self.laneSGPRCount), -1, "")
+      kStr += inst(self.sCmovBWf, sgpr("SaveExecMask",self.laneSGPRCount),  0, "No assert if SCC=1")
 
       kStr += self.assertCommon(cookie)
-      kStr += inst("s_or_saveexec_b{}".format(self.kernel["WavefrontSize"]), self.vcc, sgpr("SaveExecMask",self.laneSGPRCount), \
-          "assert: restore execmask")
+      kStr += self.assertRestoreExec()
 
       return kStr
 
   def assert_scc_is_0(self, cookie=-1):
     kStr = ""
     if self.db["EnableAsserts"]:
-      kStr += inst("s_and_saveexec_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask",self.laneSGPRCount), sgpr("SaveExecMask",self.laneSGPRCount), \
-          "assert: saved execmask")
+      kStr += self.assertSaveExec(andMask=True)
 
-      kStr += inst("s_mov_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask",self.laneSGPRCount), -1, "")
-      kStr += inst("s_cmov_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask", self.laneSGPRCount),  0, "")
-      kStr += inst("s_not_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask",self.laneSGPRCount), sgpr("SaveExecMask", self.laneSGPRCount), "Assert if SCC==1")
+      kStr += inst(self.sMovBWf, sgpr("SaveExecMask",self.laneSGPRCount), -1, "")
+      kStr += inst(self.sCmovBWf, sgpr("SaveExecMask", self.laneSGPRCount),  0, "")
+      kStr += inst(self.sNotBWf, sgpr("SaveExecMask",self.laneSGPRCount), sgpr("SaveExecMask", self.laneSGPRCount), "Assert if SCC==1")
 
       kStr += self.assertCommon(cookie)
-      kStr += inst("s_or_saveexec_b{}".format(self.kernel["WavefrontSize"]), self.vcc, sgpr("SaveExecMask",self.laneSGPRCount), \
-          "assert: restore execmask")
+      kStr += self.assertRestoreExec()
 
       return kStr
 
@@ -12231,24 +12676,20 @@ class KernelWriterAssembly(KernelWriter):
   def assert_vcc_all_true(self, cookie=-1):
     kStr = ""
     if self.db["EnableAsserts"]:
-      kStr += inst("s_or_saveexec_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask",self.laneSGPRCount), 0, \
-          "assert: saved execmask")
-      kStr += inst("s_mov_b{}".format(self.kernel["WavefrontSize"]), self.exec, self.vcc, "Predicate based on VCC")
+      kStr += self.assertSaveExec()
+      kStr += inst(self.sMovBWf, self.exec, self.vcc, "Predicate based on VCC")
       kStr += self.assertCommon(cookie)
-      kStr += inst("s_or_saveexec_b{}".format(self.kernel["WavefrontSize"]), self.vcc, sgpr("SaveExecMask",self.laneSGPRCount), \
-          "assert: restore execmask")
+      kStr += self.assertRestoreExec()
     return kStr
 
   # Assert that all bits in vcc are false, or assert/bomb otherwise
   def assert_vcc_all_false(self, cookie=-1):
     kStr = ""
     if self.db["EnableAsserts"]:
-      kStr += inst("s_or_saveexec_b{}".format(self.kernel["WavefrontSize"]), sgpr("SaveExecMask",self.laneSGPRCount), 0, \
-          "assert: saved execmask")
-      kStr += inst("s_not_b{}".format(self.kernel["WavefrontSize"]), self.exec, self.vcc, "Predicate based on !VCC")
+      kStr += self.assertSaveExec()
+      kStr += inst(self.sNotBWf, self.exec, self.vcc, "Predicate based on !VCC")
       kStr += self.assertCommon(cookie)
-      kStr += inst("s_or_saveexec_b{}".format(self.kernel["WavefrontSize"]), self.vcc, sgpr("SaveExecMask",self.laneSGPRCount), \
-          "assert: restore execmask")
+      kStr += self.assertRestoreExec()
     return kStr
 
   # assert v0 + expectedScalarDiff == v1
@@ -12270,22 +12711,29 @@ class KernelWriterAssembly(KernelWriter):
   # Store to Debug Buffer
   ########################################
   def dump(self, vgprStore):
+    return self.dumpMany(vgprStore, 1)
+
+  # Store numStores consecutive vgprs (vgprStore names the whole block) to the
+  # debug buffer with one wide store, behind one DebugKernelItems check:
+  # the group is skipped unless all of it still fits in the item limit.
+  def dumpMany(self, vgprStore, numStores):
     kStr = ""
     if globalParameters["DebugKernel"]:
       afterDump = -1
       if self.db["DebugKernelMaxItems"] != -1:
         afterDump = self.getUniqLabel()
-        kStr += inst("s_cmp_lt_u32", sgpr("DebugKernelItems"), 16,  "")
+        kStr += inst("s_cmp_lt_u32", sgpr("DebugKernelItems"), 16-numStores+1,  "")
         kStr += inst("s_cbranch_scc0", "label_%04u"%afterDump, \
                      "skip if already wrote enough work-items" )
         kStr += inst("s_add_u32", sgpr("DebugKernelItems"), \
                      sgpr("DebugKernelItems"), \
-                     hex(1), "inc items written" )
+                     hex(numStores), "inc items written" )
 
-      kStr += inst("flat_store_dword", vgpr("AddressDbg", 2), \
+      storeOp = "flat_store_dword" if numStores == 1 else "flat_store_dwordx%u"%numStores
+      kStr += inst(storeOp, vgpr("AddressDbg", 2), \
           vgprStore, "debug dump store" )
       kStr += inst("_v_add_co_u32", vgpr("AddressDbg"), self.vcc, vgpr("AddressDbg"), \
-          hex(4), "debug dump inc" )
+          hex(4*numStores), "debug dump inc" )
 
       if self.db["DebugKernelMaxItems"] != -1:
         kStr += "label_%04u:%s  %s" % (afterDump, "// skip debug target", self.endLine)
@@ -19,7 +19,9 @@
 # CTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 ################################################################################
 
-from Tensile.KernelWriterAssembly import KernelWriterAssembly
+import itertools
+
+from Tensile.KernelWriterAssembly import KernelWriterAssembly, accToArchMap, archToAccMap, storeRemapReadGroups
 
 def test_occupancy():
     # numThreads = 256
@@ -63,5 +65,139 @@ def test_max_regs():
     assert KernelWriterAssembly.getMaxRegsForOccupancy(512,  10, 16384) == 32
     assert KernelWriterAssembly.getMaxRegsForOccupancy(512, 256, 32768) == 256
 
+def test_or_lane_masks():
+    # only the opcode strings set up by initKernel are needed
+    class Writer:
+        sOrBWf = "s_or_b64"
+        sMovBWf = "s_mov_b64"
+
+    def orLaneMasks(numMasks):
+        masks = ["m%u" % i for i in range(numMasks)]
+        kl = KernelWriterAssembly.orLaneMasks(Writer(), "dst", "tmp", masks)
+        return [item.split("//")[0].split() for item in kl]
+
+    assert orLaneMasks(1) == [["s_mov_b64", "dst,", "m0"]]
+    assert orLaneMasks(2) == [["s_or_b64", "dst,", "m0,", "m1"]]
+    assert orLaneMasks(3) == [["s_or_b64", "dst,", "m0,", "m1"],
+                              ["s_or_b64", "dst,", "m2,", "dst"]]
+    # two independent chains once each gets an s_or of its own
+    assert orLaneMasks(4) == [["s_or_b64", "dst,", "m0,", "m2"],
+                              ["s_or_b64", "tmp,", "m1,", "m3"],
+                              ["s_or_b64", "dst,", "dst,", "tmp"]]
+    assert orLaneMasks(5) == [["s_or_b64", "dst,", "m0,", "m2"],
+                              ["s_or_b64", "tmp,", "m1,", "m3"],
+                              ["s_or_b64", "dst,", "m4,", "dst"],
+                              ["s_or_b64", "dst,", "dst,", "tmp"]]
+
+def test_acc_arch_map_round_trip():
+    # (MatrixInstM, MatrixInstN, MIWaveTile0, MIWaveTile1, MIRegPerOut,
+    #  MIOutputVectorWidth, MatrixInstBM, MatrixInstBN, SourceSwap, WavefrontSize)
+    for (m, n), wt0, wt1, regPerOut, bm, bn, sourceSwap in itertools.product( \
+            [(4, 4), (16, 16), (32, 32)], [1, 2, 4], [1, 3], [1, 2], [1, 2], [1, 4], [False, True]):
+        ovw = 4 if m == 4 else 1
+        shape = (m, n, wt0, wt1, regPerOut, ovw, bm, bn, sourceSwap, 64)
+        acc2arch = accToArchMap(*shape)
+        arch2acc = archToAccMap(*shape)
+        assert sorted(acc2arch) == list(range(len(acc2arch)))
+        assert len(arch2acc) == len(acc2arch)
+        for i in range(len(acc2arch)):
+            assert arch2acc[acc2arch[i]] == i
+            assert acc2arch[arch2acc[i]] == i
+
+def test_acc_arch_map_values():
+    # expected maps are the ones the original dict-building AccToArchMapper produced
+    # 32x32, MIWaveTile 2x1, MIRegPerOut 1, two blocks in n
+    assert accToArchMap(32, 32, 2, 1, 1, 1, 1, 2, False, 64) == \
+        tuple(range(0, 16)) + tuple(range(32, 48)) + tuple(range(16, 32)) + tuple(range(48, 64))
+    # 16x16 with SourceSwap, MIWaveTile 2x2
+    assert accToArchMap(16, 16, 2, 2, 1, 1, 1, 1, True, 64) == \
+        (0, 2, 4, 6, 1, 3, 5, 7, 8, 10, 12, 14, 9, 11, 13, 15)
+    assert archToAccMap(16, 16, 2, 2, 1, 1, 1, 1, True, 64) == \
+        (0, 4, 1, 5, 2, 6, 3, 7, 8, 12, 9, 13, 10, 14, 11, 15)
+    # 4x4 with MIOutputVectorWidth 4 is the identity
+    assert accToArchMap(4, 4, 2, 1, 1, 4, 1, 1, False, 64) == (0, 1, 2, 3, 4, 5, 6, 7)
+
+def test_store_remap_read_groups():
+    # b32 reads pair up while the second offset/4 fits in 8 bits
+    assert storeRemapReadGroups([0, 256, 512, 768], 4) == [[0, 1], [2, 3]]
+    assert storeRemapReadGroups([0, 512, 1024], 4) == [[0, 1], [2]]
+    assert storeRemapReadGroups([0, 1016, 2032], 8) == [[0, 1], [2]]
+    assert storeRemapReadGroups([0, 1024, 2048, 3072], 8) == [[0, 1], [2], [3]]
+    # offsets must be multiples of the read size
+    assert storeRemapReadGroups([0, 4, 8], 8) == [[0], [1], [2]]
+    # no ds_read2 for b16/b128
+    assert storeRemapReadGroups([0, 16, 32], 16) == [[0], [1], [2]]
+    assert storeRemapReadGroups([0, 2], 2) == [[0], [1]]
+    assert storeRemapReadGroups([], 4) == []
+
+def test_store_remap_write_pairs():
+    class Writer:
+        storeRemapAddLocalWrite = KernelWriterAssembly.storeRemapAddLocalWrite
+        storeRemapFlushLocalWrite = KernelWriterAssembly.storeRemapFlushLocalWrite
+
+        def __init__(self, bpe):
+            self.bpeCexternal = bpe
+            self.bpr = 4
+            self.storeRemapLW = 10
+            self.storeRemapPendingLW = None
+
+    class Cfg:
+        gwvw = 1
+
+    class StoreState:
+        cfg = Cfg()
+
+    class AddrCalc:
+        def __init__(self, coordOffset0):
+            self.coordOffset0 = coordOffset0
+
+    def localWrites(bpe, coordOffsets):
+        writer = Writer(bpe)
+        kl = [writer.storeRemapAddLocalWrite(None, StoreState(), AddrCalc(c), 20+i*bpe//4, deferWrite=True) \
+              for i, c in enumerate(coordOffsets)]
+        kl.append(writer.storeRemapFlushLocalWrite(None, StoreState()))
+        return [line.split("//")[0].split() for line in "".join(kl).splitlines()]
+
+    assert localWrites(4, [0, 1, 2]) == \
+        [["ds_write2_b32", "v10,", "v20,", "v21,", "offset0:0", "offset1:1"],
+         ["ds_write_b32", "v10,", "v22,", "offset:8"]]
+    assert localWrites(8, [0, 4, 8, 12]) == \
+        [["ds_write2_b64", "v10,", "v[20:21],", "v[22:23],", "offset0:0", "offset1:4"],
+         ["ds_write2_b64", "v10,", "v[24:25],", "v[26:27],", "offset0:8", "offset1:12"]]
+    # offset/4 past 8 bits: the pending write is flushed and this one issued alone
+    assert localWrites(4, [0, 256]) == \
+        [["ds_write_b32", "v10,", "v20,", "offset:0"],
+         ["ds_write_b32", "v10,", "v21,", "offset:1024"]]
+
+def test_choose_global_read_str():
+    class TmpSgpr:
+        def idx(self):
+            return 40
+
+    class Writer:
+        bufferLoadInsts = KernelWriterAssembly.bufferLoadInsts
+        flatLoadInsts = KernelWriterAssembly.flatLoadInsts
+        globalReadParts = KernelWriterAssembly.globalReadParts
+        chooseGlobalRead = KernelWriterAssembly.chooseGlobalRead
+        chooseGlobalReadStr = KernelWriterAssembly.chooseGlobalReadStr
+
+        def getTmpSgpr(self, num, align=1):
+            return TmpSgpr()
+
+    w = Writer()
+    cases = [(True, bpl, 8, "v4", "s[8:11]", 0, offset, "", hi16) \
+             for bpl in (2, 4, 8, 16, 32) for offset in (0, 128, 4096) for hi16 in (0, 1)]
+    cases.append((True, 4, 8, "v4", "s[8:11]", 0, 8192, "glc", 0))
+    cases.append((False, 2, 8, "v[4:5]", "", 0, 0, "", 1))
+    cases.append((False, 8, 8, "v[4:5]", "", 0, 0, "glc", 0))
+    cases.append((False, 16, 8, "v[4:5]", "", 0, 0, "", 0))
+    for args in cases:
+        assert w.chooseGlobalReadStr(*args) == str(w.chooseGlobalRead(*args))
+
+    # the s_mov that moves a large offset into soffset is kept for both halves of bpl 32
+    text = w.chooseGlobalReadStr(True, 32, 8, "v4", "s[8:11]", 0, 4096, "")
+    assert text.startswith("s_mov_b32 s40, 4096")
+    assert text.count("buffer_load_dwordx4") == 2
+
 # test_occupancy()
 # test_max_regs()